@@ -0,0 +1,115 @@
+import random
+from collections import deque
+
+# ==================== АДАПТИВНЫЙ ВЫБОР ВОПРОСОВ ====================
+#
+# Вес каждого вопроса зависит от доли ошибок в текущей сессии и от того, как
+# давно его задавали. Веса лежат в дереве Фенвика, поэтому и выбор вопроса,
+# и обновление веса после ответа стоят O(log n). Модуль не зависит от Streamlit
+# и подходит для любых пулов (элементы, в будущем — соединения).
+
+# Сколько последних вопросов считаются "недавними"
+RECENT_WINDOW = 10
+
+# Множитель веса недавно заданного вопроса
+RECENT_FACTOR = 0.05
+
+
+class FenwickSampler:
+    """Выбор индекса с вероятностью, пропорциональной весу; изменение веса за O(log n)"""
+
+    __slots__ = ("size", "weights", "_tree", "_top")
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = [float(weight) for weight in weights]
+        # Построение за O(n): каждый узел добавляет свою сумму родителю
+        self._tree = [0.0] + self.weights
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self._tree[parent] += self._tree[i]
+        self._top = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def total(self):
+        """Сумма всех весов"""
+        total = 0.0
+        i = self.size
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, index, weight):
+        """Новый вес элемента index"""
+        delta = float(weight) - self.weights[index]
+        self.weights[index] = float(weight)
+        i = index + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def find(self, value):
+        """Наименьший индекс, у которого сумма весов до него включительно больше value"""
+        position = 0
+        step = self._top
+        while step:
+            following = position + step
+            if following <= self.size and self._tree[following] <= value:
+                position = following
+                value -= self._tree[following]
+            step >>= 1
+        # Защита от накопленной погрешности сумм с плавающей точкой
+        return min(position, self.size - 1)
+
+    def sample(self, rng=random):
+        """Случайный индекс с вероятностью weight / total"""
+        return self.find(rng.random() * self.total())
+
+
+class AdaptiveSelector:
+    """Выбор вопросов с упором на ошибки и без недавних повторов.
+
+    Вес вопроса — сглаженная доля ошибок (ошибки + 1) / (попытки + 2): новый
+    вопрос весит 0.5, вопрос с ошибками — больше, усвоенный — меньше. Последние
+    RECENT_WINDOW выбранных вопросов получают множитель RECENT_FACTOR; когда
+    вопрос выходит из окна, его вес восстанавливается — поэтому на каждом шаге
+    меняется не больше двух весов.
+    """
+
+    __slots__ = ("sampler", "attempts", "errors", "recent", "window")
+
+    def __init__(self, size, window=RECENT_WINDOW):
+        self.sampler = FenwickSampler([0.5] * size)
+        self.attempts = [0] * size
+        self.errors = [0] * size
+        # Окно не больше половины пула, чтобы в маленьких пулах оставался выбор
+        self.window = min(window, size // 2)
+        self.recent = deque()
+
+    def __len__(self):
+        return self.sampler.size
+
+    def _weight(self, index):
+        weight = (self.errors[index] + 1) / (self.attempts[index] + 2)
+        if index in self.recent:
+            weight *= RECENT_FACTOR
+        return weight
+
+    def draw(self, rng=random):
+        """Следующий вопрос (индекс в пуле)"""
+        index = self.sampler.sample(rng)
+        if self.window:
+            self.recent.append(index)
+            self.sampler.update(index, self._weight(index))
+            if len(self.recent) > self.window:
+                released = self.recent.popleft()
+                self.sampler.update(released, self._weight(released))
+        return index
+
+    def record(self, index, correct):
+        """Учитывает ответ на вопрос index"""
+        self.attempts[index] += 1
+        if not correct:
+            self.errors[index] += 1
+        self.sampler.update(index, self._weight(index))
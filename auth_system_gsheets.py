@@ -1,10 +1,19 @@
 
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
 import hashlib
 from datetime import datetime
 import json
+import threading
+import atexit
+import time
+import re
+import os
+import logging
+from user_store import UserStore, SQLiteUserStore, STATS_FIELDS, ANSWER_FIELDS, DEFAULT_SQLITE_PATH, answer_rows, fold_answers
+from mastery import Mastery
+from partial_rerun import fragment
+
+logger = logging.getLogger(__name__)
 
 # ==================== НАСТРОЙКА GOOGLE SHEETS ====================
 
@@ -19,24 +28,160 @@ SPREADSHEET_ID = "16eAX7om2gzcttvDGUMKa_xwOSwsowOq7QOiLH01zI2k"
 # Название листа (вкладки) в таблице
 SHEET_NAME = "Лист1"
 
+# Лист с журналом ответов (только дописывание строк)
+ANSWERS_SHEET_NAME = "answers"
+
+# Ячейка листа журнала, где хранится число строк, уже свёрнутых в счётчики
+ANSWERS_WATERMARK_CELL = "H1"
+
+# Сколько секунд строки журнала пользователя, которого нет в листе, задерживают
+# отметку свёрнутых строк (вдруг строка пользователя ещё появится); более старые отбрасываются
+ANSWERS_ORPHAN_TTL = 24 * 60 * 60
+
+# Как часто (в секундах) накопленные ответы дописываются в журнал
+STATS_FLUSH_INTERVAL = 5
+
+# Как часто (в секундах) журнал ответов сворачивается в счётчики листа пользователей
+ANSWERS_COMPACTION_INTERVAL = 300
+
+# Сколько секунд загруженный список пользователей считается актуальным
+# (можно переопределить ключом users_cache_ttl в Streamlit Secrets)
+USERS_CACHE_TTL = 30
+
+# Хранилище пользователей: "gsheets" (по умолчанию) или "sqlite".
+# Задаётся секцией [user_store] в Streamlit Secrets (backend, path)
+# или переменными окружения USER_STORE_BACKEND / USER_STORE_PATH
+DEFAULT_USER_STORE = "gsheets"
+
+# Файл-отметка: демо-пользователь уже создан в перечисленных хранилищах
+DEMO_MARKER_FILE = ".demo_user_ready"
+
 # ==================== ФУНКЦИИ ДЛЯ РАБОТЫ С GOOGLE SHEETS ====================
 
-def get_gsheet_client():
-    """Подключение к Google Sheets"""
-    try:
+class SheetsConnectionPool:
+    """Одно подключение к Google Sheets на процесс, общее для всех сессий Streamlit"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._credentials = None
+        self._client = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        # Другой адрес Sheets API вместо https://sheets.googleapis.com (None — настоящий API)
+        self._endpoint = None
+        # Счётчики, по которым видно, что авторизация выполняется один раз на процесс
+        self.stats = {
+            "authorizations": 0,
+            "token_refreshes": 0,
+            "spreadsheet_opens": 0,
+            "worksheet_opens": 0,
+            "reconnects": 0
+        }
+
+    def _load_credentials(self):
+        # gspread и google-auth импортируются только при первом обращении к таблице,
+        # чтобы гостевой режим не тратил на них время запуска
+        from google.oauth2.service_account import Credentials
+
         # Способ 1: Чтение из Streamlit Secrets (для облачного хостинга)
         if 'google_credentials' in st.secrets:
             creds_dict = dict(st.secrets["google_credentials"])
-            credentials = Credentials.from_service_account_info(creds_dict, scopes=SCOPE)
-        
+            return Credentials.from_service_account_info(creds_dict, scopes=SCOPE)
+
         # Способ 2: Чтение из файла (для локальной разработки)
-        else:
-            credentials = Credentials.from_service_account_file(
-                "credentials.json", 
-                scopes=SCOPE
-            )
-        
-        return gspread.authorize(credentials)
+        return Credentials.from_service_account_file(
+            "credentials.json",
+            scopes=SCOPE
+        )
+
+    def _refresh_token(self):
+        # Обновляем токен заранее и под блокировкой, чтобы сессии не делали это одновременно
+        if self._credentials is None or getattr(self._credentials, "valid", True):
+            return
+        from google.auth.transport.requests import Request
+        self._credentials.refresh(Request())
+        self.stats["token_refreshes"] += 1
+
+    def get_client(self):
+        """Авторизованный клиент gspread (создаётся один раз)"""
+        with self._lock:
+            if self._client is None:
+                import gspread
+                if self._endpoint:
+                    # Запросы уходят на другой адрес без авторизации Google
+                    self._client = gspread.Client(auth=None, session=_endpoint_session(self._endpoint))
+                else:
+                    self._credentials = self._load_credentials()
+                    self._client = gspread.authorize(self._credentials)
+                self.stats["authorizations"] += 1
+            else:
+                self._refresh_token()
+            return self._client
+
+    def get_spreadsheet(self):
+        """Открытая таблица SPREADSHEET_ID (открывается один раз)"""
+        with self._lock:
+            client = self.get_client()
+            if self._spreadsheet is None:
+                self._spreadsheet = client.open_by_key(SPREADSHEET_ID)
+                self.stats["spreadsheet_opens"] += 1
+            return self._spreadsheet
+
+    def get_worksheet(self, title=SHEET_NAME):
+        """Лист таблицы по названию (кешируется)"""
+        with self._lock:
+            spreadsheet = self.get_spreadsheet()
+            if title not in self._worksheets:
+                self._worksheets[title] = spreadsheet.worksheet(title)
+                self.stats["worksheet_opens"] += 1
+            return self._worksheets[title]
+
+    def use_endpoint(self, url):
+        """Направляет запросы на другой адрес Sheets API (пусто — на настоящий)"""
+        with self._lock:
+            self._endpoint = url.rstrip("/") if url else None
+            self._credentials = None
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    def forget_worksheet(self, title):
+        """Убирает лист из кеша (например, после его создания)"""
+        with self._lock:
+            self._worksheets.pop(title, None)
+
+    def reset(self):
+        """Сбрасывает подключение: следующий запрос авторизуется заново"""
+        with self._lock:
+            self._credentials = None
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets = {}
+            self.stats["reconnects"] += 1
+
+def _endpoint_session(base_url):
+    """Сессия requests, отправляющая запросы gspread на base_url вместо googleapis.com"""
+    import requests
+    from urllib.parse import urlsplit
+
+    class EndpointSession(requests.Session):
+        def request(self, method, url, *args, **kwargs):
+            parts = urlsplit(url)
+            target = base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+            return super().request(method, target, *args, **kwargs)
+
+    return EndpointSession()
+
+_connection_pool = SheetsConnectionPool()
+
+def get_connection_stats():
+    """Счётчики пула подключений к Google Sheets"""
+    return dict(_connection_pool.stats)
+
+def get_gsheet_client():
+    """Подключение к Google Sheets (общий клиент на весь процесс)"""
+    try:
+        return _connection_pool.get_client()
     
     except Exception as e:
         st.error(f"❌ Ошибка подключения к Google Sheets: {e}")
@@ -48,6 +193,43 @@ def get_gsheet_client():
         """)
         return None
 
+def _needs_reconnect(error):
+    """Ошибка авторизации или соединения: поможет только новое подключение"""
+    import requests
+    from google.auth.exceptions import GoogleAuthError
+    from gspread.exceptions import APIError
+    if isinstance(error, (GoogleAuthError, requests.ConnectionError, requests.Timeout)):
+        return True
+    return isinstance(error, APIError) and error.response.status_code == 401
+
+def _is_server_error(error):
+    """Временный сбой на стороне Google (5xx): повтор возможен без переподключения"""
+    from gspread.exceptions import APIError
+    return isinstance(error, APIError) and error.response.status_code >= 500
+
+def run_on_sheet(operation, retry=True, title=SHEET_NAME):
+    """Выполняет operation(sheet) на листе title (по умолчанию — лист пользователей).
+
+    Операция повторяется один раз: после ошибки авторизации или соединения —
+    с новым подключением, после ошибки сервера (5xx) — на том же подключении.
+    Остальные ошибки (квота 429, 4xx, ошибки в operation) передаются вызывающему:
+    повтор их не исправит. retry=False — для неидемпотентных операций вроде append_row.
+    """
+    if not get_gsheet_client():
+        raise ConnectionError("Нет подключения к Google Sheets")
+    try:
+        return operation(_connection_pool.get_worksheet(title))
+    except Exception as e:
+        if not retry:
+            raise
+        if _needs_reconnect(e):
+            _connection_pool.reset()
+            if not get_gsheet_client():
+                raise
+        elif not _is_server_error(e):
+            raise
+        return operation(_connection_pool.get_worksheet(title))
+
 def init_google_sheet():
     """Инициализация Google таблицы (создаёт, если нет)"""
     try:
@@ -55,130 +237,581 @@ def init_google_sheet():
         if not client:
             return False
         
-        # Открываем таблицу
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
+        # Открываем таблицу (из пула подключений)
+        spreadsheet = _connection_pool.get_spreadsheet()
         
         # Проверяем, есть ли нужный лист
         try:
-            sheet = spreadsheet.worksheet(SHEET_NAME)
+            sheet = _connection_pool.get_worksheet(SHEET_NAME)
         except:
             # Создаём новый лист
             sheet = spreadsheet.add_worksheet(title=SHEET_NAME, rows=1000, cols=20)
+            _connection_pool.forget_worksheet(SHEET_NAME)
             
             # Создаём заголовки
             headers = [
                 "username", "password_hash", "email", "created_at", 
                 "last_login", "role", "tests_completed", 
-                "correct_answers", "total_questions"
+                "correct_answers", "total_questions", "mastery", "compacted_through"
             ]
             sheet.append_row(headers)
         
+        _ensure_answers_sheet()
         return True
     
     except Exception as e:
         st.error(f"❌ Ошибка инициализации таблицы: {e}")
         return False
 
-# ==================== ОСНОВНЫЕ ФУНКЦИИ АУТЕНТИФИКАЦИИ ====================
+_answers_sheet_ready = False
 
-def hash_password(password):
-    """Хеширование пароля для безопасного хранения"""
-    return hashlib.sha256(password.encode()).hexdigest()
+def _ensure_answers_sheet():
+    """Создаёт лист журнала ответов, если его ещё нет (проверка раз на процесс)"""
+    global _answers_sheet_ready
+    if _answers_sheet_ready:
+        return
+    spreadsheet = _connection_pool.get_spreadsheet()
+    try:
+        _connection_pool.get_worksheet(ANSWERS_SHEET_NAME)
+    except Exception:
+        sheet = spreadsheet.add_worksheet(title=ANSWERS_SHEET_NAME, rows=1000, cols=len(ANSWER_FIELDS) + 2)
+        _connection_pool.forget_worksheet(ANSWERS_SHEET_NAME)
+        # Заголовки журнала и отметка свёрнутых строк в G1:H1
+        sheet.update("A1:H1", [ANSWER_FIELDS + ["compacted_rows", 0]])
+    _answers_sheet_ready = True
 
-def load_users():
-    """Загрузка всех пользователей из Google Sheets"""
+# ==================== КЕШ ПОЛЬЗОВАТЕЛЕЙ ====================
+
+def record_to_user(record):
+    """Преобразование строки таблицы в запись пользователя"""
+    return {
+        "password_hash": record.get('password_hash', ''),
+        "email": record.get('email', ''),
+        "created_at": record.get('created_at', ''),
+        "last_login": record.get('last_login', ''),
+        "role": record.get('role', 'student'),
+        "stats": {
+            "tests_completed": int(record.get('tests_completed', 0) or 0),
+            "correct_answers": int(record.get('correct_answers', 0) or 0),
+            "total_questions": int(record.get('total_questions', 0) or 0)
+        },
+        # Матрица освоения элементов в base64 (см. mastery.py)
+        "mastery": record.get('mastery', ''),
+        # Номер строки журнала, до которой ответы уже учтены в счётчиках
+        "compacted_through": int(record.get('compacted_through', 0) or 0)
+    }
+
+def copy_user(user_data):
+    """Копия записи пользователя, чтобы изменения не попадали в кеш"""
+    user_copy = dict(user_data)
+    user_copy["stats"] = dict(user_data.get("stats", {}))
+    return user_copy
+
+def get_users_cache_ttl():
+    """Время жизни кеша пользователей в секундах"""
     try:
-        client = get_gsheet_client()
-        if not client:
-            return {}
-        
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
-        sheet = spreadsheet.worksheet(SHEET_NAME)
-        
-        # Получаем все данные
-        records = sheet.get_all_records()
-        
+        return float(st.secrets.get("users_cache_ttl", USERS_CACHE_TTL))
+    except Exception:
+        return USERS_CACHE_TTL
+
+class UsersCache:
+    """Кеш таблицы пользователей с индексом username → номер строки в листе"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = None
+        self._rows = {}
+        self._loaded_at = 0.0
+
+    def is_fresh(self):
+        return self._users is not None and time.monotonic() - self._loaded_at < get_users_cache_ttl()
+
+    def store_records(self, records):
+        """Заполняет кеш по результату get_all_records()"""
         users = {}
-        for record in records:
+        rows = {}
+        for i, record in enumerate(records, start=2):  # start=2 потому что строка 1 - заголовки
             username = record.get('username', '')
             if username:  # Проверяем, что username не пустой
-                users[username] = {
-                    "password_hash": record.get('password_hash', ''),
-                    "email": record.get('email', ''),
-                    "created_at": record.get('created_at', ''),
-                    "last_login": record.get('last_login', ''),
-                    "role": record.get('role', 'student'),
-                    "stats": {
-                        "tests_completed": int(record.get('tests_completed', 0)),
-                        "correct_answers": int(record.get('correct_answers', 0)),
-                        "total_questions": int(record.get('total_questions', 0))
-                    }
-                }
-        
+                users[username] = record_to_user(record)
+                rows[username] = i
+        with self._lock:
+            self._users = users
+            self._rows = rows
+            self._loaded_at = time.monotonic()
         return users
-    
-    except Exception as e:
-        st.error(f"❌ Ошибка загрузки пользователей: {e}")
-        return {}
 
-def save_user(username, user_data):
-    """Сохранение или обновление пользователя в Google Sheets"""
+    def users(self):
+        with self._lock:
+            return self._users
+
+    def get(self, username):
+        with self._lock:
+            if self._users is None or username not in self._users:
+                return None
+            return copy_user(self._users[username])
+
+    def row_for(self, username):
+        with self._lock:
+            return self._rows.get(username)
+
+    def patch(self, username, user_data, row=None):
+        """Обновляет запись после собственной записи процесса в таблицу"""
+        with self._lock:
+            if self._users is None:
+                return
+            self._users[username] = copy_user(user_data)
+            if row is not None:
+                self._rows[username] = row
+
+    def patch_stats(self, username, stats, mastery=None, compacted_through=None):
+        with self._lock:
+            if self._users is not None and username in self._users:
+                self._users[username]["stats"] = dict(stats)
+                if mastery is not None:
+                    self._users[username]["mastery"] = mastery
+                if compacted_through is not None:
+                    self._users[username]["compacted_through"] = compacted_through
+
+    def invalidate(self):
+        with self._lock:
+            self._users = None
+            self._rows = {}
+
+_users_cache = UsersCache()
+
+def _refresh_users_cache():
+    # Полное чтение листа; возвращает None, если подключения нет
+    if not get_gsheet_client():
+        return None
+    records = run_on_sheet(lambda sheet: sheet.get_all_records())
+    return _users_cache.store_records(records)
+
+def _row_from_append_response(response):
+    # Ответ append_row содержит диапазон вида "'Лист1'!A12:I12"
     try:
-        client = get_gsheet_client()
-        if not client:
-            return False
-        
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
-        sheet = spreadsheet.worksheet(SHEET_NAME)
+        updated_range = response["updates"]["updatedRange"]
+        return int(re.search(r"![A-Z]+(\d+)", updated_range).group(1))
+    except Exception:
+        return None
+
+# ==================== ЖУРНАЛ ОТВЕТОВ ====================
+#
+# Ответы не меняют счётчики напрямую: они копятся в памяти и раз в
+# STATS_FLUSH_INTERVAL секунд дописываются в лист журнала одним append_rows,
+# без предварительного чтения. Раз в ANSWERS_COMPACTION_INTERVAL секунд журнал
+# сворачивается в счётчики G:I листа пользователей. Число свёрнутых строк
+# хранится в ячейке ANSWERS_WATERMARK_CELL листа журнала и записывается тем же
+# values_batch_update, что и счётчики. Кроме того, в строке каждого пользователя
+# (столбец K) записан номер строки журнала, до которой его ответы учтены: если
+# два процесса свернут журнал одновременно или общая отметка отстанет, уже
+# учтённые строки пропускаются и не попадают в счётчики дважды.
+
+def _row_age(row):
+    # Возраст строки журнала в секундах (без разборчивой отметки времени — считается старой)
+    try:
+        return (datetime.now() - datetime.strptime(row[1], "%Y-%m-%d %H:%M:%S")).total_seconds()
+    except (IndexError, TypeError, ValueError):
+        return float("inf")
+
+def _read_watermark():
+    value = run_on_sheet(lambda sheet: sheet.acell(ANSWERS_WATERMARK_CELL).value, title=ANSWERS_SHEET_NAME)
+    return int(value or 0)
+
+def _read_log_tail(watermark):
+    # Строка 1 — заголовки, свёрнутые строки — 2..watermark+1
+    return run_on_sheet(lambda sheet: sheet.get(f"A{watermark + 2}:F"), title=ANSWERS_SHEET_NAME)
+
+class AnswerLog:
+    """Буфер журнала ответов: пакетная дозапись и свёртка в счётчики"""
+
+    def __init__(self, flush_interval, compaction_interval):
+        self.flush_interval = flush_interval
+        self.compaction_interval = compaction_interval
+        self._pending = []
+        # Строки, которые дописываются прямо сейчас
+        self._in_flight = []
+        # Несвёрнутый хвост журнала в таблице: (отметка, [(номер строки, строка)], время чтения);
+        # у строк, дописанных этим процессом после чтения, номер неизвестен (None)
+        self._tail = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._timer = None
+        self._compacted_at = time.monotonic()
+
+    def add(self, rows):
+        """Добавляет строки в очередь и планирует дозапись"""
+        with self._lock:
+            self._pending.extend(rows)
+            self._schedule()
+
+    def _schedule(self):
+        # Вызывается под self._lock
+        if self._timer is None and self._pending:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _restore(self, batch):
+        # Возвращаем недописанные строки в начало очереди, чтобы не потерять их
+        with self._lock:
+            self._in_flight = []
+            self._pending[:0] = batch
+            self._schedule()
+
+    def _tail_rows(self):
+        # Хвост журнала перечитывается не чаще, чем кеш пользователей
+        with self._lock:
+            tail = self._tail
+        if tail is None or time.monotonic() - tail[2] >= get_users_cache_ttl():
+            watermark = _read_watermark()
+            rows = list(enumerate(_read_log_tail(watermark), start=watermark + 1))
+            with self._lock:
+                self._tail = tail = (watermark, rows, time.monotonic())
+        return tail[1]
+
+    def pending_rows_for(self, username, compacted_through=0):
+        """Строки журнала пользователя, ещё не свёрнутые в счётчики (в памяти и в таблице).
+
+        compacted_through — номер строки журнала, до которой ответы пользователя
+        уже учтены в его счётчиках.
+        """
+        try:
+            tail = self._tail_rows()
+        except Exception:
+            tail = []
+        with self._lock:
+            rows = [row for position, row in tail if position is None or position > compacted_through]
+            rows += self._in_flight + self._pending
+        return [row for row in rows if row and row[0] == username]
+
+    def pending_for(self, username, compacted_through=0):
+        """Несвёрнутые приращения счётчиков пользователя"""
+        return fold_answers(self.pending_rows_for(username, compacted_through)).get(
+            username, dict.fromkeys(STATS_FIELDS, 0)
+        )
+
+    def flush(self):
+        """Дописывает накопленные ответы одним append_rows (без чтения таблицы)"""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._pending = self._pending, []
+                self._in_flight = batch
+
+            if batch:
+                try:
+                    if not get_gsheet_client():
+                        self._restore(batch)
+                        return False
+                    _ensure_answers_sheet()
+                    # Без повтора: повторная дозапись могла бы задвоить строки
+                    run_on_sheet(
+                        lambda sheet: sheet.append_rows(batch, value_input_option="RAW"),
+                        retry=False,
+                        title=ANSWERS_SHEET_NAME
+                    )
+                    with self._lock:
+                        self._in_flight = []
+                        if self._tail is not None:
+                            self._tail = (self._tail[0], self._tail[1] + [(None, row) for row in batch], self._tail[2])
+
+                except Exception:
+                    # Запись идёт в фоновом потоке таймера: ошибку видно только в логе сервера
+                    logger.exception("Ошибка записи журнала ответов; строк возвращено в очередь: %d", len(batch))
+                    self._restore(batch)
+                    return False
+
+        if time.monotonic() - self._compacted_at >= self.compaction_interval:
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("Ошибка свёртки журнала ответов")
+        return True
+
+    def compact(self):
+        """Сворачивает несвёрнутые строки журнала в счётчики листа пользователей.
+
+        Возвращает число свёрнутых строк.
+        """
+        with self._compact_lock:
+            self._compacted_at = time.monotonic()
+            if not get_gsheet_client():
+                return 0
+            _ensure_answers_sheet()
+            watermark = _read_watermark()
+            rows = _read_log_tail(watermark)
+            if not rows:
+                return 0
+
+            # Свежее чтение заодно обновляет кеш пользователей и индекс строк
+            users = _refresh_users_cache() or {}
+            end = watermark + len(rows)
+            # Отметка сдвигается только за строки, которые учтены в счётчиках:
+            # строки пользователя, которого (пока) нет в листе, остаются в хвосте
+            applied_through = end
+            rows_by_user = {}
+            dropped = 0
+            for position, row in enumerate(rows, start=watermark + 1):
+                if not row or not row[0]:
+                    continue
+                username = row[0]
+                if username not in users or _users_cache.row_for(username) is None:
+                    if _row_age(row) < ANSWERS_ORPHAN_TTL:
+                        applied_through = min(applied_through, position - 1)
+                    else:
+                        dropped += 1
+                    continue
+                # Строки до отметки пользователя уже учтены в его счётчиках
+                if position > users[username]["compacted_through"]:
+                    rows_by_user.setdefault(username, []).append(row)
+
+            new_stats = {}
+            new_mastery = {}
+            # Заголовки столбцов матрицы освоения и отметки пользователя (для листов, созданных до их появления)
+            data = [{"range": f"'{SHEET_NAME}'!J1:K1", "values": [["mastery", "compacted_through"]]}]
+            for username, user_rows in rows_by_user.items():
+                row_index = _users_cache.row_for(username)
+                deltas = fold_answers(user_rows)[username]
+                stats = users[username]["stats"]
+                new_stats[username] = {field: stats[field] + deltas[field] for field in STATS_FIELDS}
+                new_mastery[username] = Mastery.decode(users[username].get("mastery", "")).apply_rows(
+                    user_rows
+                ).encode()
+                # Счётчики, матрица и отметка пользователя — одна строка G:K
+                data.append({
+                    "range": f"'{SHEET_NAME}'!G{row_index}:K{row_index}",
+                    "values": [[str(new_stats[username][field]) for field in STATS_FIELDS]
+                               + [new_mastery[username], end]]
+                })
+            if not new_stats and applied_through == watermark:
+                return 0
+
+            # Если за время свёртки отметку сдвинул другой процесс — пропускаем этот раз
+            if _read_watermark() != watermark:
+                return 0
+            data.append({
+                "range": f"'{ANSWERS_SHEET_NAME}'!{ANSWERS_WATERMARK_CELL}",
+                "values": [[applied_through]]
+            })
+            # Счётчики и отметка записываются одним запросом
+            _connection_pool.get_spreadsheet().values_batch_update(
+                {"valueInputOption": "RAW", "data": data}
+            )
+            if dropped:
+                logger.warning("Свёртка журнала: отброшено строк пользователей, которых нет в листе: %d", dropped)
+            with self._lock:
+                for username, stats in new_stats.items():
+                    _users_cache.patch_stats(username, stats, new_mastery[username], end)
+                self._tail = (
+                    applied_through,
+                    list(enumerate(rows[applied_through - watermark:], start=applied_through + 1)),
+                    time.monotonic()
+                )
+            return sum(len(user_rows) for user_rows in rows_by_user.values())
+
+_answer_log = AnswerLog(STATS_FLUSH_INTERVAL, ANSWERS_COMPACTION_INTERVAL)
+
+# ==================== ХРАНИЛИЩЕ В GOOGLE SHEETS ====================
+
+class GoogleSheetsUserStore(UserStore):
+    """Пользователи в Google Таблице: кеш чтения и журнал ответов вместо перезаписи статистики"""
+
+    def __init__(self, sheets_url=""):
+        # У локального сервера свой идентификатор: отметка о демо-пользователе не должна переходить на Google
+        self.store_id = f"gsheets:{SPREADSHEET_ID}:{SHEET_NAME}" + (f"@{sheets_url}" if sheets_url else "")
+
+    def init(self):
+        return init_google_sheet()
+
+    def load_users(self, force=False):
+        """Загрузка всех пользователей из Google Sheets (с кешированием на USERS_CACHE_TTL секунд)"""
+        try:
+            if force or not _users_cache.is_fresh():
+                if _refresh_users_cache() is None:
+                    return {}
         
-        # Получаем все данные для поиска пользователя
-        records = sheet.get_all_records()
-        user_found = False
-        row_index = None
+            users = _users_cache.users() or {}
+            return {username: copy_user(user_data) for username, user_data in users.items()}
+    
+        except Exception as e:
+            st.error(f"❌ Ошибка загрузки пользователей: {e}")
+            return {}
+
+    def get_user(self, username, force=False):
+        """Запись одного пользователя из кеша (или None, если пользователя нет)"""
+        try:
+            if force or not _users_cache.is_fresh():
+                if _refresh_users_cache() is None:
+                    return None
+            return _users_cache.get(username)
+    
+        except Exception as e:
+            st.error(f"❌ Ошибка загрузки пользователей: {e}")
+            return None
+
+    def save_user(self, username, user_data):
+        """Сохранение или обновление пользователя в Google Sheets"""
+        try:
+            if not get_gsheet_client():
+                return False
         
-        # Ищем пользователя
-        for i, record in enumerate(records, start=2):  # start=2 потому что строка 1 - заголовки
-            if record.get('username') == username:
-                user_found = True
-                row_index = i
-                break
+            # Номер строки берём из индекса; если пользователя там нет — перечитываем лист,
+            # чтобы не создать дубликат пользователя, добавленного другим процессом
+            row_index = _users_cache.row_for(username)
+            if row_index is None:
+                _refresh_users_cache()
+                row_index = _users_cache.row_for(username)
         
-        # Подготавливаем данные для записи
-        row_data = [
-            username,
-            user_data.get("password_hash", ""),
-            user_data.get("email", ""),
-            user_data.get("created_at", ""),
-            user_data.get("last_login", ""),
-            user_data.get("role", "student"),
-            str(user_data.get("stats", {}).get("tests_completed", 0)),
-            str(user_data.get("stats", {}).get("correct_answers", 0)),
-            str(user_data.get("stats", {}).get("total_questions", 0))
-        ]
+            # Подготавливаем данные для записи
+            row_data = [
+                username,
+                user_data.get("password_hash", ""),
+                user_data.get("email", ""),
+                user_data.get("created_at", ""),
+                user_data.get("last_login", ""),
+                user_data.get("role", "student"),
+                str(user_data.get("stats", {}).get("tests_completed", 0)),
+                str(user_data.get("stats", {}).get("correct_answers", 0)),
+                str(user_data.get("stats", {}).get("total_questions", 0)),
+                user_data.get("mastery", "")
+            ]
         
-        if user_found and row_index:
-            # Обновляем существующего пользователя
-            sheet.update(f"A{row_index}:I{row_index}", [row_data])
-        else:
-            # Добавляем нового пользователя
-            sheet.append_row(row_data)
+            if row_index:
+                # Обновляем существующего пользователя сразу в строке N; счётчики G:I
+                # не трогаем — их меняет только свёртка журнала ответов
+                run_on_sheet(lambda sheet: sheet.update(f"A{row_index}:F{row_index}", [row_data[:6]]))
+                cached = _users_cache.get(username)
+                if cached is not None:
+                    user_data = dict(
+                        user_data, stats=cached["stats"], mastery=cached.get("mastery", ""),
+                        compacted_through=cached.get("compacted_through", 0)
+                    )
+                _users_cache.patch(username, user_data)
+            else:
+                # Добавляем нового пользователя (без повтора, чтобы не задвоить строку)
+                response = run_on_sheet(lambda sheet: sheet.append_row(row_data), retry=False)
+                new_row = _row_from_append_response(response)
+                if new_row is not None:
+                    _users_cache.patch(username, user_data, new_row)
+                else:
+                    _users_cache.invalidate()
         
-        return True
+            return True
     
+        except Exception as e:
+            _users_cache.invalidate()
+            st.error(f"❌ Ошибка сохранения пользователя: {e}")
+            return False
+
+    def log_answers(self, username, answers, tests_completed=0):
+        _answer_log.add(answer_rows(username, answers, tests_completed))
+
+    def compact(self):
+        return _answer_log.compact()
+
+    def get_stats(self, username, user_data=None):
+        """Счётчики из таблицы плюс ещё не свёрнутые ответы из журнала"""
+        if user_data is None:
+            user_data = self.get_user(username)
+        if user_data is None:
+            return None
+        stats = dict(user_data["stats"])
+        pending = _answer_log.pending_for(username, user_data.get("compacted_through", 0))
+        for field in STATS_FIELDS:
+            stats[field] += pending[field]
+        return stats
+
+    def get_mastery(self, username, user_data=None):
+        """Матрица освоения из таблицы плюс ещё не свёрнутые ответы из журнала"""
+        if user_data is None:
+            user_data = self.get_user(username)
+        if user_data is None:
+            return None
+        return Mastery.decode(user_data.get("mastery", "")).apply_rows(
+            _answer_log.pending_rows_for(username, user_data.get("compacted_through", 0))
+        )
+
+    def flush(self):
+        return _answer_log.flush()
+
+# ==================== ВЫБОР ХРАНИЛИЩА ====================
+
+_user_store = None
+_user_store_lock = threading.Lock()
+
+def _user_store_settings():
+    # Секция [user_store] в Secrets имеет приоритет над переменными окружения
+    settings = {
+        "backend": os.environ.get("USER_STORE_BACKEND", DEFAULT_USER_STORE),
+        "path": os.environ.get("USER_STORE_PATH", DEFAULT_SQLITE_PATH),
+        # Другой адрес Sheets API, например локальный fake_sheets_server.py (пусто — настоящий API)
+        "sheets_url": os.environ.get("USER_STORE_SHEETS_URL", "")
+    }
+    try:
+        if "user_store" in st.secrets:
+            settings.update(dict(st.secrets["user_store"]))
+    except Exception:
+        pass
+    return settings
+
+def get_user_store():
+    """Хранилище пользователей процесса (создаётся один раз по настройкам)"""
+    global _user_store
+    with _user_store_lock:
+        if _user_store is None:
+            settings = _user_store_settings()
+            backend = str(settings["backend"]).lower()
+            if backend == "sqlite":
+                _user_store = SQLiteUserStore(settings["path"])
+            elif backend == "gsheets":
+                _connection_pool.use_endpoint(settings["sheets_url"])
+                _user_store = GoogleSheetsUserStore(settings["sheets_url"])
+            else:
+                raise ValueError(f"Неизвестное хранилище пользователей: {backend}")
+        return _user_store
+
+# ==================== ОСНОВНЫЕ ФУНКЦИИ АУТЕНТИФИКАЦИИ ====================
+
+def hash_password(password):
+    """Хеширование пароля для безопасного хранения"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def load_users(force=False):
+    """Загрузка всех пользователей из хранилища"""
+    try:
+        return get_user_store().load_users(force)
+    except Exception as e:
+        st.error(f"❌ Ошибка загрузки пользователей: {e}")
+        return {}
+
+def get_user(username, force=False):
+    """Запись одного пользователя (или None, если пользователя нет)"""
+    try:
+        return get_user_store().get_user(username, force)
+    except Exception as e:
+        st.error(f"❌ Ошибка загрузки пользователей: {e}")
+        return None
+
+def save_user(username, user_data):
+    """Сохранение или обновление пользователя в хранилище"""
+    try:
+        return get_user_store().save_user(username, user_data)
     except Exception as e:
         st.error(f"❌ Ошибка сохранения пользователя: {e}")
         return False
 
 def register_user(username, password, email=""):
     """Регистрация нового пользователя"""
-    # Инициализируем таблицу при первой регистрации
-    if not init_google_sheet():
+    # Инициализируем хранилище при первой регистрации
+    if not get_user_store().init():
         return False, "Не удалось инициализировать базу данных"
     
-    users = load_users()
-    
-    # Проверки
-    if username in users:
+    # Проверки (get_user с force=True видит пользователей, созданных в других процессах)
+    if get_user(username, force=True) is not None:
         return False, "Пользователь с таким именем уже существует"
     
     if len(username) < 3:
@@ -201,7 +834,7 @@ def register_user(username, password, email=""):
         }
     }
     
-    # Сохраняем в Google Sheets
+    # Сохраняем в хранилище
     if save_user(username, user_data):
         return True, "Регистрация успешна!"
     else:
@@ -209,35 +842,67 @@ def register_user(username, password, email=""):
 
 def login_user(username, password):
     """Авторизация пользователя"""
-    users = load_users()
+    # Демо-пользователь создаётся при первой попытке войти под ним
+    if username == "demo":
+        ensure_demo_user()
+    
+    user_data = get_user(username)
     
-    if username not in users:
+    if user_data is None:
         return False, "Пользователь не найден"
     
-    if users[username]["password_hash"] != hash_password(password):
+    if user_data["password_hash"] != hash_password(password):
         return False, "Неверный пароль"
     
     # Обновляем время последнего входа
-    users[username]["last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    save_user(username, users[username])
+    user_data["last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    save_user(username, user_data)
     
     return True, "Авторизация успешна"
 
-def get_user_stats(username):
-    """Получение статистики пользователя"""
-    users = load_users()
-    if username in users:
-        return users[username]["stats"]
-    return None
-
-def update_user_stats(username, correct_answers, total_questions):
-    """Обновление статистики пользователя"""
-    users = load_users()
-    if username in users:
-        users[username]["stats"]["tests_completed"] += 1
-        users[username]["stats"]["correct_answers"] += correct_answers
-        users[username]["stats"]["total_questions"] += total_questions
-        save_user(username, users[username])
+def get_user_stats(username, user_data=None):
+    """Получение статистики пользователя (с учётом ещё не записанных ответов).
+
+    user_data — уже загруженная запись пользователя (профиль не читает её второй раз).
+    """
+    try:
+        return get_user_store().get_stats(username, user_data)
+    except Exception as e:
+        st.error(f"❌ Ошибка загрузки статистики: {e}")
+        return None
+
+def get_user_mastery(username, user_data=None):
+    """Матрица освоения элементов пользователя (Mastery) или None"""
+    try:
+        return get_user_store().get_mastery(username, user_data)
+    except Exception as e:
+        st.error(f"❌ Ошибка загрузки статистики: {e}")
+        return None
+
+def log_user_answers(username, answers, tests_completed=0):
+    """Запись ответов пользователя в журнал.
+
+    answers — список (element, level, correct); tests_completed — сколько тестов
+    завершено этим пакетом: 1 для экзамена, 0 для ответов в режиме тренировки.
+    """
+    try:
+        get_user_store().log_answers(username, answers, tests_completed)
+    except Exception as e:
+        st.error(f"❌ Ошибка сохранения статистики: {e}")
+
+def flush_user_stats():
+    """Немедленная запись накопленных ответов в хранилище"""
+    if _user_store is None:
+        return True
+    return _user_store.flush()
+
+def compact_user_stats():
+    """Свёртка журнала ответов в счётчики (обычно выполняется автоматически)"""
+    flush_user_stats()
+    return get_user_store().compact()
+
+# При остановке процесса дописываем всё, что осталось в очереди
+atexit.register(flush_user_stats)
 
 # ==================== ИНТЕРФЕЙСНЫЕ ФУНКЦИИ ====================
 
@@ -272,7 +937,7 @@ def show_login_page():
                     if success:
                         st.session_state["logged_in"] = True
                         st.session_state["username"] = login_username
-                        st.session_state["user_role"] = load_users().get(login_username, {}).get("role", "student")
+                        st.session_state["user_role"] = (get_user(login_username) or {}).get("role", "student")
                         st.success(message)
                         st.rerun()
                     else:
@@ -328,46 +993,62 @@ def show_user_profile():
         return
     
     with st.sidebar:
-        st.markdown("---")
-        st.subheader(f"👤 {st.session_state['username']}")
+        _show_profile()
+
+#Профиль — отдельный фрагмент: перезапуски таблицы и теста не перечитывают
+#данные пользователя, а профиль обновляется при полном перезапуске страницы
+@fragment
+def _show_profile():
+    st.markdown("---")
+    st.subheader(f"👤 {st.session_state['username']}")
+    
+    if st.session_state["username"] != "Гость" and st.session_state["username"] != "demo":
+        # Запись читается один раз; статистика и матрица освоения берутся из неё
+        user_data = get_user(st.session_state["username"]) or {}
+        stats = (get_user_stats(st.session_state["username"], user_data) if user_data else None) or {}
         
-        if st.session_state["username"] != "Гость" and st.session_state["username"] != "demo":
-            users = load_users()
-            user_data = users.get(st.session_state["username"], {})
-            stats = user_data.get("stats", {})
+        if user_data:
+            st.caption(f"Роль: {user_data.get('role', 'student')}")
+            if user_data.get('created_at'):
+                st.caption(f"Зарегистрирован: {user_data['created_at'].split()[0]}")
             
-            if user_data:
-                st.caption(f"Роль: {user_data.get('role', 'student')}")
-                if user_data.get('created_at'):
-                    st.caption(f"Зарегистрирован: {user_data['created_at'].split()[0]}")
+            st.markdown("**📊 Статистика:**")
+            # После ошибки чтения статистики stats пуст — показываем заглушку, а не KeyError
+            if stats.get("total_questions", 0) > 0:
+                percentage = (stats["correct_answers"] / stats["total_questions"]) * 100
+                st.metric("Правильных ответов", f"{stats['correct_answers']}/{stats['total_questions']}")
+                st.metric("Успеваемость", f"{percentage:.1f}%")
+                st.metric("Тестов пройдено", stats["tests_completed"])
                 
-                st.markdown("**📊 Статистика:**")
-                if stats["total_questions"] > 0:
-                    percentage = (stats["correct_answers"] / stats["total_questions"]) * 100
-                    st.metric("Правильных ответов", f"{stats['correct_answers']}/{stats['total_questions']}")
-                    st.metric("Успеваемость", f"{percentage:.1f}%")
-                    st.metric("Тестов пройдено", stats["tests_completed"])
-                else:
-                    st.info("Статистика пока недоступна")
+                # Элементы с наименьшей долей правильных ответов
+                mastery = get_user_mastery(st.session_state["username"], user_data)
+                weakest = mastery.weakest(limit=5) if mastery else []
+                if weakest:
+                    st.markdown("**🧠 Повторить:**")
+                    for symbol, attempts, correct in weakest:
+                        st.caption(f"{symbol}: {correct}/{attempts} правильно")
             else:
-                st.info("Данные профиля загружаются...")
-        
-        elif st.session_state["username"] == "demo":
-            st.warning("🧪 **Демо-режим**")
-            st.info("Статистика не сохраняется")
-        
-        if st.button("🚪 Выйти"):
-            for key in ["logged_in", "username", "user_role"]:
-                if key in st.session_state:
-                    del st.session_state[key]
-            st.rerun()
+                st.info("Статистика пока недоступна")
+        else:
+            st.info("Данные профиля загружаются...")
+    
+    elif st.session_state["username"] == "demo":
+        st.warning("🧪 **Демо-режим**")
+        st.info("Статистика не сохраняется")
+    
+    if st.button("🚪 Выйти"):
+        # Перед выходом записываем накопленную статистику
+        flush_user_stats()
+        for key in ["logged_in", "username", "user_role"]:
+            if key in st.session_state:
+                del st.session_state[key]
+        st.rerun()
 
 # ==================== ИНИЦИАЛИЗАЦИЯ ДЕМО-ПОЛЬЗОВАТЕЛЯ ====================
 
 def init_demo_user():
     """Создаёт демо-пользователя при первом запуске"""
-    users = load_users()
-    if "demo" not in users:
+    if get_user("demo") is None:
         demo_data = {
             "password_hash": hash_password("demo"),
             "email": "demo@chemistry-app.com",
@@ -382,5 +1063,34 @@ def init_demo_user():
         }
         save_user("demo", demo_data)
 
-# Инициализируем демо-пользователя при импорте модуля
-init_demo_user()
+_demo_lock = threading.Lock()
+_demo_ready = set()
+
+def _read_demo_marker():
+    try:
+        with open(DEMO_MARKER_FILE, 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+def _write_demo_marker(store_ids):
+    try:
+        with open(DEMO_MARKER_FILE, 'w', encoding='utf-8') as f:
+            json.dump(sorted(store_ids), f)
+    except OSError:
+        pass  # Без отметки проверка просто повторится в следующем процессе
+
+def ensure_demo_user():
+    """Создаёт демо-пользователя один раз на хранилище (не при импорте модуля)"""
+    store_id = get_user_store().store_id
+    with _demo_lock:
+        if store_id in _demo_ready:
+            return
+        done = _read_demo_marker()
+        if store_id not in done:
+            init_demo_user()
+            if get_user("demo") is None:
+                return  # Не получилось — попробуем при следующем входе
+            done.add(store_id)
+            _write_demo_marker(done)
+        _demo_ready.add(store_id)
@@ -0,0 +1,81 @@
+"""Стоимость одного вопроса в адаптивном выборе при разных размерах пула.
+
+Запуск из корня проекта:
+    python benchmarks/bench_adaptive_selector.py --questions 20000
+
+Для каждого размера пула измеряется цикл "выбрать вопрос + учесть ответ":
+  fenwick  — AdaptiveSelector (дерево Фенвика, O(log n) на вопрос)
+  naive    — random.choices по списку весов (O(n) на вопрос), для сравнения
+
+Время на вопрос для fenwick почти не зависит от размера пула, для naive растёт линейно.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from adaptive_selector import AdaptiveSelector  # noqa: E402
+
+
+def run_fenwick(size, questions, rng):
+    selector = AdaptiveSelector(size)
+    # "Ученик" ошибается на каждом седьмом вопросе пула
+    start = time.perf_counter()
+    for _ in range(questions):
+        index = selector.draw(rng)
+        selector.record(index, index % 7 != 0)
+    return (time.perf_counter() - start) / questions
+
+
+def run_naive(size, questions, rng):
+    attempts = [0] * size
+    errors = [0] * size
+    weights = [0.5] * size
+    population = range(size)
+    start = time.perf_counter()
+    for _ in range(questions):
+        index = rng.choices(population, weights)[0]
+        attempts[index] += 1
+        errors[index] += index % 7 == 0
+        weights[index] = (errors[index] + 1) / (attempts[index] + 2)
+    return (time.perf_counter() - start) / questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="118,1000,10000,100000")
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--naive-questions", type=int, default=500,
+                        help="вопросов для наивного варианта (он медленный на больших пулах)")
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    results = []
+    print(f"{'пул':>8} {'fenwick, мкс':>14} {'naive, мкс':>12}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        fenwick = run_fenwick(size, args.questions, rng) * 1e6
+        naive = run_naive(size, args.naive_questions, rng) * 1e6
+        results.append({"size": size, "fenwick_us": fenwick, "naive_us": naive})
+        print(f"{size:8} {fenwick:14.2f} {naive:12.2f}")
+
+    # Проверка: распределение следует весам (ошибочные вопросы выпадают чаще)
+    selector = AdaptiveSelector(50, window=0)
+    for index in range(50):
+        selector.record(index, index >= 5)
+    hits = sum(selector.draw(rng) < 5 for _ in range(20000))
+    expected = 5 * (2 / 3) / (5 * (2 / 3) + 45 * (1 / 3))
+    print(f"Доля вопросов с ошибками: {hits / 20000:.3f} (ожидается {expected:.3f})")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
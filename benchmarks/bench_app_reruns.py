@@ -0,0 +1,242 @@
+"""Перезапуски приложения по режимам без браузера: время, дельты, байты, память.
+
+Запуск из корня проекта:
+    python benchmarks/bench_app_reruns.py --repeat 5 --output reruns.json
+    python benchmarks/bench_app_reruns.py --output after.json --compare before.json
+
+Приложение выполняется через streamlit.testing.v1.AppTest. Авторизация
+заменена заглушкой: хранилище пользователей — SQLite во временном каталоге
+(USER_STORE_BACKEND=sqlite), пользователь создаётся в нём заранее, а вход —
+это готовые значения logged_in / username в st.session_state. Google Sheets
+и сеть не используются.
+
+Сценарии:
+  cold load         — первый проход main() после очистки st.cache_resource / st.cache_data
+  warm load         — полный проход новой сессии при заполненных кешах
+  element click     — щелчок по кнопке ячейки (режим "Кнопки в ячейках")
+  element select    — выбор элемента в быстром режиме (selectbox)
+  new question      — кнопка "Новый вопрос"
+  answer check      — кнопка "Проверить ответ"
+
+Для каждого сценария записываются время прохода (медиана и минимум), число
+дельт и суммарный размер сообщений ForwardMsg (ByteSize), а также пик памяти и
+число блоков, выделенных за проход, по tracemalloc. Память измеряется отдельным
+проходом, чтобы трассировка не искажала время. AppTest не поддерживает
+частичные перезапуски: взаимодействия внутри фрагментов выполняют весь скрипт.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1 import app_test  # noqa: E402
+
+USERNAME = "benchmark"
+CELLS = ["btn_Fe_3_7", "btn_Cu_3_10", "btn_O_1_15", "btn_Na_2_0", "btn_Au_5_10"]
+SYMBOLS = ["Fe", "Cu", "O", "Na", "Au"]
+
+# Сообщения последнего прохода: AppTest разбирает их в дерево элементов и не сохраняет
+_messages = []
+
+
+class _RecordingRunner(app_test.LocalScriptRunner):
+    def run(self, *args, **kwargs):
+        tree = super().run(*args, **kwargs)
+        _messages[:] = self.forward_msgs()
+        return tree
+
+
+app_test.LocalScriptRunner = _RecordingRunner
+
+
+def create_user(path):
+    sys.path.insert(0, PROJECT_DIR)
+    from user_store import SQLiteUserStore
+    store = SQLiteUserStore(path)
+    store.init()
+    store.save_user(USERNAME, {
+        "password_hash": "", "email": "", "created_at": "2024-01-01 00:00:00",
+        "last_login": "2024-01-01 00:00:00", "role": "student",
+        "stats": {"tests_completed": 0, "correct_answers": 0, "total_questions": 0}
+    })
+
+
+class Scenario:
+    """Сценарий: prepare(at) готовит сессию, act(at, i) — действие перед измеряемым проходом"""
+
+    def __init__(self, name, act, prepare=None, fresh=False, clear_caches=False):
+        self.name = name
+        self.act = act
+        self.prepare = prepare
+        self.fresh = fresh
+        self.clear_caches = clear_caches
+
+
+def _radio(at, label, value):
+    next(radio for radio in at.radio if radio.label == label).set_value(value)
+    at.run()
+
+
+def _button(at, label):
+    return next(button for button in at.button if button.label == label)
+
+
+def _quiz(at):
+    _radio(at, "**Выберите режим:**", "🎯 Проверка знаний")
+
+
+SCENARIOS = [
+    Scenario("cold load", lambda at, i: None, fresh=True, clear_caches=True),
+    Scenario("warm load", lambda at, i: None, fresh=True),
+    Scenario(
+        "element click",
+        lambda at, i: at.button(key=CELLS[i % len(CELLS)]).click(),
+        prepare=lambda at: _radio(at, "**🎨 Отображение таблицы:**", "🖱️ Кнопки в ячейках")
+    ),
+    Scenario(
+        "element select",
+        lambda at, i: at.selectbox(key="element_picker").set_value(SYMBOLS[i % len(SYMBOLS)]),
+        prepare=lambda at: _radio(at, "**🎨 Отображение таблицы:**", "⚡ Быстрое")
+    ),
+    Scenario("new question", lambda at, i: _button(at, "🎲 Новый вопрос").click(), prepare=_quiz),
+    Scenario(
+        "answer check",
+        lambda at, i: (_button(at, "🎲 Новый вопрос").click(), at.run(), _button(at, "✅ Проверить ответ").click()),
+        prepare=_quiz
+    )
+]
+
+
+class Runner:
+    def __init__(self, app, timeout):
+        self.app = app
+        self.timeout = timeout
+
+    def new_session(self):
+        at = AppTest.from_file(self.app, default_timeout=self.timeout)
+        at.session_state["logged_in"] = True
+        at.session_state["username"] = USERNAME
+        at.session_state["user_role"] = "student"
+        return at
+
+    def measured_run(self, at, trace):
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        memory = {}
+        if trace:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            memory = {
+                "alloc_peak_kb": peak / 1024,
+                "alloc_blocks": sum(stat.count for stat in snapshot.statistics("filename"))
+            }
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        deltas = sum(1 for message in _messages if message.WhichOneof("type") == "delta")
+        size = sum(message.ByteSize() for message in _messages)
+        return elapsed, deltas, size, memory
+
+    def scenario(self, scenario, repeat):
+        runs = []
+        at = None
+        # Последний повтор — с трассировкой памяти
+        for i in range(repeat + 1):
+            trace = i == repeat
+            if scenario.clear_caches:
+                st.cache_resource.clear()
+                st.cache_data.clear()
+            if at is None or scenario.fresh:
+                at = self.new_session()
+                if not scenario.fresh:
+                    at.run()
+                    if scenario.prepare:
+                        scenario.prepare(at)
+            scenario.act(at, i)
+            runs.append(self.measured_run(at, trace))
+
+        timed = [elapsed for elapsed, _, _, _ in runs[:-1]]
+        _, deltas, size, memory = runs[-1]
+        return dict({
+            "wall_ms_median": statistics.median(timed) * 1000,
+            "wall_ms_min": min(timed) * 1000,
+            "deltas": deltas,
+            "bytes": size
+        }, **memory)
+
+
+def _commit(app):
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(app),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=os.path.join(PROJECT_DIR, "main.py"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--scenarios", help="через запятую, по умолчанию все")
+    parser.add_argument("--output", help="записать результаты в JSON")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    args = parser.parse_args()
+
+    app = os.path.abspath(args.app)
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["USER_STORE_BACKEND"] = "sqlite"
+        os.environ["USER_STORE_PATH"] = os.path.join(directory, "users.db")
+        create_user(os.environ["USER_STORE_PATH"])
+        # Приложение читает данные относительно текущего каталога
+        os.chdir(os.path.dirname(app))
+        runner = Runner(app, args.timeout)
+        for scenario in SCENARIOS:
+            if selected is None or scenario.name in selected:
+                results[scenario.name] = runner.scenario(scenario, args.repeat)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)["scenarios"]
+
+    print(f"{'сценарий':<16} {'медиана, мс':>12} {'мин, мс':>9} {'дельт':>6} {'байт':>8} {'пик, КБ':>8} {'блоков':>8}"
+          + (f" {'было, мс':>9}" if previous else ""))
+    for name, result in results.items():
+        line = (f"{name:<16} {result['wall_ms_median']:12.1f} {result['wall_ms_min']:9.1f} {result['deltas']:6} "
+                f"{result['bytes']:8} {result['alloc_peak_kb']:8.0f} {result['alloc_blocks']:8}")
+        if name in previous:
+            line += f" {previous[name]['wall_ms_median']:9.1f}"
+        print(line)
+
+    if args.output:
+        report = {
+            "commit": _commit(app),
+            "streamlit": st.__version__,
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "scenarios": results
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
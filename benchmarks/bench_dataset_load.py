@@ -0,0 +1,88 @@
+"""Сравнение загрузки chemical_elements.json и скомпилированного двоичного кеша.
+
+Запуск из корня проекта:
+    python benchmarks/bench_dataset_load.py --repeat 200
+
+Сценарии:
+  json.load              — разбор исходного JSON (холодный старт без кеша)
+  st.cache_data hit      — pickle.loads словаря (так st.cache_data отдаёт результат на каждом перезапуске)
+  compile                — сборка двоичного файла из уже разобранного JSON
+  compiled: open+decode  — mmap готового файла и декодирование всех 118 элементов
+  compiled: open only    — mmap и разбор заголовка (декодирование по требованию)
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from element_compiler import compile_elements, load_compiled_elements, CompiledElements  # noqa: E402
+
+ELEMENTS_FILE = os.path.join(PROJECT_DIR, "chemical_elements.json")
+
+
+def measure(name, function, repeat):
+    function()  # прогрев
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    per_call_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"{name:28} {per_call_ms:9.3f} мс")
+    return per_call_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(workdir, "chemical_elements.json")
+        shutil.copy2(ELEMENTS_FILE, json_path)
+        cache_path = os.path.join(workdir, "chemical_elements.bin")
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        pickled = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        compiled = load_compiled_elements(json_path, cache_path)
+        assert compiled.to_dict() == data, "скомпилированные данные отличаются от JSON"
+
+        def load_json():
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        print(f"JSON: {os.path.getsize(json_path)} байт, pickle: {len(pickled)} байт, "
+              f"двоичный кеш: {os.path.getsize(cache_path)} байт")
+        results = {
+            "json_load": measure("json.load", load_json, args.repeat),
+            "cache_data_hit": measure("st.cache_data hit (pickle)", lambda: pickle.loads(pickled), args.repeat),
+            "compile": measure("compile", lambda: compile_elements(data), args.repeat),
+            "compiled_decode": measure(
+                "compiled: open+decode",
+                lambda: load_compiled_elements(json_path, cache_path).to_dict(),
+                args.repeat
+            ),
+            "compiled_open": measure(
+                "compiled: open only",
+                lambda: load_compiled_elements(json_path, cache_path),
+                args.repeat
+            )
+        }
+        blob = compile_elements(data)
+        results["decode_in_memory"] = measure(
+            "compiled: decode (bytes)", lambda: CompiledElements(blob).to_dict(), args.repeat
+        )
+        print(f"Ускорение холодной загрузки: x{results['json_load'] / results['compiled_decode']:.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
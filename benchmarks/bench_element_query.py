@@ -0,0 +1,85 @@
+"""Запросы по свойствам: битовые маски против обхода вложенных данных элементов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_element_query.py --repeat 20000
+
+Для каждого запроса сравнивается:
+  bitset — ElementBitsets.mask (операции над целыми числами)
+  loop   — проход по всем элементам с разбором полей на каждый запрос
+Результаты обоих способов сверяются.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from element_categories import add_categories  # noqa: E402
+from element_index import ElementIndex  # noqa: E402
+from element_store import freeze_elements  # noqa: E402
+from element_query import (  # noqa: E402
+    ElementBitsets, Has, Between, VALENCY, OXIDATION_STATE, OXIDE_CHARACTER, CATEGORY, PERIOD,
+    NUMBER, MASS, AMPHOTERIC, ACIDIC, oxide_character, period_and_group
+)
+
+QUERIES = {
+    "валентность IV И амфотерный оксид": (
+        Has(VALENCY, "IV") & Has(OXIDE_CHARACTER, AMPHOTERIC),
+        lambda e: "IV" in e[VALENCY] and oxide_character(e) == AMPHOTERIC
+    ),
+    "(+6 ИЛИ +7) И кислотный оксид": (
+        (Has(OXIDATION_STATE, "+6") | Has(OXIDATION_STATE, "+7")) & Has(OXIDE_CHARACTER, ACIDIC),
+        lambda e: ("+6" in e[OXIDATION_STATE] or "+7" in e[OXIDATION_STATE]) and oxide_character(e) == ACIDIC
+    ),
+    "4-й период И НЕ переходный металл": (
+        Has(PERIOD, 4) & ~Has(CATEGORY, "Переходный металл"),
+        lambda e: period_and_group(e[NUMBER])[0] == 4 and e[CATEGORY] != "Переходный металл"
+    ),
+    "номер 20–60 И масса 50–100": (
+        Between(NUMBER, 20, 60) & Between(MASS, 50, 100),
+        lambda e: 20 <= e[NUMBER] <= 60 and 50 <= float(e[MASS]) <= 100
+    )
+}
+
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    with open(os.path.join(PROJECT_DIR, "chemical_elements.json"), encoding="utf-8") as f:
+        index = ElementIndex(freeze_elements(add_categories(json.load(f))))
+
+    start = time.perf_counter()
+    bitsets = ElementBitsets(index)
+    print(f"Построение масок: {(time.perf_counter() - start) * 1000:.2f} мс")
+
+    results = []
+    print(f"{'запрос':<38} {'найдено':>7} {'bitset, мкс':>12} {'loop, мкс':>10}")
+    for name, (query, predicate) in QUERIES.items():
+        loop = lambda: tuple(symbol for symbol in index.symbols if predicate(index.get(symbol)))  # noqa: E731
+        assert bitsets.select(query) == loop(), name
+        bitset_time = measure(lambda: bitsets.mask(query), args.repeat) * 1e6
+        loop_time = measure(loop, max(args.repeat // 100, 1)) * 1e6
+        found = len(bitsets.select(query))
+        results.append({"query": name, "found": found, "bitset_us": bitset_time, "loop_us": loop_time})
+        print(f"{name:<38} {found:7} {bitset_time:12.2f} {loop_time:10.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Уравнивание реакций: точный путь (Fraction), быстрый путь NumPy, кеш и пакеты.
+
+Запуск из корня проекта:
+    python benchmarks/bench_equation_balancer.py --species 4,10,12,16,20 --batch 400
+
+Сценарии:
+  exact / numpy  — время решения одного уравнения из N веществ каждым способом
+                   (реакции генерируются случайно, у каждой одно решение)
+  cache hit      — повторное уравнивание той же реакции
+  batch          — пакет из --batch разных реакций: последовательно и в пуле процессов
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import equation_balancer as eb  # noqa: E402
+from mastery import ELEMENT_SYMBOLS  # noqa: E402
+
+REAL_REACTIONS = [
+    "K4Fe(CN)6 + KMnO4 + H2SO4 = KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O",
+    "Cu + HNO3 = Cu(NO3)2 + NO + H2O",
+    "C6H12O6 + O2 = CO2 + H2O",
+    "CuSO4·5H2O = CuSO4 + H2O"
+]
+
+
+def _formula(composition):
+    return "".join(f"{symbol}{count if count > 1 else ''}" for symbol, count in composition.items() if count)
+
+
+def random_reaction(species, rng):
+    """Случайная реакция из species веществ с единственным набором коэффициентов"""
+    elements = list(ELEMENT_SYMBOLS[:species - 1])
+    while True:
+        reactant_count = species // 2
+        reactants = []
+        total = dict.fromkeys(elements, 0)
+        for _ in range(reactant_count):
+            composition = {symbol: rng.randint(1, 3) for symbol in rng.sample(elements, min(len(elements), rng.randint(2, 4)))}
+            coefficient = rng.randint(1, 4)
+            reactants.append(composition)
+            for symbol, count in composition.items():
+                total[symbol] += coefficient * count
+        products = []
+        for _ in range(species - reactant_count - 1):
+            available = [symbol for symbol, count in total.items() if count > 0]
+            if not available:
+                break
+            composition = {symbol: 1 for symbol in rng.sample(available, min(len(available), rng.randint(1, 3)))}
+            products.append(composition)
+            for symbol in composition:
+                total[symbol] -= 1
+        if len(products) < species - reactant_count - 1 or not any(total.values()):
+            continue
+        products.append(total)
+        equation = (
+            " + ".join(_formula(composition) for composition in reactants)
+            + " = "
+            + " + ".join(_formula(composition) for composition in products)
+        )
+        try:
+            eb.balance(equation)
+        except eb.EquationError:
+            continue
+        return equation
+
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--species", default="4,10,12,16,20")
+    parser.add_argument("--per-size", type=int, default=20, help="реакций на каждый размер")
+    parser.add_argument("--batch", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    results = {"sizes": []}
+
+    print(f"{'веществ':>8} {'exact, мс':>10} {'numpy, мс':>10} {'numpy верно':>12}")
+    for species in [int(value) for value in args.species.split(",")]:
+        equations = [random_reaction(species, rng) for _ in range(args.per_size)]
+        matrices = [eb.composition_matrix(*eb.parse_equation(equation))[1] for equation in equations]
+        exact = sum(measure(lambda m=matrix: eb._nullspace_exact(m, species), 3) for matrix in matrices) / len(matrices)
+        fast = sum(measure(lambda m=matrix: eb._nullspace_numpy(m, species), 3) for matrix in matrices) / len(matrices)
+        # Быстрый путь засчитывается, только если он прошёл точную проверку
+        verified = sum(
+            1 for matrix in matrices
+            if (lambda c: c is not None and any(c) and eb._satisfies(matrix, c))(eb._nullspace_numpy(matrix, species))
+        )
+        results["sizes"].append({
+            "species": species, "exact_ms": exact * 1000, "numpy_ms": fast * 1000,
+            "numpy_verified": verified, "equations": len(equations)
+        })
+        print(f"{species:8} {exact * 1000:10.3f} {fast * 1000:10.3f} {verified:>6}/{len(equations):<5}")
+
+    for equation in REAL_REACTIONS:
+        print(f"  {eb.balance(equation).text}")
+
+    eb.balance_species.cache_clear()
+    equation = REAL_REACTIONS[0]
+    cold = measure(lambda: (eb.balance_species.cache_clear(), eb.balance(equation)), 50)
+    hot = measure(lambda: eb.balance(equation), 2000)
+    results["cache_cold_ms"] = cold * 1000
+    results["cache_hit_ms"] = hot * 1000
+    print(f"Кеш: без кеша {cold * 1000:.3f} мс, попадание {hot * 1000:.4f} мс")
+
+    homework = [random_reaction(rng.choice([10, 12, 14]), rng) for _ in range(args.batch)]
+    eb.balance_species.cache_clear()
+    start = time.perf_counter()
+    serial = eb.balance_many(homework, workers=1)
+    serial_time = time.perf_counter() - start
+    eb.balance_species.cache_clear()
+    start = time.perf_counter()
+    pooled = eb.balance_many(homework, workers=args.workers)
+    pooled_time = time.perf_counter() - start
+    assert [result[0].coefficients for result in serial] == [result[0].coefficients for result in pooled]
+    results["batch"] = {"equations": len(homework), "serial_s": serial_time, "pool_s": pooled_time}
+    print(f"Пакет из {len(homework)} реакций (10–14 веществ): последовательно {serial_time:.2f} с, "
+          f"пул процессов {pooled_time:.2f} с ({os.cpu_count()} CPU)")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
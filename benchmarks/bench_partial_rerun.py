@@ -0,0 +1,196 @@
+"""Время обработки щелчка сервером: полный перезапуск скрипта против фрагмента.
+
+Запуск из корня проекта:
+    python benchmarks/bench_partial_rerun.py --clicks 20
+    python benchmarks/bench_partial_rerun.py --app /путь/к/другой/версии/main.py
+
+Скрипт запускает `streamlit run` с хранилищем пользователей SQLite во временном
+каталоге и подключается к нему как браузер — по WebSocket (/_stcore/stream),
+отправляя BackMsg.rerun_script с состояниями виджетов. Регистрирует и
+авторизует пользователя (чтобы в сайдбаре был профиль), затем измеряет:
+  page — полный перезапуск страницы с таблицей в браузере и в быстром режиме
+  picker select — выбор элемента в быстром режиме таблицы (selectbox)
+  table click — щелчок по кнопке ячейки в режиме "Кнопки в ячейках"
+  new question / check answer — кнопки теста
+Для каждого щелчка: время от отправки до script_finished, число дельт и байт.
+Если кнопка внутри фрагмента, щелчок отправляется с его fragment_id — как это
+делает браузер. В режиме "В браузере" выбор элемента не обращается к серверу
+вовсе, поэтому для него измеряется только перезапуск страницы.
+
+Нужен пакет websockets (ставится вместе со Streamlit, работающим на uvicorn);
+протокол проверен на Streamlit 1.65 (radio и selectbox передают строку).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from streamlit.proto.BackMsg_pb2 import BackMsg  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from websockets.asyncio.client import connect  # noqa: E402
+
+FINISHED_EARLY_FOR_RERUN = 2
+CELLS = ["btn_Fe_3_7", "btn_Cu_3_10", "btn_O_1_15", "btn_Na_2_0", "btn_Au_5_10"]
+PICKER = ["26. Fe — Железо", "29. Cu — Медь", "8. O — Кислород", "11. Na — Натрий", "79. Au — Золото"]
+
+
+class BrowserSession:
+    """Минимальный клиент протокола Streamlit: виджеты, щелчки, замер перезапусков"""
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.widgets = {}
+        self.states = {}
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        message.rerun_script.fragment_id = fragment_id
+        for widget_id, (field, value) in self.states.items():
+            state = message.rerun_script.widget_states.widgets.add(id=widget_id)
+            setattr(state, field, value)
+        if trigger is not None:
+            message.rerun_script.widget_states.widgets.add(id=trigger, trigger_value=True)
+
+        start = time.perf_counter()
+        await self.socket.send(message.SerializeToString())
+        deltas = size = 0
+        while True:
+            raw = await self.socket.recv()
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "delta":
+                deltas += 1
+                size += len(raw)
+                self._remember(forward.delta)
+            elif kind == "script_finished" and forward.script_finished != FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start, deltas, size
+
+    def _remember(self, delta):
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        widget = getattr(element, kind) if kind else None
+        if widget is not None and getattr(widget, "id", ""):
+            self.widgets[widget.id] = (kind, getattr(widget, "label", ""), delta.fragment_id)
+
+    def find(self, kind, text):
+        """(id, fragment_id) виджета по ключу (часть id) или подписи"""
+        for widget_id, (widget_kind, label, fragment_id) in self.widgets.items():
+            if widget_kind == kind and (widget_id.endswith(f"-{text}") or label == text):
+                return widget_id, fragment_id
+        raise KeyError(f"{kind} {text!r} не найден")
+
+    def set(self, kind, text, value):
+        widget_id, _ = self.find(kind, text)
+        self.states[widget_id] = ("string_value", value)
+
+    async def choose(self, kind, text, value):
+        """Изменение значения виджета с перезапуском (фрагмента, если виджет в нём)"""
+        widget_id, fragment_id = self.find(kind, text)
+        self.states[widget_id] = ("string_value", value)
+        return await self.rerun(fragment_id=fragment_id)
+
+    async def click(self, text):
+        widget_id, fragment_id = self.find("button", text)
+        return await self.rerun(trigger=widget_id, fragment_id=fragment_id)
+
+
+async def measure(url, clicks):
+    async with connect(url, subprotocols=["streamlit"], max_size=None) as socket:
+        session = BrowserSession(socket)
+        await session.rerun()
+
+        username = f"bench{os.getpid()}"
+        session.set("text_input", "reg_user", username)
+        session.set("text_input", "reg_pass", "benchmark")
+        session.set("text_input", "reg_pass_confirm", "benchmark")
+        await session.click("📋 Зарегистрироваться")
+        session.states.clear()
+        session.set("text_input", "login_user", username)
+        session.set("text_input", "login_pass", "benchmark")
+        await session.click("🚪 Войти")
+        session.states.clear()
+        session.widgets.clear()
+        await session.rerun()
+
+        results = {}
+        results["page (browser)"] = [await session.rerun() for _ in range(clicks)]
+        session.set("radio", "**🎨 Отображение таблицы:**", "⚡ Быстрое")
+        results["page (fast)"] = [await session.rerun() for _ in range(clicks)]
+        results["picker select"] = [
+            await session.choose("selectbox", "element_picker", PICKER[i % len(PICKER)]) for i in range(clicks)
+        ]
+        session.set("radio", "**🎨 Отображение таблицы:**", "🖱️ Кнопки в ячейках")
+        await session.rerun()
+        results["table click"] = [await session.click(CELLS[i % len(CELLS)]) for i in range(clicks)]
+
+        session.set("radio", "**Выберите режим:**", "🎯 Проверка знаний")
+        await session.rerun()
+        new_question, check_answer = [], []
+        for _ in range(clicks):
+            new_question.append(await session.click("🎲 Новый вопрос"))
+            check_answer.append(await session.click("✅ Проверить ответ"))
+        results["new question"] = new_question
+        results["check answer"] = check_answer
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=os.path.join(PROJECT_DIR, "main.py"))
+    parser.add_argument("--clicks", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8597)
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    app = os.path.abspath(args.app)
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            USER_STORE_BACKEND="sqlite",
+            USER_STORE_PATH=os.path.join(directory, "users.db")
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+             "--server.port", str(args.port), "--browser.gatherUsageStats", "false"],
+            cwd=os.path.dirname(app), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            url = f"ws://localhost:{args.port}/_stcore/stream"
+            for _ in range(100):
+                try:
+                    results = asyncio.run(measure(url, args.clicks))
+                    break
+                except OSError:
+                    time.sleep(0.2)
+            else:
+                raise RuntimeError("Сервер Streamlit не запустился")
+        finally:
+            server.terminate()
+            server.wait()
+
+    summary = {}
+    print(f"{'щелчок':<16} {'медиана, мс':>12} {'дельт':>7} {'байт':>9}")
+    for name, runs in results.items():
+        median = statistics.median(seconds for seconds, _, _ in runs) * 1000
+        deltas = statistics.median(count for _, count, _ in runs)
+        size = statistics.median(size for _, _, size in runs)
+        summary[name] = {"median_ms": median, "deltas": deltas, "bytes": size}
+        print(f"{name:<16} {median:12.1f} {deltas:7.0f} {size:9.0f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
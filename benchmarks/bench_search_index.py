@@ -0,0 +1,82 @@
+"""Поиск: триграммный индекс против перебора всех записей на каждое нажатие клавиши.
+
+Запуск из корня проекта:
+    python benchmarks/bench_search_index.py --scale 1,100
+
+Набор документов — элементы справочника, размноженные в --scale раз (оценка
+для будущего набора соединений). Запросы вводятся "по мере набора": каждый
+префикс запроса — отдельный поиск, как при вводе в поле поиска.
+  index  — TrigramIndex.search (префиксы, опечатки, ранжирование)
+  scan   — нормализация и поиск подстроки во всех текстах всех записей
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from element_categories import add_categories  # noqa: E402
+from element_index import ElementIndex  # noqa: E402
+from element_store import freeze_elements  # noqa: E402
+from search_index import TrigramIndex, element_documents, normalize  # noqa: E402
+
+QUERIES = ["железо", "кислрод", "благородный газ", "h2so4", "26", "серебро"]
+
+
+def scan(documents, query):
+    query = normalize(query)
+    return [key for key, fields in documents if any(query in normalize(text) for text, _ in fields)]
+
+
+def typed(queries):
+    # "жел", "желе", ... — каждый префикс длиной от 2 символов
+    return [query[:end] for query in queries for end in range(2, len(query) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="1,100")
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    with open(os.path.join(PROJECT_DIR, "chemical_elements.json"), encoding="utf-8") as f:
+        index = ElementIndex(freeze_elements(add_categories(json.load(f))))
+    base = list(element_documents(index))
+    keystrokes = typed(QUERIES)
+
+    results = []
+    print(f"{'документов':>10} {'слов':>7} {'сборка, мс':>11} {'index, мкс':>11} {'scan, мкс':>11}")
+    for scale in [int(value) for value in args.scale.split(",")]:
+        documents = [(f"{key}#{copy}", fields) for copy in range(scale) for key, fields in base]
+
+        start = time.perf_counter()
+        search_index = TrigramIndex(documents)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in keystrokes:
+            search_index.search(query)
+        indexed = (time.perf_counter() - start) / len(keystrokes)
+
+        start = time.perf_counter()
+        for query in keystrokes:
+            scan(documents, query)
+        scanned = (time.perf_counter() - start) / len(keystrokes)
+
+        results.append({
+            "documents": len(documents), "terms": len(search_index.terms), "build_ms": build * 1000,
+            "index_us": indexed * 1e6, "scan_us": scanned * 1e6
+        })
+        print(f"{len(documents):10} {len(search_index.terms):7} {build * 1000:11.1f} "
+              f"{indexed * 1e6:11.0f} {scanned * 1e6:11.0f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
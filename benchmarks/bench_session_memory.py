@@ -0,0 +1,115 @@
+"""Память на сессию: копия данных на каждый перезапуск против общего неизменяемого хранилища.
+
+Запуск из корня проекта:
+    python benchmarks/bench_session_memory.py --sessions 300 --reruns 20
+
+Сценарии (память считается через tracemalloc):
+  до    — load_elements под st.cache_data: каждый перезапуск каждой сессии
+          получает pickle.loads-копию всех 118 элементов
+  после — freeze_elements + st.cache_resource: данные загружаются один раз на
+          процесс, сессии получают ссылку на тот же объект
+
+Для "до" сессии держат свою копию одновременно (так выглядит пик, когда
+перезапуски идут параллельно); "аллокации" — суммарный объём выделенной памяти
+за все перезапуски, то есть нагрузка на сборщик мусора.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from element_categories import add_categories  # noqa: E402
+from element_index import ElementIndex  # noqa: E402
+from element_store import freeze_elements  # noqa: E402
+
+ELEMENTS_FILE = os.path.join(PROJECT_DIR, "chemical_elements.json")
+
+
+def traced(function):
+    """(результат, удерживаемые байты)"""
+    tracemalloc.start()
+    result = function()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    with open(ELEMENTS_FILE, "r", encoding="utf-8") as f:
+        data = add_categories(json.load(f))
+    # Так st.cache_data хранит результат: в сериализованном виде
+    pickled = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # ---- до: копия на каждый перезапуск ----
+    def copies_per_session():
+        return [pickle.loads(pickled) for _ in range(args.sessions)]
+
+    _, before_held = traced(copies_per_session)
+
+    # Время копирования без tracemalloc (трассировка сильно замедляет аллокации)
+    start = time.perf_counter()
+    for _ in range(args.sessions * args.reruns):
+        pickle.loads(pickled)
+    churn_time = time.perf_counter() - start
+    tracemalloc.start()
+    pickle.loads(pickled)
+    one_copy = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # ---- после: одно неизменяемое хранилище на процесс ----
+    def shared_store():
+        return ElementIndex(freeze_elements(pickle.loads(pickled)))
+
+    index, store_bytes = traced(shared_store)
+
+    def sessions_share_store():
+        return [index for _ in range(args.sessions * args.reruns)]
+
+    _, after_held = traced(sessions_share_store)
+
+    per_session_before = before_held / args.sessions
+    per_session_after = after_held / (args.sessions * args.reruns)
+    results = {
+        "sessions": args.sessions,
+        "reruns": args.reruns,
+        "copy_bytes": one_copy,
+        "before_per_session_bytes": per_session_before,
+        "before_total_bytes": before_held,
+        "before_allocated_per_rerun_bytes": one_copy,
+        "before_copy_seconds": churn_time,
+        "after_store_bytes": store_bytes,
+        "after_per_session_bytes": per_session_after,
+        "after_total_bytes": store_bytes + after_held
+    }
+
+    print(f"Сессий: {args.sessions}, перезапусков на сессию: {args.reruns}")
+    print(f"Копия данных элементов: {one_copy / 1024:.1f} КиБ")
+    print("До (st.cache_data):")
+    print(f"  на сессию                 {per_session_before / 1024:9.1f} КиБ")
+    print(f"  всего при {args.sessions} сессиях     {before_held / 1024 / 1024:9.2f} МиБ")
+    print(f"  аллокации за все перезапуски {one_copy * args.sessions * args.reruns / 1024 / 1024:9.1f} МиБ "
+          f"({churn_time * 1000:.0f} мс CPU)")
+    print("После (общее неизменяемое хранилище):")
+    print(f"  хранилище на процесс      {store_bytes / 1024:9.1f} КиБ")
+    print(f"  на сессию                 {per_session_after:9.1f} байт (ссылка на общий объект)")
+    print(f"  всего при {args.sessions} сессиях     {(store_bytes + after_held) / 1024 / 1024:9.2f} МиБ")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Бюджет запросов к Google Sheets на действие пользователя и нагрузка на слой авторизации.
+
+Запуск из корня проекта:
+    python benchmarks/bench_sheets_budget.py
+    python benchmarks/bench_sheets_budget.py --users 50 --threads 10 --latency 0.08 --read-quota 60 --write-quota 60
+
+Вместо Google используется fake_sheets_server.py в том же процессе
+(USER_STORE_SHEETS_URL), поэтому сеть и учётные данные не нужны. Сначала
+действия выполняются по одному, и для каждого считаются запросы к API по точкам
+входа; если запросов больше, чем в BUDGET, скрипт завершается с кодом 1. Затем
+--users пользователей в --threads потоках регистрируются, входят и отвечают на
+вопросы при заданных задержке, квотах (429) и доле сбоев: печатаются время,
+число запросов, ошибки по кодам и неудачные действия.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from fake_sheets_server import FakeSheetsServer  # noqa: E402
+
+PASSWORD = "benchmark"
+ANSWERS = [("Fe", 1, True), ("O", 2, False), ("Na", 1, True)]
+
+# Допустимое число запросов к API на действие (при свежем кеше пользователей)
+BUDGET = {
+    "first register": 11,
+    "register": 3,
+    "login": 1,
+    "demo login": 3,
+    "stats": 3,
+    "answer": 0,
+    "flush": 1,
+    "stats after flush": 0,
+    "compact": 5
+}
+
+
+def budget_actions(auth):
+    return [
+        # Первая регистрация создаёт листы пользователей и журнала
+        ("first register", lambda: auth.register_user("budget_first", PASSWORD)),
+        ("register", lambda: auth.register_user("budget_user", PASSWORD)),
+        ("login", lambda: auth.login_user("budget_user", PASSWORD)),
+        ("demo login", lambda: auth.login_user("demo", "demo")),
+        # Первое чтение статистики загружает несвёрнутый хвост журнала
+        ("stats", lambda: auth.get_user_stats("budget_user")),
+        ("answer", lambda: auth.log_user_answers("budget_user", ANSWERS)),
+        ("flush", auth.flush_user_stats),
+        ("stats after flush", lambda: auth.get_user_stats("budget_user")),
+        ("compact", auth.compact_user_stats)
+    ]
+
+
+def measure_budget(server, auth):
+    results = {}
+    for name, action in budget_actions(auth):
+        server.sheets.reset()
+        action()
+        stats = server.sheets.stats()
+        results[name] = {"calls": stats["total"], "endpoints": stats["calls"], "errors": stats["errors"]}
+    return results
+
+
+def user_session(auth, username, questions):
+    """Регистрация, вход и ответы одного пользователя: (время действий, неудачные действия)"""
+    timings = []
+    failed = []
+    for name, action in [
+        ("register", lambda: auth.register_user(username, PASSWORD)[0]),
+        ("login", lambda: auth.login_user(username, PASSWORD)[0]),
+        ("stats", lambda: auth.get_user_stats(username) is not None)
+    ]:
+        start = time.perf_counter()
+        if not action():
+            failed.append(name)
+        timings.append(time.perf_counter() - start)
+    for i in range(questions):
+        auth.log_user_answers(username, [ANSWERS[i % len(ANSWERS)]])
+    return timings, failed
+
+
+def measure_load(server, auth, users, threads, questions):
+    server.sheets.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        sessions = list(pool.map(
+            lambda i: user_session(auth, f"load_user_{i}", questions), range(users)
+        ))
+    auth.flush_user_stats()
+    elapsed = time.perf_counter() - start
+    stats = server.sheets.stats()
+    timings = [seconds for session_timings, _ in sessions for seconds in session_timings]
+    failed = {}
+    for _, session_failed in sessions:
+        for name in session_failed:
+            failed[name] = failed.get(name, 0) + 1
+    errors = {}
+    for codes in stats["errors"].values():
+        for code, count in codes.items():
+            errors[str(code)] = errors.get(str(code), 0) + count
+    return {
+        "seconds": elapsed,
+        "action_ms_median": statistics.median(timings) * 1000,
+        "action_ms_max": max(timings) * 1000,
+        "calls": stats["total"],
+        "endpoints": stats["calls"],
+        "errors": errors,
+        "failed_actions": failed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=10, help="ответов на пользователя")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка запроса к API, с")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--read-quota", type=int, default=None, help="запросов чтения в минуту")
+    parser.add_argument("--write-quota", type=int, default=None, help="запросов записи в минуту")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with FakeSheetsServer(seed=args.seed) as server, tempfile.TemporaryDirectory() as directory:
+        os.environ["USER_STORE_BACKEND"] = "gsheets"
+        os.environ["USER_STORE_SHEETS_URL"] = server.url
+        # Отметка о демо-пользователе пишется в текущий каталог
+        os.chdir(directory)
+        try:
+            import auth_system_gsheets as auth
+
+            budget = measure_budget(server, auth)
+            server.sheets.configure(
+                latency=args.latency, jitter=args.jitter, read_quota=args.read_quota,
+                write_quota=args.write_quota, failure_rate=args.failure_rate
+            )
+            load = measure_load(server, auth, args.users, args.threads, args.questions)
+        finally:
+            os.chdir(cwd)
+
+    print(f"{'действие':<18} {'запросов':>8} {'бюджет':>7}  точки входа")
+    over_budget = []
+    for name, result in budget.items():
+        endpoints = ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(result["endpoints"].items()))
+        print(f"{name:<18} {result['calls']:8} {BUDGET[name]:7}  {endpoints}")
+        if result["calls"] > BUDGET[name]:
+            over_budget.append(name)
+
+    print(f"\nнагрузка: {args.users} пользователей, {args.threads} потоков, задержка {args.latency} с")
+    print(f"  время {load['seconds']:.2f} с, действие: медиана {load['action_ms_median']:.1f} мс, "
+          f"максимум {load['action_ms_max']:.1f} мс")
+    print(f"  запросов {load['calls']}: " + ", ".join(f"{e} {c}" for e, c in sorted(load["endpoints"].items())))
+    print(f"  ошибки API: {load['errors'] or 'нет'}; неудачные действия: {load['failed_actions'] or 'нет'}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"budget": budget, "load": load}, f, ensure_ascii=False, indent=2)
+
+    if over_budget:
+        print(f"\nПревышен бюджет запросов: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Профиль времени импорта модулей приложения (аналог python -X importtime).
+
+Запуск из корня проекта:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module main --top 30 --save benchmarks/import_time_report.txt
+
+Скрипт завершается с кодом 1, если при импорте подгружаются сетевые библиотеки
+(gspread, google-auth) или суммарное время превышает бюджет --budget-ms.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Эти пакеты не должны загружаться при старте — только при первом обращении к таблице
+FORBIDDEN_MODULES = ["gspread", "google.oauth2", "google.auth"]
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_importtime(module):
+    """Запускает чистый интерпретатор с -X importtime и возвращает строки отчёта"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+    return [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+
+
+def parse_report(lines):
+    """Разбирает строки вида 'import time: self [us] | cumulative | imported package'"""
+    entries = []
+    for line in lines:
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # строка заголовка
+        # После "| " идёт отступ: два пробела на каждый уровень вложенности импорта
+        name = parts[2][1:]
+        entries.append({
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "module": name.strip(),
+            "level": (len(name) - len(name.lstrip(" "))) // 2
+        })
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="auth_system_gsheets", help="что импортировать")
+    parser.add_argument("--top", type=int, default=20, help="сколько самых долгих импортов показать")
+    parser.add_argument("--budget-ms", type=float, default=None, help="допустимое суммарное время, мс")
+    parser.add_argument("--save", default=None, help="сохранить полный отчёт -X importtime в файл")
+    args = parser.parse_args()
+
+    lines = run_importtime(args.module)
+    entries = parse_report(lines)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    # Полное время — cumulative верхнеуровневой записи самого модуля (и его пакетов для "a.b");
+    # вложенные записи уже входят в неё, а импорты запуска интерпретатора к модулю не относятся
+    top_level = [
+        e for e in entries
+        if e["level"] == 0 and (e["module"] == args.module or args.module.startswith(e["module"] + "."))
+    ]
+    total_ms = sum(e["cumulative_us"] for e in top_level) / 1000
+
+    print(f"Импорт {args.module}: {total_ms:.1f} мс, модулей: {len(entries)}")
+    print(f"{'cumulative, мс':>15} {'self, мс':>10}  модуль")
+    for entry in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:args.top]:
+        print(f"{entry['cumulative_us'] / 1000:15.1f} {entry['self_us'] / 1000:10.1f}  {'  ' * entry['level']}{entry['module']}")
+
+    failed = False
+    loaded = {e["module"] for e in entries}
+    for name in FORBIDDEN_MODULES:
+        if name in loaded:
+            print(f"❌ При импорте загружается {name}")
+            failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"❌ Время импорта {total_ms:.1f} мс превышает бюджет {args.budget_ms:.1f} мс")
+        failed = True
+
+    if not failed:
+        print("✅ Сетевые библиотеки при импорте не загружаются")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import re
+import numpy as np
+
+# ==================== ЭЛЕКТРОННЫЕ КОНФИГУРАЦИИ ====================
+#
+# Строки вида "[Ar] 3d⁶ 4s²" разбираются один раз при загрузке в массив
+# заселённости подоболочек фиксированной длины. По этим массивам заранее
+# считаются матрица сходства 118×118 и таблица ближайших соседей — из неё
+# берутся правдоподобные неправильные ответы для сложного уровня теста.
+
+# Подоболочки в порядке заполнения (правило Клечковского)
+ORBITALS = (
+    "1s", "2s", "2p", "3s", "3p", "4s", "3d", "4p", "5s", "4d", "5p",
+    "6s", "4f", "5d", "6p", "7s", "5f", "6d", "7p"
+)
+
+# Сколько ближайших соседей хранится для каждого элемента
+NEIGHBOURS_K = 6
+
+_ORBITAL_INDEX = {orbital: i for i, orbital in enumerate(ORBITALS)}
+_SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+_CORE = re.compile(r"\[([A-Z][a-z]?)\]")
+_SUBSHELL = re.compile(r"(\d[spdf])([⁰¹²³⁴⁵⁶⁷⁸⁹0-9]+)")
+
+
+def parse_configuration(text, cores):
+    """Массив заселённости подоболочек (uint8, длина len(ORBITALS)).
+
+    cores — {символ благородного газа: массив его конфигурации} для записи "[Ar] ...".
+    """
+    occupancy = np.zeros(len(ORBITALS), dtype=np.uint8)
+    core = _CORE.match(text.strip())
+    if core:
+        if core.group(1) not in cores:
+            raise ValueError(f"Неизвестный остов [{core.group(1)}] в конфигурации {text!r}")
+        occupancy += cores[core.group(1)]
+    for orbital, count in _SUBSHELL.findall(text):
+        if orbital not in _ORBITAL_INDEX:
+            raise ValueError(f"Неизвестная подоболочка {orbital} в конфигурации {text!r}")
+        occupancy[_ORBITAL_INDEX[orbital]] += int(count.translate(_SUPERSCRIPTS))
+    return occupancy
+
+
+class ConfigurationTable:
+    """Конфигурации всех элементов индекса в виде матриц NumPy.
+
+    occupancy — (n, len(ORBITALS)) заселённость подоболочек,
+    similarity — (n, n) сходство 1 / (1 + L1-расстояние),
+    neighbours — {символ: кортеж символов NEIGHBOURS_K самых похожих конфигураций}.
+    """
+
+    def __init__(self, index, k=NEIGHBOURS_K):
+        self.symbols = index.symbols
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        texts = [index.get(symbol)['Электронная конфигурация'] for symbol in self.symbols]
+
+        # Элементы идут по порядку номеров, поэтому остов ([He], [Ne], …) всегда разобран раньше
+        cores = {}
+        rows = []
+        for symbol, text in zip(self.symbols, texts):
+            occupancy = parse_configuration(text, cores)
+            cores[symbol] = occupancy
+            rows.append(occupancy)
+        self.occupancy = np.vstack(rows) if rows else np.zeros((0, len(ORBITALS)), dtype=np.uint8)
+
+        # Попарные L1-расстояния одной операцией: (n, 1, m) - (1, n, m)
+        values = self.occupancy.astype(np.int16)
+        distance = np.abs(values[:, None, :] - values[None, :, :]).sum(axis=2)
+        self.similarity = (1.0 / (1.0 + distance)).astype(np.float32)
+
+        # Ближайшие соседи: себя и элементы с той же строкой конфигурации исключаем
+        texts = np.array(texts, dtype=object)
+        masked = distance.astype(np.float32)
+        masked[texts[:, None] == texts[None, :]] = np.inf
+        k = max(min(k, len(self.symbols) - 1), 0)
+        nearest = np.argsort(masked, axis=1, kind="stable")[:, :k]
+        self.neighbour_indices = nearest.astype(np.int16)
+        self.neighbours = {
+            symbol: tuple(self.symbols[j] for j in row)
+            for symbol, row in zip(self.symbols, nearest.tolist())
+        }
+
+    def occupancy_of(self, symbol):
+        """Массив заселённости элемента"""
+        return self.occupancy[self.positions[symbol]]
@@ -0,0 +1,73 @@
+# ==================== КАТЕГОРИИ ЭЛЕМЕНТОВ ====================
+
+# Ключ, под которым категория хранится в данных каждого элемента
+CATEGORY_KEY = "Категория"
+
+ALKALI_METAL = "Щелочной металл"
+ALKALINE_EARTH_METAL = "Щелочноземельный металл"
+TRANSITION_METAL = "Переходный металл"
+LANTHANOID = "Лантаноид"
+ACTINOID = "Актиноид"
+POST_TRANSITION_METAL = "Постпереходный металл"
+METALLOID = "Металлоид"
+NONMETAL = "Неметалл"
+NOBLE_GAS = "Благородный газ"
+
+# Все категории в порядке отображения
+CATEGORIES = [
+    ALKALI_METAL, ALKALINE_EARTH_METAL, TRANSITION_METAL, LANTHANOID, ACTINOID,
+    POST_TRANSITION_METAL, METALLOID, NONMETAL, NOBLE_GAS
+]
+
+METAL_CATEGORIES = frozenset([
+    ALKALI_METAL, ALKALINE_EARTH_METAL, TRANSITION_METAL, LANTHANOID, ACTINOID,
+    POST_TRANSITION_METAL
+])
+
+# Порядковые номера по категориям (всё, что не перечислено, — постпереходные металлы)
+_NUMBERS_BY_CATEGORY = {
+    NOBLE_GAS: {2, 10, 18, 36, 54, 86, 118},
+    ALKALI_METAL: {3, 11, 19, 37, 55, 87},
+    ALKALINE_EARTH_METAL: {4, 12, 20, 38, 56, 88},
+    LANTHANOID: set(range(57, 72)),
+    ACTINOID: set(range(89, 104)),
+    TRANSITION_METAL: set(range(21, 31)) | set(range(39, 49)) | set(range(72, 81)) | set(range(104, 113)),
+    METALLOID: {5, 14, 32, 33, 51, 52},
+    NONMETAL: {1, 6, 7, 8, 9, 15, 16, 17, 34, 35, 53, 85}
+}
+
+_CATEGORY_BY_NUMBER = {
+    number: category
+    for category, numbers in _NUMBERS_BY_CATEGORY.items()
+    for number in numbers
+}
+
+# Цвет ячейки таблицы: персиковый для металлов, голубой для остальных
+CATEGORY_COLORS = {
+    category: "#FFE4CC" if category in METAL_CATEGORIES else "#E0FFFF"
+    for category in CATEGORIES
+}
+
+# Значок типа элемента в карточке
+CATEGORY_ICONS = {
+    category: "🟠" if category in METAL_CATEGORIES else "🟢"
+    for category in CATEGORIES
+}
+CATEGORY_ICONS[METALLOID] = "🟡"
+CATEGORY_ICONS[NOBLE_GAS] = "🟣"
+
+
+def classify_element(number):
+    """Каноническая категория элемента по порядковому номеру"""
+    return _CATEGORY_BY_NUMBER.get(number, POST_TRANSITION_METAL)
+
+
+def add_categories(elements_data):
+    """Записывает категорию в данные каждого элемента (один раз при загрузке)"""
+    for element in elements_data.values():
+        element[CATEGORY_KEY] = classify_element(element["Порядковый номер"])
+    return elements_data
+
+
+def is_metal(element):
+    return element[CATEGORY_KEY] in METAL_CATEGORIES
@@ -0,0 +1,300 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+# ==================== КОМПИЛЯЦИЯ НАБОРА ЭЛЕМЕНТОВ ====================
+#
+# chemical_elements.json компилируется в компактный двоичный файл, который
+# читается через mmap без разбора JSON:
+#
+#   заголовок | номера (uint16) | массы (float64) | флаги (uint8)
+#   | ссылки на строки (uint32, по STRING_FIELDS на элемент)
+#   | диапазоны списков (uint32, начало и длина для каждого из LIST_FIELDS)
+#   | элементы списков (uint32, ссылки на строки)
+#   | смещения строк в символах (uint32) | пул строк UTF-8
+#
+# Пул декодируется одной операцией, строки — срезы по смещениям.
+# Одинаковые строки ("Основный.", "+3", "—" и т.д.) хранятся в пуле один раз.
+# Кеш перекомпилируется, если у JSON изменились mtime/размер и хеш содержимого.
+
+MAGIC = b"CHEMEL02"
+HEADER = struct.Struct("<8s1s7x32sqqIIII")
+
+# Каталог для скомпилированного кеша (рядом с исходным файлом)
+CACHE_DIR = ".cache"
+
+# Строковые поля элемента: путь к значению во вложенных словарях
+STRING_FIELDS = [
+    ("Название",),
+    ("Электронная конфигурация",),
+    ("Формула простого вещества", "Формула"),
+    ("Формула простого вещества", "Описание"),
+    ("Высший оксид", "Формула"),
+    ("Высший оксид", "Характер"),
+    ("Летучее водородное соединение", "Формула"),
+    ("Летучее водородное соединение", "Описание")
+]
+
+# Поля-списки строк
+LIST_FIELDS = ["Валентность", "Степень окисления"]
+
+# Ключи элемента, которые умеет хранить компилятор (в порядке исходного JSON)
+KNOWN_KEYS = {
+    "Название", "Порядковый номер", "Валентность", "Степень окисления", "Атомная масса",
+    "Электронная конфигурация", "Формула простого вещества", "Высший оксид",
+    "Летучее водородное соединение"
+}
+
+# Отсутствующая строка
+NO_STRING = 0xFFFFFFFF
+
+# Флаг: атомная масса в JSON записана целым числом
+FLAG_INT_MASS = 1
+
+_BYTEORDER = b"L" if sys.byteorder == "little" else b"B"
+
+
+def default_cache_path(json_path):
+    """Путь к скомпилированному файлу для данного JSON"""
+    directory = os.path.join(os.path.dirname(os.path.abspath(json_path)), CACHE_DIR)
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    return os.path.join(directory, f"{name}.bin")
+
+
+def _pad(buffer, alignment=8):
+    buffer.extend(b"\0" * (-len(buffer) % alignment))
+
+
+def compile_elements(elements_data, source_sha256=b"\0" * 32, source_mtime_ns=0, source_size=0):
+    """Компилирует словарь элементов в байты двоичного формата"""
+    pool = {}
+    strings = []
+
+    def intern(value):
+        if value is None:
+            return NO_STRING
+        if not isinstance(value, str):
+            raise ValueError(f"Ожидалась строка, получено {value!r}")
+        if value not in pool:
+            pool[value] = len(strings)
+            strings.append(value)
+        return pool[value]
+
+    numbers = array.array("H")
+    masses = array.array("d")
+    flags = array.array("B")
+    string_refs = array.array("I")
+    list_ranges = array.array("I")
+    list_items = array.array("I")
+
+    # Символ элемента — первая строка каждой записи
+    for symbol, element in elements_data.items():
+        if not isinstance(element, dict) or set(element) - KNOWN_KEYS:
+            raise ValueError(f"Неподдерживаемая структура элемента {symbol}")
+        mass = element.get("Атомная масса")
+        if isinstance(mass, bool) or not isinstance(mass, (int, float)):
+            raise ValueError(f"Неподдерживаемая атомная масса у {symbol}: {mass!r}")
+
+        numbers.append(element["Порядковый номер"])
+        masses.append(float(mass))
+        flags.append(FLAG_INT_MASS if isinstance(mass, int) else 0)
+
+        string_refs.append(intern(symbol))
+        for path in STRING_FIELDS:
+            value = element.get(path[0])
+            if len(path) == 2:
+                if value is not None and not isinstance(value, dict):
+                    raise ValueError(f"Поле {path[0]} у {symbol} должно быть словарём")
+                value = value.get(path[1]) if value is not None else None
+            string_refs.append(intern(value))
+
+        for field in LIST_FIELDS:
+            values = element.get(field)
+            if values is None:
+                list_ranges.extend([NO_STRING, 0])
+                continue
+            list_ranges.extend([len(list_items), len(values)])
+            list_items.extend(intern(value) for value in values)
+
+    offsets = array.array("I", [0])
+    for value in strings:
+        offsets.append(offsets[-1] + len(value))
+    encoded_pool = "".join(strings).encode("utf-8")
+
+    blob = bytearray(HEADER.pack(
+        MAGIC, _BYTEORDER, source_sha256, source_mtime_ns, source_size,
+        len(numbers), len(strings), len(list_items), len(encoded_pool)
+    ))
+    for section in (numbers, masses, flags, string_refs, list_ranges, list_items, offsets):
+        _pad(blob)
+        blob.extend(section.tobytes())
+    _pad(blob)
+    blob.extend(encoded_pool)
+    return bytes(blob)
+
+
+class CompiledElements:
+    """Скомпилированный набор элементов поверх bytes или mmap (без копирования)"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        (magic, byteorder, self.source_sha256, self.source_mtime_ns, self.source_size,
+         count, string_count, item_count, pool_size) = HEADER.unpack_from(view)
+        if magic != MAGIC or byteorder != _BYTEORDER:
+            raise ValueError("Файл не является скомпилированным набором элементов")
+
+        position = HEADER.size
+
+        def section(fmt, length, itemsize):
+            nonlocal position
+            position += -position % 8
+            start = position
+            position += length * itemsize
+            if len(view) < position:
+                raise ValueError("Скомпилированный набор элементов обрезан")
+            return view[start:position].cast(fmt)
+
+        self.numbers = section("H", count, 2)
+        self.masses = section("d", count, 8)
+        self.flags = section("B", count, 1)
+        self._string_refs = section("I", count * (len(STRING_FIELDS) + 1), 4)
+        self._list_ranges = section("I", count * 2 * len(LIST_FIELDS), 4)
+        self._list_items = section("I", item_count, 4)
+        self._offsets = section("I", string_count + 1, 4)
+        position += -position % 8
+        if len(view) < position + pool_size:
+            raise ValueError("Скомпилированный набор элементов обрезан")
+        self._pool = view[position:position + pool_size]
+        self._strings = None
+        self.string_count = string_count
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def strings(self):
+        """Все строки пула (декодируются одной операцией при первом обращении)"""
+        if self._strings is None:
+            text = str(self._pool, "utf-8")
+            offsets = self._offsets.tolist()
+            self._strings = [sys.intern(text[offsets[k]:offsets[k + 1]]) for k in range(self.string_count)]
+        return self._strings
+
+    def string(self, string_id):
+        """Строка пула по номеру"""
+        if string_id == NO_STRING:
+            return None
+        return self.strings()[string_id]
+
+    def symbol(self, i):
+        return self.string(self._string_refs[i * (len(STRING_FIELDS) + 1)])
+
+    def mass(self, i):
+        mass = self.masses[i]
+        return int(mass) if self.flags[i] & FLAG_INT_MASS else mass
+
+    def _columns(self):
+        # Числовые секции одним вызовом tolist(): дальше работаем с обычными списками
+        return (self.strings(), self._string_refs.tolist(), self._list_ranges.tolist(),
+                self._list_items.tolist(), self.numbers.tolist(), self.masses.tolist(), self.flags.tolist())
+
+    def _build(self, i, columns):
+        strings, refs, ranges, items, numbers, masses, flags = columns
+        width = len(STRING_FIELDS) + 1
+        values = [strings[ref] if ref != NO_STRING else None for ref in refs[i * width + 1:(i + 1) * width]]
+        lists = []
+        for k in range(len(LIST_FIELDS)):
+            start, length = ranges[(i * len(LIST_FIELDS) + k) * 2:(i * len(LIST_FIELDS) + k) * 2 + 2]
+            lists.append(None if start == NO_STRING else [strings[item] for item in items[start:start + length]])
+        mass = masses[i]
+
+        element = {}
+        for key, value in (
+            ("Название", values[0]),
+            ("Порядковый номер", numbers[i]),
+            ("Валентность", lists[0]),
+            ("Степень окисления", lists[1]),
+            ("Атомная масса", int(mass) if flags[i] & FLAG_INT_MASS else mass),
+            ("Электронная конфигурация", values[1])
+        ):
+            if value is not None:
+                element[key] = value
+        for path, value in zip(STRING_FIELDS[2:], values[2:]):
+            if value is not None:
+                element.setdefault(path[0], {})[path[1]] = value
+        return element
+
+    def element(self, i):
+        """Данные i-го элемента в формате chemical_elements.json"""
+        return self._build(i, self._columns())
+
+    def to_dict(self):
+        """Все элементы: {символ: данные} (как после json.load).
+
+        Повреждённое содержимое (ссылки за пределы пула, неверный UTF-8)
+        выдаёт ValueError, как и неверный заголовок.
+        """
+        try:
+            columns = self._columns()
+            strings, refs = columns[0], columns[1]
+            width = len(STRING_FIELDS) + 1
+            return {strings[refs[i * width]]: self._build(i, columns) for i in range(self.count)}
+        except (IndexError, KeyError, TypeError, UnicodeDecodeError) as exc:
+            raise ValueError(f"Скомпилированный набор элементов повреждён: {exc}") from exc
+
+
+def _open_compiled(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return CompiledElements(mapped)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _write_atomic(path, blob):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def load_compiled_elements(json_path, cache_path=None):
+    """Скомпилированный набор элементов; при изменении JSON кеш пересобирается.
+
+    Если записать кеш на диск нельзя, возвращается набор, собранный в памяти.
+    """
+    cache_path = cache_path or default_cache_path(json_path)
+    stat = os.stat(json_path)
+
+    compiled = _open_compiled(cache_path)
+    if compiled is not None and (compiled.source_mtime_ns, compiled.source_size) == (stat.st_mtime_ns, stat.st_size):
+        return compiled
+
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).digest()
+
+    if compiled is not None and compiled.source_sha256 == digest:
+        # Содержимое то же, изменился только mtime (например, свежий checkout):
+        # переписываем заголовок, не разбирая JSON
+        blob = bytearray(compiled._buffer)
+        HEADER.pack_into(
+            blob, 0, MAGIC, _BYTEORDER, digest, stat.st_mtime_ns, stat.st_size,
+            compiled.count, compiled.string_count, len(compiled._list_items), len(compiled._pool)
+        )
+        blob = bytes(blob)
+    else:
+        blob = compile_elements(json.loads(raw.decode("utf-8")), digest, stat.st_mtime_ns, stat.st_size)
+
+    try:
+        _write_atomic(cache_path, blob)
+    except OSError:
+        return CompiledElements(blob)
+    return _open_compiled(cache_path) or CompiledElements(blob)
@@ -0,0 +1,97 @@
+import bisect
+from types import MappingProxyType
+from element_categories import CATEGORIES, CATEGORY_KEY, is_metal
+from element_query import selection_mask, mask_symbols
+
+# ==================== ИНДЕКС ЭЛЕМЕНТОВ ====================
+
+# Варианты выбора элементов в режиме тестирования (в порядке отображения)
+SELECTION_OPTIONS = [
+    "Все элементы",
+    "Элементы 1-24",
+    "Элементы 25-50",
+    "Элементы 51-75",
+    "Элементы 76-100",
+    "Элементы 101-118",
+    "Металлы",
+    "Неметаллы"
+]
+
+# Диапазоны порядковых номеров для вариантов "Элементы N-M"
+NUMBER_RANGES = {
+    "Элементы 1-24": (1, 24),
+    "Элементы 25-50": (25, 50),
+    "Элементы 51-75": (51, 75),
+    "Элементы 76-100": (76, 100),
+    "Элементы 101-118": (101, 118)
+}
+
+
+class ElementIndex:
+    """Индексы по набору элементов, построенные один раз при загрузке.
+
+    numbers — отсортированные порядковые номера, symbols — символы в том же порядке,
+    поэтому выбор диапазона номеров — это срез по bisect, а не проход по всем элементам.
+
+    Индекс — общий для всех сессий объект (st.cache_resource), поэтому все его
+    поля доступны только для чтения; данные элементов передаются уже замороженными
+    (см. element_store.freeze_elements).
+    """
+
+    __slots__ = ("by_symbol", "numbers", "symbols", "by_number", "categories", "selections")
+
+    def __init__(self, elements_data):
+        self.by_symbol = elements_data
+        ordered = sorted(elements_data.items(), key=lambda item: item[1]["Порядковый номер"])
+        self.numbers = tuple(element["Порядковый номер"] for _, element in ordered)
+        self.symbols = tuple(symbol for symbol, _ in ordered)
+        self.by_number = MappingProxyType({element["Порядковый номер"]: symbol for symbol, element in ordered})
+
+        # Наборы символов по категориям (категория уже записана в данных элемента);
+        # "Неметаллы" в тесте — неметаллы, металлоиды и благородные газы
+        categories = {category: frozenset() for category in CATEGORIES}
+        for symbol, element in ordered:
+            category = element[CATEGORY_KEY]
+            categories[category] = categories[category] | {symbol}
+        metals = frozenset(symbol for symbol, element in ordered if is_metal(element))
+        categories["Металлы"] = metals
+        categories["Неметаллы"] = frozenset(self.symbols) - metals
+        self.categories = MappingProxyType(categories)
+
+        # Готовые наборы символов для каждого варианта выбора
+        selections = {"Все элементы": self.symbols}
+        for option, (low, high) in NUMBER_RANGES.items():
+            selections[option] = self.number_range(low, high)
+        for option in ("Металлы", "Неметаллы"):
+            members = categories[option]
+            selections[option] = tuple(symbol for symbol in self.symbols if symbol in members)
+        self.selections = MappingProxyType(selections)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.by_symbol
+
+    def get(self, symbol):
+        """Данные элемента по символу (или None)"""
+        return self.by_symbol.get(symbol)
+
+    def get_by_number(self, number):
+        """Данные элемента по порядковому номеру (или None)"""
+        symbol = self.by_number.get(number)
+        return self.by_symbol[symbol] if symbol is not None else None
+
+    def number_range(self, low, high):
+        """Символы элементов с номерами от low до high включительно"""
+        start = bisect.bisect_left(self.numbers, low)
+        end = bisect.bisect_right(self.numbers, high)
+        return self.symbols[start:end]
+
+    def selection(self, option):
+        """Символы элементов для варианта выбора из SELECTION_OPTIONS
+        или для результата фильтра ("Фильтр #<маска>", см. element_query)"""
+        mask = selection_mask(option)
+        if mask is not None:
+            return mask_symbols(self.symbols, mask)
+        return self.selections.get(option, ())
@@ -0,0 +1,123 @@
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import streamlit.components.v1 as components
+
+# ==================== ТАБЛИЦА В БРАУЗЕРЕ ====================
+#
+# Двусторонний компонент: таблица и карточки всех элементов отправляются в
+# браузер одним статическим JSON-файлом, имя которого содержит хеш содержимого
+# (elements-<хеш>.json). Файлы компонента, кроме HTML, Streamlit отдаёт с
+# Cache-Control: public, поэтому браузер загружает данные один раз на версию.
+# Наведение и выбор элемента обрабатываются в браузере без обращения к серверу;
+# сервер получает значение компонента, только когда элемент нужен тесту.
+# Файл лежит в каталоге компонента (data/ в .gitignore): Streamlit раздаёт только
+# его. Если каталог недоступен для записи (развёртывание только для чтения) или
+# браузер не смог загрузить файл, данные передаются вместе с аргументами компонента.
+
+logger = logging.getLogger(__name__)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "element_panel_frontend")
+DATA_DIR = os.path.join(FRONTEND_DIR, "data")
+
+_component = components.declare_component("element_panel", path=FRONTEND_DIR)
+
+_HEADING = re.compile(r"^(#{1,3}) (.*)$")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"\*(.+?)\*")
+_CODE = re.compile(r"`(.+?)`")
+
+
+def markdown_to_html(text, allow_html=False):
+    """HTML для фрагмента карточки: заголовки, ---, **жирный**, *курсив*, `код`"""
+    if not allow_html:
+        text = html.escape(text, quote=False)
+    if text.strip() == "---":
+        return "<hr>"
+    heading = _HEADING.match(text)
+    if heading:
+        level = len(heading.group(1))
+        return f"<h{level}>{heading.group(2)}</h{level}>"
+    text = _CODE.sub(r"<code>\1</code>", text)
+    text = _BOLD.sub(r"<b>\1</b>", text)
+    text = _ITALIC.sub(r"<i>\1</i>", text)
+    return f"<p>{text}</p>"
+
+
+def _fragments_html(fragments):
+    return "".join(markdown_to_html(text, allow_html) for text, allow_html in fragments)
+
+
+def view_to_html(view):
+    """Карточка элемента (element_views.ElementView) в виде HTML с тремя колонками"""
+    notes = "".join(
+        f'<div class="note note-{kind}">{markdown_to_html(text)}</div>'
+        for kind, text in view.notes
+    )
+    return (
+        '<div class="card">'
+        f'<div class="column">{_fragments_html(view.summary)}</div>'
+        '<div class="column"><h3>📊 Характеристика элемента</h3><hr>'
+        f'{_fragments_html(view.properties)}</div>'
+        '<div class="column"><h3>🧪 Свойства соединений</h3><hr>'
+        f'{_fragments_html(view.compounds)}</div>'
+        '</div>'
+        f'{notes}'
+    )
+
+
+def build_payload(table_html, views):
+    """Данные компонента: HTML таблицы и карточки {символ: HTML}"""
+    return {
+        "table": table_html,
+        "cards": {symbol: view_to_html(view) for symbol, view in views.items()}
+    }
+
+
+def publish_payload(payload):
+    """Записывает данные в DATA_DIR под именем с хешем содержимого.
+
+    Возвращает (хеш, None) или, если записать файл не удалось, (хеш, payload) —
+    тогда данные передаются компоненту напрямую. Файлы других версий не удаляются:
+    их может раздавать другой процесс со своей версией данных.
+    """
+    text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(DATA_DIR, f"elements-{version}.json")
+    if os.path.exists(path):
+        return version, None
+    # Запись через временный файл: другой процесс не увидит файл наполовину
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temporary, path)
+    except OSError:
+        logger.warning("Не удалось записать %s, данные таблицы передаются в браузер напрямую", path, exc_info=True)
+        return version, payload
+    finally:
+        # После os.replace временного файла уже нет; при любой ошибке он не остаётся в каталоге
+        if os.path.exists(temporary):
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+    return version, None
+
+
+def element_panel(version, selected=None, highlight=None, key=None, payload=None):
+    """Таблица с карточкой элемента в браузере.
+
+    version — хеш из publish_payload, selected — элемент, выбранный на сервере
+    (например, поиском), highlight — символы, подходящие под фильтр (None — без фильтра),
+    payload — данные, если publish_payload не смог записать файл.
+    Возвращает {"symbol", "action": "quiz", "nonce"}, когда пользователь отправил
+    элемент в тест, {"version", "action": "payload", "nonce"}, когда браузер не смог
+    загрузить файл данных и их нужно передать в payload, иначе последнее
+    отправленное значение или None.
+    """
+    return _component(version=version, selected=selected, highlight=highlight, payload=payload, key=key, default=None)
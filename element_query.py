@@ -0,0 +1,301 @@
+import bisect
+import re
+from types import MappingProxyType
+from element_categories import CATEGORIES, CATEGORY_KEY
+
+# ==================== ЗАПРОСЫ ПО СВОЙСТВАМ ЭЛЕМЕНТОВ ====================
+#
+# Для каждого значения каждого свойства (валентность IV, степень окисления +3,
+# амфотерный оксид, 4-й период, …) при загрузке строится битовая маска: бит i
+# установлен, если этим значением обладает i-й элемент индекса (по порядку
+# номеров). 118 элементов помещаются в одно целое Python-число, поэтому
+# И / ИЛИ / НЕ над свойствами — это &, |, ~ над целыми, без обхода данных.
+# Диапазоны номера и массы — разность двух префиксных масок по отсортированным
+# значениям.
+
+VALENCY = "Валентность"
+OXIDATION_STATE = "Степень окисления"
+OXIDE_CHARACTER = "Характер оксида"
+CATEGORY = CATEGORY_KEY
+PERIOD = "Период"
+GROUP = "Группа"
+
+# Свойства со списком значений (в порядке отображения в панели фильтра)
+ATTRIBUTES = (CATEGORY, VALENCY, OXIDATION_STATE, OXIDE_CHARACTER, PERIOD, GROUP)
+
+# Числовые свойства для запросов по диапазону
+NUMBER = "Порядковый номер"
+MASS = "Атомная масса"
+NUMERIC_ATTRIBUTES = (NUMBER, MASS)
+
+# Характер высшего оксида (определяется по первому ключевому слову в описании)
+BASIC = "основный"
+AMPHOTERIC = "амфотерный"
+ACIDIC = "кислотный"
+NON_SALT_FORMING = "несолеобразующий"
+NO_DATA = "нет данных"
+OXIDE_CHARACTERS = (BASIC, AMPHOTERIC, ACIDIC, NON_SALT_FORMING, NO_DATA)
+
+_OXIDE_KEYWORDS = re.compile(r"основн|амфотерн|кислотн|несолеобразующ", re.IGNORECASE)
+_OXIDE_BY_KEYWORD = {
+    "основн": BASIC,
+    "амфотерн": AMPHOTERIC,
+    "кислотн": ACIDIC,
+    "несолеобразующ": NON_SALT_FORMING
+}
+
+_ROMAN = ("0", "I", "II", "III", "IV", "V", "VI", "VII", "VIII")
+
+# Последние номера периодов; f-элементы (La–Yb, Ac–No) не относят к группам
+_PERIOD_ENDS = (2, 10, 18, 36, 54, 86, 118)
+_F_BLOCK = frozenset(range(57, 71)) | frozenset(range(89, 103))
+
+# Выбор "Фильтр #<маска>" в тесте — пул вопросов из результата запроса
+FILTER_PREFIX = "Фильтр #"
+
+
+def oxide_character(element):
+    """Характер высшего оксида элемента (одно из OXIDE_CHARACTERS)"""
+    text = (element.get('Высший оксид') or {}).get('Характер') or ""
+    match = _OXIDE_KEYWORDS.search(text)
+    return _OXIDE_BY_KEYWORD[match.group().lower()] if match else NO_DATA
+
+
+def period_and_group(number):
+    """(период, группа 1–18 или None для f-элементов) по порядковому номеру"""
+    period = bisect.bisect_left(_PERIOD_ENDS, number) + 1
+    if number in _F_BLOCK:
+        return period, None
+    if number == 1:
+        return 1, 1
+    if number == 2:
+        return 1, 18
+    start = _PERIOD_ENDS[period - 2]
+    # Позиция в периоде; в 6-м и 7-м периодах пропускаем 14 f-элементов
+    offset = number - start - (14 if period >= 6 and number - start > 2 else 0)
+    length = _PERIOD_ENDS[period - 1] - start - (14 if period >= 6 else 0)
+    # Во 2-м и 3-м периодах между 2-й и 13-й группами нет элементов
+    if length == 8 and offset > 2:
+        offset += 10
+    return period, offset
+
+
+def _element_values(element):
+    # Значения списковых свойств одного элемента
+    period, group = period_and_group(element[NUMBER])
+    return {
+        CATEGORY: (element[CATEGORY_KEY],),
+        VALENCY: tuple(value for value in element.get(VALENCY, ()) if value in _ROMAN),
+        OXIDATION_STATE: tuple(element.get(OXIDATION_STATE, ())),
+        OXIDE_CHARACTER: (oxide_character(element),),
+        PERIOD: (period,),
+        GROUP: (group,) if group is not None else ()
+    }
+
+
+def _sort_key(attribute):
+    if attribute == CATEGORY:
+        return lambda value: CATEGORIES.index(value) if value in CATEGORIES else len(CATEGORIES)
+    if attribute == VALENCY:
+        return _ROMAN.index
+    if attribute == OXIDATION_STATE:
+        return int
+    if attribute == OXIDE_CHARACTER:
+        return OXIDE_CHARACTERS.index
+    return lambda value: value
+
+
+def mask_symbols(symbols, mask):
+    """Символы, чьи биты установлены в маске (в порядке номеров)"""
+    result = []
+    while mask:
+        lowest = mask & -mask
+        position = lowest.bit_length() - 1
+        if position >= len(symbols):
+            break
+        result.append(symbols[position])
+        mask ^= lowest
+    return tuple(result)
+
+
+def filter_selection(mask):
+    """Вариант выбора для теста по маске: "Фильтр #<hex>" """
+    return f"{FILTER_PREFIX}{mask:x}"
+
+
+def selection_mask(selection):
+    """Маска из варианта выбора "Фильтр #<hex>" (или None для обычных вариантов)"""
+    if not selection.startswith(FILTER_PREFIX):
+        return None
+    try:
+        return int(selection[len(FILTER_PREFIX):], 16)
+    except ValueError:
+        return 0
+
+
+# ---- Запросы ----
+
+class Query:
+    """Запрос к ElementBitsets; комбинируется операторами &, | и ~"""
+
+    __slots__ = ()
+
+    def __and__(self, other):
+        return _Combined(self, other, "&")
+
+    def __or__(self, other):
+        return _Combined(self, other, "|")
+
+    def __invert__(self):
+        return _Not(self)
+
+    def mask(self, bitsets):
+        raise NotImplementedError
+
+
+class Has(Query):
+    """Элементы, у которых свойство attribute принимает значение value"""
+
+    __slots__ = ("attribute", "value")
+
+    def __init__(self, attribute, value):
+        self.attribute = attribute
+        self.value = value
+
+    def mask(self, bitsets):
+        return bitsets.value_mask(self.attribute, self.value)
+
+    def __repr__(self):
+        return f"Has({self.attribute!r}, {self.value!r})"
+
+
+class Between(Query):
+    """Элементы, у которых числовое свойство в диапазоне [low, high]"""
+
+    __slots__ = ("attribute", "low", "high")
+
+    def __init__(self, attribute, low, high):
+        self.attribute = attribute
+        self.low = low
+        self.high = high
+
+    def mask(self, bitsets):
+        return bitsets.range_mask(self.attribute, self.low, self.high)
+
+    def __repr__(self):
+        return f"Between({self.attribute!r}, {self.low!r}, {self.high!r})"
+
+
+class _Combined(Query):
+    __slots__ = ("left", "right", "operator")
+
+    def __init__(self, left, right, operator):
+        self.left = left
+        self.right = right
+        self.operator = operator
+
+    def mask(self, bitsets):
+        left, right = self.left.mask(bitsets), self.right.mask(bitsets)
+        return left & right if self.operator == "&" else left | right
+
+    def __repr__(self):
+        return f"({self.left!r} {self.operator} {self.right!r})"
+
+
+class _Not(Query):
+    __slots__ = ("query",)
+
+    def __init__(self, query):
+        self.query = query
+
+    def mask(self, bitsets):
+        return bitsets.all_mask & ~self.query.mask(bitsets)
+
+    def __repr__(self):
+        return f"~{self.query!r}"
+
+
+def any_of(attribute, values):
+    """Has(attribute, v1) | Has(attribute, v2) | … (None для пустого списка)"""
+    query = None
+    for value in values:
+        query = Has(attribute, value) if query is None else query | Has(attribute, value)
+    return query
+
+
+def all_of(queries):
+    """Пересечение запросов (None пропускаются; None, если запросов нет)"""
+    result = None
+    for query in queries:
+        if query is not None:
+            result = query if result is None else result & query
+    return result
+
+
+# ---- Битовые маски ----
+
+class ElementBitsets:
+    """Битовые маски значений свойств, построенные один раз по индексу элементов.
+
+    values — {свойство: {значение: маска}} (значения в порядке отображения),
+    бит i соответствует index.symbols[i].
+    """
+
+    __slots__ = ("symbols", "all_mask", "values", "_sorted", "_prefix")
+
+    def __init__(self, index):
+        self.symbols = index.symbols
+        self.all_mask = (1 << len(self.symbols)) - 1
+
+        values = {attribute: {} for attribute in ATTRIBUTES}
+        for position, symbol in enumerate(self.symbols):
+            bit = 1 << position
+            for attribute, element_values in _element_values(index.get(symbol)).items():
+                masks = values[attribute]
+                for value in element_values:
+                    masks[value] = masks.get(value, 0) | bit
+        self.values = MappingProxyType({
+            attribute: MappingProxyType({
+                value: masks[value] for value in sorted(masks, key=_sort_key(attribute))
+            })
+            for attribute, masks in values.items()
+        })
+
+        # Диапазоны: значения по возрастанию и маски первых k элементов этого порядка
+        sorted_values = {}
+        prefixes = {}
+        for attribute in NUMERIC_ATTRIBUTES:
+            order = sorted(
+                range(len(self.symbols)),
+                key=lambda position: float(index.get(self.symbols[position])[attribute])
+            )
+            sorted_values[attribute] = tuple(float(index.get(self.symbols[position])[attribute]) for position in order)
+            prefix = [0]
+            for position in order:
+                prefix.append(prefix[-1] | 1 << position)
+            prefixes[attribute] = tuple(prefix)
+        self._sorted = MappingProxyType(sorted_values)
+        self._prefix = MappingProxyType(prefixes)
+
+    def value_mask(self, attribute, value):
+        """Маска элементов со значением value свойства attribute (0, если таких нет)"""
+        return self.values.get(attribute, {}).get(value, 0)
+
+    def range_mask(self, attribute, low, high):
+        """Маска элементов с числовым свойством в [low, high]"""
+        values = self._sorted[attribute]
+        prefix = self._prefix[attribute]
+        return prefix[bisect.bisect_right(values, high)] & ~prefix[bisect.bisect_left(values, low)]
+
+    def mask(self, query):
+        """Маска результата запроса (все элементы для None)"""
+        return self.all_mask if query is None else query.mask(self)
+
+    def select(self, query):
+        """Символы элементов, подходящих под запрос"""
+        return mask_symbols(self.symbols, self.mask(query))
+
+    def bounds(self, attribute):
+        """(минимум, максимум) числового свойства"""
+        values = self._sorted[attribute]
+        return (values[0], values[-1]) if values else (0.0, 0.0)
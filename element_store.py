@@ -0,0 +1,31 @@
+from types import MappingProxyType
+
+# ==================== НЕИЗМЕНЯЕМОЕ ХРАНИЛИЩЕ ЭЛЕМЕНТОВ ====================
+#
+# Данные элементов загружаются один раз на процесс (st.cache_resource) и
+# отдаются всем сессиям одним и тем же объектом, без копирования. Чтобы ни одна
+# сессия не могла случайно изменить общие данные, словари заменяются
+# представлениями только для чтения (MappingProxyType), а списки — кортежами.
+
+
+def freeze(value):
+    """Глубокая неизменяемая копия: dict → MappingProxyType, list → tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def freeze_elements(elements_data):
+    """Неизменяемый набор элементов {символ: данные} для общего доступа из всех сессий"""
+    return freeze(elements_data)
+
+
+def thaw(value):
+    """Обычные dict/list из замороженных данных (например, для json.dumps)"""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
@@ -0,0 +1,216 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+from element_categories import CATEGORY_KEY, CATEGORY_ICONS
+
+# ==================== ГОТОВЫЕ КАРТОЧКИ ЭЛЕМЕНТОВ ====================
+
+# Карточка элемента для show_element_info. Каждая часть — кортеж фрагментов
+# (markdown, unsafe_allow_html); notes — кортеж пар ("info" | "warning", текст)
+ElementView = namedtuple("ElementView", ["symbol", "summary", "properties", "compounds", "notes"])
+
+# Особые случаи, для которых под карточкой выводится примечание
+SPECIAL_CASES = {
+    "O": "Кислород является компонентом оксидов, сам по себе не имеет характера оксида",
+    "F": "Фтор образует только OF₂, который является нетипичным оксидом",
+    "H": "Вода (H₂O) не является типичным оксидом",
+    "Xe": "Ксенон может образовывать оксиды в исключительных условиях",
+    "Rn": "Радон радиоактивен, его оксиды практически не изучены"
+}
+
+
+def _md(text, allow_html=False):
+    return (text, allow_html)
+
+
+def _shorten(text, limit=100):
+    return f"*{text[:limit]}...*" if len(text) > limit else f"*{text}*"
+
+
+def format_atomic_mass(symbol, atomic_mass):
+    """Атомная масса для отображения и пояснение об округлении"""
+    if not isinstance(atomic_mass, (int, float)):
+        return str(atomic_mass), ""
+    # Специальная обработка для хлора (всегда 35.5)
+    if symbol == "Cl":
+        return "35.5", " (всегда 35.5)"
+    if atomic_mass == int(atomic_mass):
+        return f"{int(atomic_mass)}", " (целое число)"
+    # Определяем сколько знаков после запятой
+    mass_str = str(atomic_mass)
+    if '.' not in mass_str:
+        return f"{atomic_mass}", " (целое число)"
+    decimal_places = len(mass_str.split('.')[1])
+    if decimal_places <= 3:
+        return f"{atomic_mass:.{decimal_places}f}", f" (округлено до {decimal_places} знаков)"
+    return f"{atomic_mass:.3f}", " (округлено до 3 знаков)"
+
+
+def format_valency(valency):
+    """Строка валентности с проверкой некорректных значений"""
+    if valency and valency[0] not in ["-", "", "0", 0]:
+        # Фильтруем некорректные значения
+        valid_valencies = [str(v) for v in valency if v not in ["-", ""] and str(v).strip()]
+        if valid_valencies:
+            return f"**🔸 Валентность:** {', '.join(valid_valencies)}"
+        return "**🔸 Валентность:** не указана"
+    if valency and valency[0] in ["0", 0]:
+        return "**🔸 Валентность:** 0 (инертный)"
+    return "**🔸 Валентность:** не указана"
+
+
+def split_oxidation_states(oxidation):
+    """Разделяет степени окисления на отрицательные, положительные и нулевые"""
+    positive = []
+    negative = []
+    neutral = []
+    for ox in oxidation:
+        ox_str = str(ox).strip()
+        if ox_str.startswith('+'):
+            positive.append(ox_str)
+        elif ox_str.startswith('-'):
+            negative.append(ox_str)
+        elif ox_str == '0':
+            neutral.append(ox_str)
+        else:
+            # Если нет знака, но число
+            try:
+                num = float(ox_str)
+                if num > 0:
+                    positive.append(f"+{int(num) if num.is_integer() else num}")
+                elif num < 0:
+                    negative.append(str(num))
+                else:
+                    neutral.append("0")
+            except ValueError:
+                positive.append(ox_str)
+    return negative, positive, neutral
+
+
+def format_oxidation(oxidation):
+    """Фрагмент со степенями окисления в цветовой маркировке"""
+    if not oxidation:
+        return _md("**🔸 Степень окисления:** не указана")
+    negative, positive, neutral = split_oxidation_states(oxidation)
+    oxidation_display = []
+    if negative:
+        oxidation_display.append(f"<span style='color:red'>{', '.join(negative)}</span>")
+    if positive:
+        oxidation_display.append(f"<span style='color:blue'>{', '.join(positive)}</span>")
+    if neutral:
+        oxidation_display.append(f"<span style='color:green'>{', '.join(neutral)}</span>")
+    if oxidation_display:
+        return _md(f"**🔸 Степень окисления:** {'; '.join(oxidation_display)}", True)
+    return _md(f"**🔸 Степень окисления:** {', '.join(oxidation)}")
+
+
+def oxide_icon(oxide_nature):
+    """Значок в зависимости от характера оксида"""
+    nature = oxide_nature.lower()
+    if "кислот" in nature:
+        return "🧪"
+    if "основ" in nature:
+        return "🛡️"
+    if "амфотер" in nature:
+        return "⚖️"
+    if "не образует" in nature:
+        return "🚫"
+    return "🧪"
+
+
+def _summary(symbol, element):
+    mass_display, round_info = format_atomic_mass(symbol, element['Атомная масса'])
+    element_type = element[CATEGORY_KEY]
+    return (
+        _md(f"# {symbol}"),
+        _md(f"## {element['Название']}"),
+        _md("---"),
+        _md(f"**🔢 Порядковый номер:** {element['Порядковый номер']}"),
+        _md(f"**⚖️ Относительная атомная масса:** {mass_display}{round_info}"),
+        _md(f"**{CATEGORY_ICONS[element_type]} Тип элемента:** {element_type}")
+    )
+
+
+def _properties(element):
+    fragments = [
+        _md(format_valency(element.get('Валентность', []))),
+        format_oxidation(element.get('Степень окисления', []))
+    ]
+    electron_config = element.get('Электронная конфигурация', '')
+    if electron_config:
+        # Верхние индексы уже записаны в данных символами ¹²³…
+        fragments.append(_md("**🔸 Электронная конфигурация:**"))
+        fragments.append(_md(f"`{electron_config}`", True))
+    else:
+        fragments.append(_md("**🔸 Электронная конфигурация:** не указана"))
+    return tuple(fragments)
+
+
+def _compounds(element):
+    fragments = []
+
+    # Формула простого вещества
+    simple_formula = element.get('Формула простого вещества', {})
+    if simple_formula and isinstance(simple_formula, Mapping):
+        formula = simple_formula.get('Формула', '')
+        description = simple_formula.get('Описание', '')
+        if formula and formula != "—":
+            fragments.append(_md("**🔹 Формула простого вещества:**"))
+            fragments.append(_md(f"**{formula}**"))
+            if description:
+                fragments.append(_md(_shorten(description)))
+
+    # Высший оксид
+    higher_oxide = element.get('Высший оксид', {})
+    if higher_oxide and isinstance(higher_oxide, Mapping):
+        oxide_formula = higher_oxide.get('Формула', '')
+        oxide_nature = higher_oxide.get('Характер', '')
+        if oxide_formula and oxide_formula != "—":
+            fragments.append(_md(f"**🔹 {oxide_icon(oxide_nature)} Высший оксид:**"))
+            fragments.append(_md(f"**{oxide_formula}**"))
+            if oxide_nature:
+                fragments.append(_md(f"*Характер: {oxide_nature}*"))
+
+    # Летучее водородное соединение
+    volatile_hydrogen = element.get('Летучее водородное соединение', {})
+    if volatile_hydrogen and isinstance(volatile_hydrogen, Mapping):
+        vh_formula = volatile_hydrogen.get('Формула', '')
+        vh_description = volatile_hydrogen.get('Описание', '')
+        if vh_formula and vh_formula != "—":
+            fragments.append(_md("**🔹 Летучее водородное соединение:**"))
+            fragments.append(_md(f"**{vh_formula}**"))
+            if vh_description:
+                fragments.append(_md(_shorten(vh_description)))
+
+    return tuple(fragments)
+
+
+def _notes(symbol, element):
+    notes = []
+    # Проверка согласованности данных
+    higher_oxide = element.get('Высший оксид', {})
+    if isinstance(higher_oxide, Mapping) and "предположительно" in higher_oxide.get('Характер', '').lower():
+        notes.append(("info", "💡 *Характер оксида предположительный, так как элемент синтетический или малоизучен*"))
+    if symbol in SPECIAL_CASES:
+        notes.append(("warning", f"📝 **Примечание:** {SPECIAL_CASES[symbol]}"))
+    return tuple(notes)
+
+
+def build_element_view(symbol, element):
+    """Готовая карточка одного элемента"""
+    return ElementView(
+        symbol=symbol,
+        summary=_summary(symbol, element),
+        properties=_properties(element),
+        compounds=_compounds(element),
+        notes=_notes(symbol, element)
+    )
+
+
+def build_element_views(index):
+    """Карточки всех элементов индекса: {символ: ElementView}.
+
+    Результат кешируется на весь процесс и общий для всех сессий, поэтому
+    возвращается представление только для чтения.
+    """
+    return MappingProxyType({symbol: build_element_view(symbol, index.get(symbol)) for symbol in index.symbols})
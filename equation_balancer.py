@@ -0,0 +1,195 @@
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd
+import numpy as np
+from molar_mass import parse_formula, FormulaError
+
+# ==================== УРАВНИВАНИЕ ХИМИЧЕСКИХ РЕАКЦИЙ ====================
+#
+# Уравнение переводится в матрицу состава (строки — элементы, столбцы —
+# вещества, у продуктов знак минус). Коэффициенты — целочисленный базис
+# одномерного ядра этой матрицы. Сначала пробуем быстрый путь через SVD в NumPy,
+# результат которого всегда проверяется точно в целых числах; если проверка не
+# прошла или система плохо обусловлена — точное решение в рациональных числах
+# (Fraction). Нормализованные уравнения кешируются (LRU).
+
+# Размер LRU-кеша уравненных реакций
+EQUATION_CACHE_SIZE = 2048
+
+# Максимальное число обусловленности, при котором пробуем быстрый путь NumPy
+MAX_CONDITION = 1e8
+
+# С какого размера пакета balance_many использует пул процессов
+PROCESS_POOL_THRESHOLD = 64
+
+_ARROW = re.compile(r"\s*(?:<=>|=>|->|⇌|⇒|⟶|→|=)\s*")
+_COEFFICIENT = re.compile(r"^\d+\s*")
+_SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+_TO_SUBSCRIPTS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+
+# Уравненная реакция: вещества без коэффициентов и целые коэффициенты по порядку
+BalancedEquation = namedtuple("BalancedEquation", ["reactants", "products", "coefficients", "text"])
+
+
+class EquationError(ValueError):
+    """Уравнение не удалось разобрать или уравнять"""
+
+
+def _normalize_species(species):
+    # "2 H₂O" → "H2O": убираем коэффициент, пробелы и подстрочные цифры
+    text = species.translate(_SUBSCRIPTS).replace(" ", "")
+    return _COEFFICIENT.sub("", text)
+
+
+def parse_equation(equation):
+    """Нормализованные вещества: (кортеж реагентов, кортеж продуктов)"""
+    sides = _ARROW.split(equation.strip())
+    if len(sides) != 2:
+        raise EquationError("Уравнение должно содержать одну стрелку или знак «=»")
+    reactants, products = (
+        tuple(_normalize_species(species) for species in side.split("+") if species.strip())
+        for side in sides
+    )
+    if not reactants or not products:
+        raise EquationError("В уравнении должны быть и реагенты, и продукты")
+    return reactants, products
+
+
+def composition_matrix(reactants, products):
+    """(элементы, матрица состава): строки — элементы, у продуктов отрицательные числа"""
+    compositions = []
+    for sign, side in ((1, reactants), (-1, products)):
+        for species in side:
+            try:
+                compositions.append({symbol: sign * atoms for symbol, atoms in parse_formula(species)})
+            except FormulaError as e:
+                raise EquationError(str(e)) from None
+    elements = list(dict.fromkeys(symbol for composition in compositions for symbol in composition))
+    return elements, [[composition.get(symbol, 0) for composition in compositions] for symbol in elements]
+
+
+def _integer_vector(values):
+    # Рациональный вектор → наименьший целый вектор того же направления
+    denominator = 1
+    for value in values:
+        denominator = denominator * value.denominator // gcd(denominator, value.denominator)
+    integers = [int(value * denominator) for value in values]
+    divisor = 0
+    for value in integers:
+        divisor = gcd(divisor, value)
+    return [value // divisor for value in integers] if divisor else integers
+
+
+def _nullspace_exact(matrix, size):
+    """Базис ядра в рациональных числах (приведение к ступенчатому виду)"""
+    rows = [[Fraction(value) for value in row] for row in matrix]
+    pivots = []
+    rank = 0
+    for column in range(size):
+        pivot = next((i for i in range(rank, len(rows)) if rows[i][column] != 0), None)
+        if pivot is None:
+            continue
+        rows[rank], rows[pivot] = rows[pivot], rows[rank]
+        lead = rows[rank][column]
+        rows[rank] = [value / lead for value in rows[rank]]
+        for i, row in enumerate(rows):
+            if i != rank and row[column] != 0:
+                factor = row[column]
+                rows[i] = [a - factor * b for a, b in zip(row, rows[rank])]
+        pivots.append(column)
+        rank += 1
+        if rank == len(rows):
+            break
+
+    free = [column for column in range(size) if column not in pivots]
+    if len(free) != 1:
+        raise EquationError(
+            "Уравнение нельзя уравнять" if not free
+            else "Коэффициенты определены неоднозначно (несколько независимых реакций)"
+        )
+    solution = [Fraction(0)] * size
+    solution[free[0]] = Fraction(1)
+    for row, column in zip(rows, pivots):
+        solution[column] = -row[free[0]]
+    return _integer_vector(solution)
+
+
+def _nullspace_numpy(matrix, size):
+    """Быстрый путь: ядро через SVD; None, если система вырождена или плохо обусловлена"""
+    values = np.array(matrix, dtype=float)
+    _, singular, vt = np.linalg.svd(values)
+    tolerance = max(values.shape) * np.finfo(float).eps * singular[0]
+    rank = int((singular > tolerance).sum())
+    if rank != size - 1 or singular[0] / singular[rank - 1] > MAX_CONDITION:
+        return None
+    # Последняя правая сингулярная строка — направление ядра
+    vector = vt[-1]
+    vector = vector / vector[np.argmax(np.abs(vector))]
+    return _integer_vector([Fraction(float(value)).limit_denominator(10 ** 6) for value in vector])
+
+
+def _satisfies(matrix, coefficients):
+    # Точная проверка в целых числах: каждый элемент сохраняется
+    return all(sum(a * c for a, c in zip(row, coefficients)) == 0 for row in matrix)
+
+
+@lru_cache(maxsize=EQUATION_CACHE_SIZE)
+def balance_species(reactants, products):
+    """Целые коэффициенты для нормализованных веществ (кешируется)"""
+    elements, matrix = composition_matrix(reactants, products)
+    size = len(reactants) + len(products)
+    if not elements:
+        raise EquationError("В уравнении нет элементов")
+
+    coefficients = _nullspace_numpy(matrix, size) if len(matrix) >= size - 1 else None
+    if coefficients is None or not any(coefficients) or not _satisfies(matrix, coefficients):
+        coefficients = _nullspace_exact(matrix, size)
+
+    if all(value < 0 for value in coefficients):
+        coefficients = [-value for value in coefficients]
+    if any(value <= 0 for value in coefficients):
+        raise EquationError("Уравнение нельзя уравнять положительными коэффициентами")
+    return tuple(coefficients)
+
+
+def format_species(species):
+    """Вещество для отображения: цифры после символов и скобок — подстрочные"""
+    return re.sub(r"(?<=[A-Za-z)\]}])\d+", lambda match: match.group().translate(_TO_SUBSCRIPTS), species)
+
+
+def format_equation(reactants, products, coefficients):
+    terms = [
+        f"{coefficient if coefficient != 1 else ''}{format_species(species)}"
+        for species, coefficient in zip(reactants + products, coefficients)
+    ]
+    return f"{' + '.join(terms[:len(reactants)])} → {' + '.join(terms[len(reactants):])}"
+
+
+def balance(equation):
+    """Уравнивает реакцию вида "H2 + O2 = H2O" → BalancedEquation"""
+    reactants, products = parse_equation(equation)
+    coefficients = balance_species(reactants, products)
+    return BalancedEquation(reactants, products, coefficients, format_equation(reactants, products, coefficients))
+
+
+def _balance_or_error(equation):
+    # Для пула процессов: исключения возвращаются как текст
+    try:
+        return balance(equation), None
+    except EquationError as e:
+        return None, str(e)
+
+
+def balance_many(equations, workers=None, chunksize=16):
+    """Уравнивает пакет реакций: список пар (BalancedEquation или None, текст ошибки или None).
+
+    Большие пакеты (от PROCESS_POOL_THRESHOLD) распределяются по процессам.
+    """
+    equations = list(equations)
+    if len(equations) < PROCESS_POOL_THRESHOLD or workers == 1:
+        return [_balance_or_error(equation) for equation in equations]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_balance_or_error, equations, chunksize=chunksize))
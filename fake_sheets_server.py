@@ -0,0 +1,723 @@
+"""Локальный сервер, изображающий Google Sheets API v4, для нагрузочных тестов без сети.
+
+Запуск отдельным процессом:
+    python fake_sheets_server.py --port 8765 --latency 0.08 --read-quota 60 --write-quota 60
+
+Приложение подключается к нему через настройку хранилища пользователей:
+
+    # .streamlit/secrets.toml
+    [user_store]
+    backend = "gsheets"
+    sheets_url = "http://127.0.0.1:8765"
+
+или переменной окружения USER_STORE_SHEETS_URL. Счётчики запросов:
+GET /_fake/stats, сброс — POST /_fake/reset.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# ==================== ЭМУЛЯЦИЯ GOOGLE SHEETS API ====================
+#
+# Реализовано подмножество API, которым пользуется gspread в auth_system_gsheets:
+#   spreadsheets.get          — метаданные (open_by_key, worksheet)
+#   spreadsheets.batchUpdate  — addSheet / deleteSheet (add_worksheet)
+#   values.get                — get_all_records, get, acell
+#   values.update             — update
+#   values.append             — append_row, append_rows
+#   values.batchUpdate        — values_batch_update
+# Данные хранятся в памяти процесса. Задержка, квоты (429) и сбои настраиваются
+# при запуске и через POST /_fake/config; каждый запрос учитывается в счётчике
+# своей точки входа, чтобы проверять бюджет запросов на действие пользователя.
+
+API_PREFIX = "/v4/spreadsheets/"
+CONTROL_PREFIX = "/_fake/"
+
+READ_ENDPOINTS = {"spreadsheets.get", "values.get"}
+
+# Квоты Google считаются за минуту на пользователя
+QUOTA_WINDOW = 60.0
+
+DEFAULT_SHEET_TITLE = "Sheet1"
+DEFAULT_ROWS = 1000
+DEFAULT_COLUMNS = 26
+
+STATUS_NAMES = {
+    400: "INVALID_ARGUMENT",
+    404: "NOT_FOUND",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE"
+}
+
+_CELL = re.compile(r"^([A-Z]*)(\d*)$")
+_NUMBER = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+
+class ApiError(Exception):
+    """Ошибка в формате Google API: {"error": {"code", "message", "status"}}"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+    def body(self):
+        return {"error": {"code": self.code, "message": self.message, "status": STATUS_NAMES.get(self.code, "UNKNOWN")}}
+
+
+# ==================== ДИАПАЗОНЫ A1 ====================
+
+def column_number(letters):
+    """A → 1, Z → 26, AA → 27"""
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def column_letters(number):
+    """1 → A, 27 → AA"""
+    letters = ""
+    while number:
+        number, rest = divmod(number - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+def quote_title(title):
+    return "'" + title.replace("'", "''") + "'"
+
+
+def split_range(range_name):
+    """"'Лист 1'!A1:B2" → ("Лист 1", "A1:B2"); без "!" — (название, None) или (None, A1)"""
+    if range_name.startswith("'"):
+        end = 1
+        while True:
+            end = range_name.index("'", end)
+            if range_name[end + 1:end + 2] == "'":
+                end += 2
+                continue
+            break
+        title = range_name[1:end].replace("''", "'")
+        rest = range_name[end + 1:]
+        return title, rest[1:] if rest.startswith("!") else None
+    if "!" in range_name:
+        title, a1 = range_name.rsplit("!", 1)
+        return title, a1
+    if parse_a1(range_name) is not None:
+        return None, range_name
+    return range_name, None
+
+
+def parse_a1(a1):
+    """"A2:F" → (2, 1, None, 6): первая строка и столбец, последние (None — до конца листа)"""
+    parts = a1.upper().split(":")
+    if len(parts) > 2:
+        return None
+    cells = [_CELL.match(part) for part in parts]
+    if not all(cells) or not any(cell.group(0) for cell in cells):
+        return None
+    first_column, first_row = cells[0].groups()
+    last_column, last_row = cells[-1].groups()
+    if len(parts) == 1 and not (first_column and first_row):
+        return None
+    return (
+        int(first_row) if first_row else 1,
+        column_number(first_column) if first_column else 1,
+        int(last_row) if last_row else None,
+        column_number(last_column) if last_column else None
+    )
+
+
+def a1_range(title, first_row, first_column, last_row, last_column):
+    start = f"{column_letters(first_column)}{first_row}"
+    end = f"{column_letters(last_column)}{last_row}"
+    return f"{quote_title(title)}!{start}" + (f":{end}" if end != start else "")
+
+
+# ==================== ЗНАЧЕНИЯ ЯЧЕЕК ====================
+
+def parse_input(value, value_input_option):
+    """Значение ячейки после записи: USER_ENTERED распознаёт числа и логические значения"""
+    if value_input_option != "USER_ENTERED" or not isinstance(value, str):
+        return value
+    if value.startswith("'"):
+        return value[1:]
+    if _NUMBER.match(value.strip()):
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    if value.upper() in ("TRUE", "FALSE"):
+        return value.upper() == "TRUE"
+    return value
+
+
+def render(value, value_render_option):
+    """Значение в ответе: FORMATTED_VALUE (по умолчанию) — всегда строка"""
+    if value_render_option in ("UNFORMATTED_VALUE", "FORMULA"):
+        return value
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _is_empty(value):
+    return value is None or value == ""
+
+
+# ==================== ДАННЫЕ ТАБЛИЦ ====================
+
+class Sheet:
+    """Лист: свойства в формате API и разреженная сетка значений"""
+
+    def __init__(self, sheet_id, title, index, rows=DEFAULT_ROWS, columns=DEFAULT_COLUMNS):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.index = index
+        self.rows = rows
+        self.columns = columns
+        self.values = []
+
+    def properties(self):
+        return {
+            "sheetId": self.sheet_id,
+            "title": self.title,
+            "index": self.index,
+            "sheetType": "GRID",
+            "gridProperties": {"rowCount": self.rows, "columnCount": self.columns}
+        }
+
+    def last_row(self):
+        """Номер последней непустой строки (0 — лист пуст)"""
+        for number in range(len(self.values), 0, -1):
+            if any(not _is_empty(value) for value in self.values[number - 1]):
+                return number
+        return 0
+
+    def check_grid(self, last_row, last_column, range_name):
+        if last_row > self.rows or last_column > self.columns:
+            raise ApiError(400, f"Range ({range_name}) exceeds grid limits. Max rows: {self.rows}, max columns: {self.columns}")
+
+    def read(self, first_row, first_column, last_row, last_column, value_render_option):
+        rows = []
+        for number in range(first_row, min(last_row, len(self.values)) + 1):
+            row = self.values[number - 1][first_column - 1:last_column]
+            rendered = [("" if _is_empty(value) else render(value, value_render_option)) for value in row]
+            while rendered and rendered[-1] == "":
+                rendered.pop()
+            rows.append(rendered)
+        # API не возвращает пустые строки в конце диапазона
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def write(self, first_row, first_column, values, value_input_option):
+        for offset, row in enumerate(values):
+            number = first_row + offset
+            while len(self.values) < number:
+                self.values.append([])
+            target = self.values[number - 1]
+            for column_offset, value in enumerate(row):
+                if value is None:
+                    continue  # null в запросе — ячейку не трогать
+                column = first_column + column_offset
+                while len(target) < column:
+                    target.append(None)
+                target[column - 1] = parse_input(value, value_input_option)
+
+
+class Spreadsheet:
+    def __init__(self, spreadsheet_id, title="Fake spreadsheet"):
+        self.spreadsheet_id = spreadsheet_id
+        self.title = title
+        self.sheets = []
+        self._next_sheet_id = 0
+
+    def add_sheet(self, title, rows=DEFAULT_ROWS, columns=DEFAULT_COLUMNS, index=None):
+        if self.find(title) is not None:
+            raise ApiError(400, f'Invalid requests[0].addSheet: A sheet with the name "{title}" already exists. Please enter another name.')
+        sheet = Sheet(self._next_sheet_id, title, len(self.sheets), rows, columns)
+        self._next_sheet_id += 1
+        self.sheets.insert(len(self.sheets) if index is None else index, sheet)
+        for position, item in enumerate(self.sheets):
+            item.index = position
+        return sheet
+
+    def delete_sheet(self, sheet_id):
+        sheet = next((item for item in self.sheets if item.sheet_id == sheet_id), None)
+        if sheet is None:
+            raise ApiError(400, f"Invalid requests[0].deleteSheet: No grid with id: {sheet_id}")
+        self.sheets.remove(sheet)
+        for position, item in enumerate(self.sheets):
+            item.index = position
+
+    def find(self, title):
+        return next((sheet for sheet in self.sheets if sheet.title == title), None)
+
+    def metadata(self):
+        return {
+            "spreadsheetId": self.spreadsheet_id,
+            "properties": {"title": self.title, "locale": "ru_RU", "timeZone": "Europe/Moscow"},
+            "sheets": [{"properties": sheet.properties()} for sheet in self.sheets],
+            "spreadsheetUrl": f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}/edit"
+        }
+
+    def resolve(self, range_name):
+        """Лист и границы диапазона (открытые границы — до края сетки)"""
+        title, a1 = split_range(range_name)
+        # Как в API: диапазон без "!" — это сначала название листа ("Sheet1"), и только потом ячейка A1
+        if title is None and self.find(a1) is not None:
+            title, a1 = a1, None
+        sheet = self.sheets[0] if title is None and self.sheets else self.find(title)
+        if sheet is None:
+            raise ApiError(400, f"Unable to parse range: {range_name}")
+        if a1 is None:
+            return sheet, (1, 1, sheet.rows, sheet.columns)
+        bounds = parse_a1(a1)
+        if bounds is None:
+            raise ApiError(400, f"Unable to parse range: {range_name}")
+        first_row, first_column, last_row, last_column = bounds
+        return sheet, (first_row, first_column, last_row or sheet.rows, last_column or sheet.columns)
+
+
+# ==================== ЗАДЕРЖКА, КВОТЫ, СБОИ ====================
+
+class FakeSheets:
+    """Состояние сервера: таблицы, настройки отказов и счётчики запросов.
+
+    latency / jitter — задержка каждого запроса в секундах (jitter — случайная добавка);
+    read_quota / write_quota — запросов в минуту, сверх них ответ 429 (None — без ограничения);
+    failure_rate — доля запросов, завершающихся ошибкой failure_status;
+    auto_create — таблица с неизвестным ID создаётся при первом обращении.
+    """
+
+    SETTINGS = ("latency", "jitter", "read_quota", "write_quota", "quota_window",
+                "failure_rate", "failure_status", "auto_create")
+
+    def __init__(self, latency=0.0, jitter=0.0, read_quota=None, write_quota=None, quota_window=QUOTA_WINDOW,
+                 failure_rate=0.0, failure_status=503, auto_create=True, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.read_quota = read_quota
+        self.write_quota = write_quota
+        self.quota_window = quota_window
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.auto_create = auto_create
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+        self._requests = {"read": deque(), "write": deque()}
+        self._planned_failures = []
+        self.calls = {}
+        self.errors = {}
+
+    # ---- настройка ----
+
+    def configure(self, **settings):
+        with self._lock:
+            for name, value in settings.items():
+                if name not in self.SETTINGS:
+                    raise ValueError(f"Неизвестная настройка: {name}")
+                setattr(self, name, value)
+
+    def fail_next(self, count=1, status=500, endpoint=None):
+        """Следующие count запросов к endpoint (None — к любому) завершатся ошибкой status"""
+        with self._lock:
+            self._planned_failures.append([endpoint, status, count])
+
+    def stats(self):
+        """{"calls": {точка входа: запросов}, "errors": {точка входа: {код: число}}, "total": всего}"""
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": {endpoint: dict(codes) for endpoint, codes in self.errors.items()},
+                "total": sum(self.calls.values())
+            }
+
+    def reset(self, data=False):
+        """Сбрасывает счётчики, квоты и запланированные сбои (data=True — и все таблицы)"""
+        with self._lock:
+            self.calls = {}
+            self.errors = {}
+            self._planned_failures = []
+            for window in self._requests.values():
+                window.clear()
+            if data:
+                self._spreadsheets = {}
+
+    def spreadsheet(self, spreadsheet_id, title=None):
+        """Таблица по ID (создаётся, если её нет) — для подготовки данных в тестах"""
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(spreadsheet_id) or self._create(spreadsheet_id)
+            if title is not None:
+                spreadsheet.title = title
+            return spreadsheet
+
+    # ---- обработка запроса ----
+
+    def _delay(self):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _injected_failure(self, endpoint):
+        # Вызывается под self._lock
+        for planned in self._planned_failures:
+            planned_endpoint, status, count = planned
+            if planned_endpoint is None or planned_endpoint == endpoint:
+                planned[2] -= 1
+                if planned[2] <= 0:
+                    self._planned_failures.remove(planned)
+                return ApiError(status, "Injected failure")
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            return ApiError(self.failure_status, "The service is currently unavailable.")
+        return None
+
+    def _check_quota(self, endpoint):
+        # Вызывается под self._lock; отклонённые запросы квоту не расходуют, как у Google
+        kind = "read" if endpoint in READ_ENDPOINTS else "write"
+        limit = self.read_quota if kind == "read" else self.write_quota
+        if limit is None:
+            return None
+        window = self._requests[kind]
+        now = time.monotonic()
+        while window and now - window[0] >= self.quota_window:
+            window.popleft()
+        if len(window) >= limit:
+            metric = "Read requests" if kind == "read" else "Write requests"
+            return ApiError(429, f"Quota exceeded for quota metric '{metric}' and limit '{metric} per minute per user' "
+                                 "of service 'sheets.googleapis.com'.")
+        window.append(now)
+        return None
+
+    def handle(self, method, path, params, body):
+        """Обрабатывает запрос к API: возвращает (код, тело ответа)"""
+        endpoint, spreadsheet_id, range_name = route(method, path)
+        self._delay()
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            try:
+                if endpoint == "unknown":
+                    raise ApiError(404, f"Method not found: {method} {path}")
+                error = self._injected_failure(endpoint) or self._check_quota(endpoint)
+                if error is not None:
+                    raise error
+                return 200, self._dispatch(endpoint, spreadsheet_id, range_name, params, body)
+            except ApiError as error:
+                codes = self.errors.setdefault(endpoint, {})
+                codes[error.code] = codes.get(error.code, 0) + 1
+                return error.code, error.body()
+
+    def _create(self, spreadsheet_id):
+        # Как и в Google, в новой таблице сразу есть один лист
+        spreadsheet = Spreadsheet(spreadsheet_id)
+        spreadsheet.add_sheet(DEFAULT_SHEET_TITLE)
+        self._spreadsheets[spreadsheet_id] = spreadsheet
+        return spreadsheet
+
+    def _open(self, spreadsheet_id):
+        if spreadsheet_id in self._spreadsheets:
+            return self._spreadsheets[spreadsheet_id]
+        if not self.auto_create:
+            raise ApiError(404, "Requested entity was not found.")
+        return self._create(spreadsheet_id)
+
+    def _dispatch(self, endpoint, spreadsheet_id, range_name, params, body):
+        spreadsheet = self._open(spreadsheet_id)
+        if endpoint == "spreadsheets.get":
+            return spreadsheet.metadata()
+        if endpoint == "spreadsheets.batchUpdate":
+            return self._batch_update(spreadsheet, body)
+        if endpoint == "values.get":
+            return self._values_get(spreadsheet, range_name, params)
+        if endpoint == "values.update":
+            option = _value_input_option(params)
+            return self._write(spreadsheet, [(range_name, body.get("values", []))], option)[0]
+        if endpoint == "values.append":
+            return self._append(spreadsheet, range_name, body.get("values", []), _value_input_option(params))
+        if endpoint == "values.batchUpdate":
+            option = body.get("valueInputOption")
+            if option not in ("RAW", "USER_ENTERED"):
+                raise ApiError(400, "Invalid valueInputOption")
+            data = [(item["range"], item.get("values", [])) for item in body.get("data", [])]
+            responses = self._write(spreadsheet, data, option)
+            return {
+                "spreadsheetId": spreadsheet.spreadsheet_id,
+                "totalUpdatedRows": sum(item["updatedRows"] for item in responses),
+                "totalUpdatedColumns": sum(item["updatedColumns"] for item in responses),
+                "totalUpdatedCells": sum(item["updatedCells"] for item in responses),
+                "totalUpdatedSheets": len({item["updatedRange"].rsplit("!", 1)[0] for item in responses}),
+                "responses": responses
+            }
+        raise ApiError(404, f"Method not found: {endpoint}")
+
+    def _batch_update(self, spreadsheet, body):
+        replies = []
+        for request in body.get("requests", []):
+            if "addSheet" in request:
+                properties = request["addSheet"].get("properties", {})
+                grid = properties.get("gridProperties", {})
+                sheet = spreadsheet.add_sheet(
+                    properties.get("title", f"Sheet{len(spreadsheet.sheets) + 1}"),
+                    grid.get("rowCount", DEFAULT_ROWS),
+                    grid.get("columnCount", DEFAULT_COLUMNS),
+                    properties.get("index")
+                )
+                replies.append({"addSheet": {"properties": sheet.properties()}})
+            elif "deleteSheet" in request:
+                spreadsheet.delete_sheet(request["deleteSheet"]["sheetId"])
+                replies.append({})
+            else:
+                raise ApiError(400, f"Unsupported request: {', '.join(request)}")
+        return {"spreadsheetId": spreadsheet.spreadsheet_id, "replies": replies}
+
+    def _values_get(self, spreadsheet, range_name, params):
+        sheet, (first_row, first_column, last_row, last_column) = spreadsheet.resolve(range_name)
+        sheet.check_grid(first_row, first_column, range_name)
+        last_row = min(last_row, sheet.rows)
+        last_column = min(last_column, sheet.columns)
+        response = {
+            "range": a1_range(sheet.title, first_row, first_column, last_row, last_column),
+            "majorDimension": "ROWS"
+        }
+        values = sheet.read(first_row, first_column, last_row, last_column, params.get("valueRenderOption"))
+        if values:
+            response["values"] = values
+        return response
+
+    def _write(self, spreadsheet, data, value_input_option):
+        # Сначала проверяются все диапазоны: при ошибке не записывается ничего, как в API
+        planned = []
+        for range_name, values in data:
+            sheet, (first_row, first_column, _, _) = spreadsheet.resolve(range_name)
+            height = len(values)
+            width = max((len(row) for row in values), default=0)
+            sheet.check_grid(first_row + max(height, 1) - 1, first_column + max(width, 1) - 1, range_name)
+            planned.append((sheet, first_row, first_column, values, height, width))
+        responses = []
+        for sheet, first_row, first_column, values, height, width in planned:
+            sheet.write(first_row, first_column, values, value_input_option)
+            responses.append({
+                "spreadsheetId": spreadsheet.spreadsheet_id,
+                "updatedRange": a1_range(sheet.title, first_row, first_column,
+                                         first_row + max(height, 1) - 1, first_column + max(width, 1) - 1),
+                "updatedRows": height,
+                "updatedColumns": width,
+                "updatedCells": sum(len(row) for row in values)
+            })
+        return responses
+
+    def _append(self, spreadsheet, range_name, values, value_input_option):
+        sheet, (_, first_column, _, _) = spreadsheet.resolve(range_name)
+        last_row = sheet.last_row()
+        first_row = last_row + 1
+        height = len(values)
+        width = max((len(row) for row in values), default=0)
+        # Дозапись расширяет лист, если строк или столбцов не хватает
+        sheet.rows = max(sheet.rows, first_row + height - 1)
+        sheet.columns = max(sheet.columns, first_column + width - 1)
+        sheet.write(first_row, first_column, values, value_input_option)
+        response = {
+            "spreadsheetId": spreadsheet.spreadsheet_id,
+            "updates": {
+                "spreadsheetId": spreadsheet.spreadsheet_id,
+                "updatedRange": a1_range(sheet.title, first_row, first_column,
+                                         first_row + max(height, 1) - 1, first_column + max(width, 1) - 1),
+                "updatedRows": height,
+                "updatedColumns": width,
+                "updatedCells": sum(len(row) for row in values)
+            }
+        }
+        if last_row:
+            response["tableRange"] = a1_range(sheet.title, 1, first_column, last_row, sheet.columns)
+        return response
+
+
+def _value_input_option(params):
+    option = params.get("valueInputOption")
+    if option not in ("RAW", "USER_ENTERED"):
+        raise ApiError(400, "'valueInputOption' is required but not specified")
+    return option
+
+
+def route(method, path):
+    """(точка входа, ID таблицы, диапазон) по методу и пути запроса"""
+    if not path.startswith(API_PREFIX):
+        return "unknown", None, None
+    rest = path[len(API_PREFIX):]
+    if "/values" not in rest:
+        if method == "GET" and ":" not in rest:
+            return "spreadsheets.get", unquote(rest), None
+        if method == "POST" and rest.endswith(":batchUpdate"):
+            return "spreadsheets.batchUpdate", unquote(rest[:-len(":batchUpdate")]), None
+        return "unknown", None, None
+    spreadsheet_id, values_path = rest.split("/values", 1)
+    spreadsheet_id = unquote(spreadsheet_id)
+    if values_path == ":batchUpdate" and method == "POST":
+        return "values.batchUpdate", spreadsheet_id, None
+    if not values_path.startswith("/"):
+        return "unknown", None, None
+    range_name = values_path[1:]
+    if method == "POST" and range_name.endswith(":append"):
+        return "values.append", spreadsheet_id, unquote(range_name[:-len(":append")])
+    if method == "GET":
+        return "values.get", spreadsheet_id, unquote(range_name)
+    if method == "PUT":
+        return "values.update", spreadsheet_id, unquote(range_name)
+    return "unknown", None, None
+
+
+# ==================== HTTP-СЕРВЕР ====================
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive: клиент gspread переиспользует соединения, как с настоящим API
+    protocol_version = "HTTP/1.1"
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _reply(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _serve(self, method):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            body = self._read_json()
+        except ValueError:
+            self._reply(400, ApiError(400, "Invalid JSON payload received.").body())
+            return
+        if url.path.startswith(CONTROL_PREFIX):
+            self._control(method, url.path[len(CONTROL_PREFIX):], body)
+            return
+        status, response = self.server.sheets.handle(method, url.path, params, body)
+        self._reply(status, response)
+
+    def _control(self, method, command, body):
+        sheets = self.server.sheets
+        try:
+            if method == "GET" and command == "stats":
+                self._reply(200, sheets.stats())
+            elif method == "POST" and command == "reset":
+                sheets.reset(bool(body.get("data")))
+                self._reply(200, {})
+            elif method == "POST" and command == "config":
+                sheets.configure(**body)
+                self._reply(200, {name: getattr(sheets, name) for name in sheets.SETTINGS})
+            elif method == "POST" and command == "fail":
+                sheets.fail_next(body.get("count", 1), body.get("status", 500), body.get("endpoint"))
+                self._reply(200, {})
+            else:
+                self._reply(404, ApiError(404, f"Unknown command: {command}").body())
+        except (TypeError, ValueError) as e:
+            self._reply(400, ApiError(400, str(e)).body())
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def do_PUT(self):
+        self._serve("PUT")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeSheetsServer:
+    """HTTP-сервер FakeSheets в фоновом потоке.
+
+    with FakeSheetsServer(latency=0.05) as server:
+        os.environ["USER_STORE_SHEETS_URL"] = server.url
+        ...
+        server.sheets.stats()
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, verbose=False, **settings):
+        self.sheets = FakeSheets(**settings)
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.sheets = self.sheets
+        self._server.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def serve_forever(self):
+        """Обслуживает запросы в текущем потоке (запуск из командной строки)"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка каждого запроса, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--read-quota", type=int, default=None, help="запросов чтения в минуту (сверх — 429)")
+    parser.add_argument("--write-quota", type=int, default=None, help="запросов записи в минуту (сверх — 429)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="доля запросов с ошибкой")
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="печатать каждый запрос")
+    args = parser.parse_args()
+
+    server = FakeSheetsServer(
+        args.host, args.port, verbose=args.verbose, latency=args.latency, jitter=args.jitter,
+        read_quota=args.read_quota, write_quota=args.write_quota,
+        failure_rate=args.failure_rate, failure_status=args.failure_status, seed=args.seed
+    )
+    print(f"Fake Google Sheets API: {server.url} (счётчики: {server.url}{CONTROL_PREFIX}stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
 import streamlit as st
 import json
 import random
-from auth_system_gsheets import show_login_page, show_user_profile, update_user_stats, get_user_stats
+import os
+import html
+import math
+from element_index import ElementIndex, SELECTION_OPTIONS
+from element_categories import add_categories, CATEGORY_KEY, CATEGORY_COLORS
+from element_views import build_element_views
+from element_compiler import load_compiled_elements
+from element_store import freeze_elements
+from question_deck import build_question_bank, draw, BANK_VARIANTS
+from adaptive_selector import AdaptiveSelector
+from search_index import TrigramIndex, element_documents
+from partial_rerun import fragment, rerun_fragment
+from element_panel import element_panel, build_payload, publish_payload
+from element_query import (
+    ElementBitsets, ATTRIBUTES, NUMBER, MASS, FILTER_PREFIX, Between, any_of, all_of,
+    mask_symbols, filter_selection
+)
+from auth_system_gsheets import show_login_page, show_user_profile, log_user_answers, get_user_stats, flush_user_stats
 
 #Настройка страницы
 st.set_page_config(
@@ -11,31 +28,88 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-#Загрузка данных элементов
-@st.cache_data
+ELEMENTS_FILE = 'chemical_elements.json'
+
+#Сколько результатов поиска показывать в сайдбаре
+SEARCH_RESULTS = 5
+
+#Версия набора данных: меняется при каждом изменении файла с элементами
+def get_dataset_version():
+    try:
+        stat = os.stat(ELEMENTS_FILE)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except FileNotFoundError:
+        return "missing"
+
+#Загрузка данных элементов из скомпилированного двоичного кеша (.cache/),
+#который пересобирается автоматически при изменении JSON
 def load_elements():
     try:
-        with open('chemical_elements.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        try:
+            elements_data = load_compiled_elements(ELEMENTS_FILE).to_dict()
+        except ValueError:
+            #Структура файла не поддерживается компилятором или кеш повреждён —
+            #читаем JSON напрямую
+            with open(ELEMENTS_FILE, 'r', encoding='utf-8') as f:
+                elements_data = json.load(f)
+        #Категория элемента вычисляется один раз и хранится вместе с данными;
+        #после этого данные замораживаются — они общие для всех сессий
+        return freeze_elements(add_categories(elements_data))
     except FileNotFoundError:
         st.error("❌ Файл chemical_elements.json не найден!")
-        return {}
+        return freeze_elements({})
 
-#Функция для определения цвета элемента 
-def get_element_color(element_type, symbol, number):
-    if symbol == "H":
-        return "#E0FFFF"  #Голубо для неметаллов
+#Индекс элементов строится один раз на версию данных и общий для всех сессий
+#(cache_resource не копирует данные при каждом перезапуске скрипта, каждая
+#сессия получает тот же самый неизменяемый объект)
+@st.cache_resource
+def get_element_index(version):
+    return ElementIndex(load_elements())
 
-    if symbol in ["He", "Ne", "Ar", "Kr", "Xe", "Rn", "Og"]:
-        return "#E0FFFF"  #голубой для неметаллов
+#Готовые карточки всех элементов (строятся один раз на версию данных)
+@st.cache_resource
+def get_element_views(_index, version):
+    return build_element_views(_index)
 
-    metal_types = ["Металл", "Щелочной металл", "Щелочноземельный металл", 
-                   "Переходный металл", "Лантаноид", "Актиноид", "Постпереходный металл"]
-    
-    if element_type in metal_types:
-        return "#FFE4CC"  #Персиковый для металлов
-    else:
-        return "#E0FFFF"  #Голубой для неметаллов
+#Поисковый индекс по названиям, символам, номерам, формулам и описаниям
+#(строится один раз на версию данных, поиск не перебирает записи элементов)
+@st.cache_resource
+def get_search_index(_index, version):
+    return TrigramIndex(element_documents(_index))
+
+#Битовые маски значений свойств для фильтра (строятся один раз на версию данных)
+@st.cache_resource
+def get_element_bitsets(_index, version):
+    return ElementBitsets(_index)
+
+#Разобранные электронные конфигурации, матрица сходства и ближайшие соседи
+#(NumPy импортируется только при первом построении, а не при старте приложения)
+@st.cache_resource
+def get_configuration_table(_index, version):
+    from electron_configs import ConfigurationTable
+    return ConfigurationTable(_index)
+
+#Сколько банков вопросов держать в памяти процесса: 8 вариантов выбора x 3 уровня x
+#BANK_VARIANTS = 96 постоянных банков плюс запас для выборок фильтра ("Фильтр #<маска>"),
+#которых может быть сколько угодно — редко используемые банки вытесняются и строятся заново
+QUESTION_BANK_CACHE_SIZE = 256
+
+#Банк готовых вопросов для пары (вариант выбора, уровень); общий для всех сессий.
+#На сложном уровне неправильные конфигурации берутся из ближайших соседей
+@st.cache_resource(max_entries=QUESTION_BANK_CACHE_SIZE)
+def get_question_bank(_index, version, selection, level, variant):
+    neighbours = get_configuration_table(_index, version).neighbours if level == "Сложный" else None
+    return build_question_bank(_index, selection, level, variant, neighbours)
+
+#Вопрос по компактной ссылке из st.session_state: (выбор, уровень, вариант банка, номер)
+def get_question(index, selection, level, variant, number):
+    bank = get_question_bank(index, get_dataset_version(), selection, level, variant)
+    #Набор данных мог измениться с момента выбора вопроса
+    return bank[number] if number < len(bank) else None
+
+#Цвет ячейки по канонической категории элемента
+def get_element_color(element):
+    return CATEGORY_COLORS[element[CATEGORY_KEY]]
 
 # Упрощенная таблица Менделеева с компактными ячейками
 def create_periodic_table_layout():
@@ -80,9 +154,190 @@ def create_periodic_table_layout():
     
     return positions, lanthanoids, actinoids
 
+#Общая таблица стилей для быстрого режима (одна на всю таблицу)
+PERIODIC_TABLE_CSS = """
+<style>
+.pt-grid {
+    display: grid;
+    grid-template-columns: repeat(18, minmax(0, 1fr));
+    gap: 2px;
+    margin-bottom: 8px;
+}
+.pt-cell {
+    padding: 4px;
+    border-radius: 6px;
+    text-align: center;
+    border: 1px solid #ccc;
+    height: 65px;
+    display: flex;
+    flex-direction: column;
+    justify-content: center;
+    transition: all 0.2s;
+    color: #000;
+}
+.pt-cell:hover {
+    transform: scale(1.03);
+    border-color: #666;
+    box-shadow: 0 0 5px rgba(0,0,0,0.1);
+}
+.pt-cell b { font-size: 16px; line-height: 1.2; }
+.pt-cell span { font-size: 10px; color: #666; line-height: 1.1; }
+.pt-cell small { font-size: 9px; color: #888; margin-top: 1px; line-height: 1.1; }
+.pt-label { grid-column: 1 / span 18; font-weight: bold; margin-top: 8px; }
+</style>
+"""
+
+def _table_cell_html(element_symbol, element, color, row, column):
+    name = element['Название']
+    short_name = f"{name[:8]}{'...' if len(name) > 8 else ''}"
+    return (
+        f'<div class="pt-cell" data-symbol="{element_symbol}" '
+        f'style="background-color: {color}; grid-row: {row}; grid-column: {column};" '
+        f'title="{html.escape(name)}">'
+        f'<b>{element_symbol}</b><span>{element["Порядковый номер"]}</span>'
+        f'<small>{html.escape(short_name)}</small></div>'
+    )
+
+#Вся таблица (основная сетка + лантаноиды и актиноиды) одним HTML-документом.
+#Кешируется по версии набора данных, поэтому строится один раз
+@st.cache_data
+def build_periodic_table_html(_index, version):
+    positions, lanthanoids, actinoids = create_periodic_table_layout()
+    cells = []
+    
+    for (period, group), element_symbol in positions.items():
+        element = _index.get(element_symbol)
+        if element is not None:
+            color = get_element_color(element)
+            cells.append(_table_cell_html(element_symbol, element, color, period + 1, group + 1))
+    
+    #f-блок: строка-подпись и строка ячеек для каждого ряда
+    for row, (label, symbols) in enumerate([
+        ("Лантаноиды:", lanthanoids),
+        ("Актиноиды:", actinoids)
+    ]):
+        label_row = 8 + row * 2
+        cells.append(f'<div class="pt-label" style="grid-row: {label_row};">{label}</div>')
+        for i, symbol in enumerate(symbols):
+            element = _index.get(symbol)
+            if element is not None:
+                color = get_element_color(element)
+                cells.append(_table_cell_html(symbol, element, color, label_row + 1, i + 3))
+    
+    return PERIODIC_TABLE_CSS + '<div class="pt-grid">' + "".join(cells) + '</div>'
+
+#Панель фильтра: значения одного свойства объединяются через ИЛИ, свойства — через И.
+#Результат — битовая маска в st.session_state.element_filter (None — фильтр не задан)
+def show_element_filter(index):
+    bitsets = get_element_bitsets(index, get_dataset_version())
+    active = st.session_state.get("element_filter") is not None
+    with st.expander("🧪 **Фильтр по свойствам**", expanded=active):
+        conditions = []
+        cols = st.columns(3)
+        for i, attribute in enumerate(ATTRIBUTES):
+            with cols[i % 3]:
+                values = st.multiselect(f"**{attribute}:**", list(bitsets.values[attribute]), key=f"filter_{attribute}")
+            conditions.append(any_of(attribute, values))
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            low, high = (int(bound) for bound in bitsets.bounds(NUMBER))
+            number_range = st.slider(f"**{NUMBER}:**", low, high, (low, high), key="filter_number")
+            if number_range != (low, high):
+                conditions.append(Between(NUMBER, *number_range))
+        with col2:
+            bounds = bitsets.bounds(MASS)
+            low, high = float(math.floor(bounds[0])), float(math.ceil(bounds[1]))
+            mass_range = st.slider(f"**{MASS}:**", low, high, (low, high), step=0.5, key="filter_mass")
+            if mass_range != (low, high):
+                conditions.append(Between(MASS, *mass_range))
+        
+        exclude = st.checkbox("НЕ: показать элементы, которые не подходят под условия", key="filter_exclude")
+        query = all_of(conditions)
+        if query is None:
+            st.session_state.element_filter = None
+            return
+        if exclude:
+            query = ~query
+        mask = bitsets.mask(query)
+        st.session_state.element_filter = mask
+        st.caption(f"Найдено элементов: {bin(mask).count('1')}")
+
+#Символы, подходящие под фильтр (None — фильтр не задан)
+def _filter_matches(index):
+    mask = st.session_state.get("element_filter")
+    return None if mask is None else frozenset(mask_symbols(index.symbols, mask))
+
+def _cell_opacity(matches, symbol):
+    return 1 if matches is None or symbol in matches else 0.3
+
+def _sync_element_picker():
+    st.session_state.selected_element = st.session_state.element_picker or None
+
+def _select_search_result(symbol):
+    st.session_state.selected_element = symbol
+
+#Поиск элемента в сайдбаре: префиксы по мере ввода, опечатки, ранжирование
+def show_search(index):
+    query = st.text_input(
+        "🔍 **Поиск элемента:**",
+        key="search_query",
+        placeholder="железо, Fe, 26, H₂SO₄, благородный газ…"
+    )
+    if not query.strip():
+        return
+    results = get_search_index(index, get_dataset_version()).search(query, limit=SEARCH_RESULTS)
+    if not results:
+        st.caption("Ничего не найдено")
+    for symbol, _ in results:
+        element = index.get(symbol)
+        st.button(
+            f"{element['Порядковый номер']}. {symbol} — {element['Название']}",
+            key=f"search_{symbol}",
+            on_click=_select_search_result,
+            args=(symbol,),
+            use_container_width=True
+        )
+
+#Быстрый режим: таблица одним блоком, выбор элемента через один selectbox
+def show_periodic_table_html(index):
+    table_html = build_periodic_table_html(index, get_dataset_version())
+    
+    selected = st.session_state.get("selected_element")
+    if selected:
+        #Подсветка выбранного элемента — одна короткая строка поверх кешированного HTML
+        table_html += (
+            f'<style>.pt-cell[data-symbol="{selected}"] '
+            f'{{ border: 2px solid #d9534f; box-shadow: 0 0 6px rgba(217,83,79,0.6); }}</style>'
+        )
+    matches = _filter_matches(index)
+    if matches is not None:
+        #Фильтр: неподходящие ячейки приглушаются, подходящие обводятся
+        table_html += '<style>.pt-cell { opacity: 0.3; }'
+        if matches:
+            table_html += (
+                ", ".join(f'.pt-cell[data-symbol="{symbol}"]' for symbol in sorted(matches))
+                + ' { opacity: 1; box-shadow: inset 0 0 0 2px #f0ad4e; }'
+            )
+        table_html += '</style>'
+    st.markdown(table_html, unsafe_allow_html=True)
+    
+    st.session_state.element_picker = selected if selected in index else ""
+    st.selectbox(
+        "🔎 **Выберите элемент:**",
+        ("",) + index.symbols,
+        format_func=lambda sym: (
+            f"{index.get(sym)['Порядковый номер']}. {sym} — {index.get(sym)['Название']}"
+            if sym else "— выберите элемент —"
+        ),
+        key="element_picker",
+        on_change=_sync_element_picker
+    )
+
 #Отображение компактной таблицы
-def show_periodic_table(elements_data):
+def show_periodic_table(index):
     positions, lanthanoids, actinoids = create_periodic_table_layout()
+    matches = _filter_matches(index)
     
     #Основная таблица 7x18
     for period in range(7):
@@ -91,24 +346,15 @@ def show_periodic_table(elements_data):
             with cols[group]:
                 if (period, group) in positions:
                     element_symbol = positions[(period, group)]
-                    if element_symbol in elements_data:
-                        element = elements_data[element_symbol]
-                        #тип элемента больше не в структуре, используем словарь для цвета
-                        element_type = "Неметалл"  # Базовое значение
-                        #определяем тип для цвета на основе группы
-                        if group in [0, 1]:  #щелочные и щелочноземельные металлы
-                            element_type = "Металл"
-                        elif 2 <= group <= 11:  #переходные металлы
-                            element_type = "Переходный металл"
-                        elif group >= 12 and element_symbol not in ["B", "C", "N", "O", "F", "Ne", "Si", "P", "S", "Cl", "Ar", "Ge", "As", "Se", "Br", "Kr"]:
-                            element_type = "Металл"
-                        
-                        color = get_element_color(element_type, element_symbol, element["Порядковый номер"])
+                    element = index.get(element_symbol)
+                    if element is not None:
+                        color = get_element_color(element)
                         
                         #Создаем красивую ячейку с помощью HTML 
                         cell_html = f"""
                         <div style="
                             background-color: {color}; 
+                            opacity: {_cell_opacity(matches, element_symbol)};
                             padding: 4px; 
                             margin: 1px; 
                             border-radius: 6px; 
@@ -138,7 +384,6 @@ def show_periodic_table(elements_data):
                             use_container_width=True
                         ):
                             st.session_state.selected_element = element_symbol
-                            st.rerun()
                         
                         # Стилизую кнопку, чтобы она была аккуратной и невидимой
                         st.markdown(f"""
@@ -202,15 +447,15 @@ def show_periodic_table(elements_data):
     lan_cols = st.columns(14)
     for i, symbol in enumerate(lanthanoids):
         with lan_cols[i]:
-            if symbol in elements_data:
-                element = elements_data[symbol]
-                #для лантаноидов использую цвет металлов
-                color = get_element_color("Лантаноид", symbol, element["Порядковый номер"])
+            element = index.get(symbol)
+            if element is not None:
+                color = get_element_color(element)
                 
                 #создаю ячейку для лантаноида
                 cell_html = f"""
                 <div style="
                     background-color: {color}; 
+                    opacity: {_cell_opacity(matches, symbol)};
                     padding: 4px; 
                     margin: 1px; 
                     border-radius: 6px; 
@@ -240,7 +485,6 @@ def show_periodic_table(elements_data):
                     use_container_width=True
                 ):
                     st.session_state.selected_element = symbol
-                    st.rerun()
                 
                 #Стилизую кнопку
                 st.markdown(f"""
@@ -295,15 +539,15 @@ def show_periodic_table(elements_data):
     act_cols = st.columns(14)
     for i, symbol in enumerate(actinoids):
         with act_cols[i]:
-            if symbol in elements_data:
-                element = elements_data[symbol]
-                # Для актиноидов используем цвет металлов
-                color = get_element_color("Актиноид", symbol, element["Порядковый номер"])
+            element = index.get(symbol)
+            if element is not None:
+                color = get_element_color(element)
                 
                 # Создаем красивую ячейку для актиноида
                 cell_html = f"""
                 <div style="
                     background-color: {color}; 
+                    opacity: {_cell_opacity(matches, symbol)};
                     padding: 4px; 
                     margin: 1px; 
                     border-radius: 6px; 
@@ -333,7 +577,6 @@ def show_periodic_table(elements_data):
                     use_container_width=True
                 ):
                     st.session_state.selected_element = symbol
-                    st.rerun()
                 
                 # Стилизуем кнопку
                 st.markdown(f"""
@@ -384,11 +627,15 @@ def show_periodic_table(elements_data):
                 """, unsafe_allow_html=True)
 
 
-def show_element_info(element_symbol, elements_data):
-    if element_symbol not in elements_data:
-        return
+def _show_fragments(fragments):
+    for text, allow_html in fragments:
+        st.markdown(text, unsafe_allow_html=allow_html)
 
-    element = elements_data[element_symbol]
+def show_element_info(element_symbol, index):
+    #Все строки карточки уже отформатированы заранее — здесь только вывод
+    view = get_element_views(index, get_dataset_version()).get(element_symbol)
+    if view is None:
+        return
 
     st.markdown("---")
     
@@ -396,234 +643,315 @@ def show_element_info(element_symbol, elements_data):
     col1, col2, col3 = st.columns([1, 1, 1])
 
     with col1:
-        st.markdown(f"# {element_symbol}")
-        st.markdown(f"## {element['Название']}")
-        st.markdown("---")
-
-        # Порядковый номер с иконкой
-        st.markdown(f"**🔢 Порядковый номер:** {element['Порядковый номер']}")
-        
-        # Атомная масса с округлением - ИЗМЕНЕНИЕ 3: добавляем скобочки с информацией об округлении
-        atomic_mass = element['Атомная масса']
-        if isinstance(atomic_mass, (int, float)):
-            # Специальная обработка для хлора (всегда 35.5)
-            if element_symbol == "Cl":
-                mass_display = "35.5"
-                round_info = " (всегда 35.5)"
-            elif atomic_mass == int(atomic_mass):
-                mass_display = f"{int(atomic_mass)}"
-                round_info = " (целое число)"
-            else:
-                # Определяем сколько знаков после запятой
-                mass_str = str(atomic_mass)
-                if '.' in mass_str:
-                    decimal_places = len(mass_str.split('.')[1])
-                    if decimal_places <= 3:
-                        mass_display = f"{atomic_mass:.{decimal_places}f}"
-                        round_info = f" (округлено до {decimal_places} знаков)"
-                    else:
-                        mass_display = f"{atomic_mass:.3f}"
-                        round_info = " (округлено до 3 знаков)"
-                else:
-                    mass_display = f"{atomic_mass}"
-                    round_info = " (целое число)"
-        else:
-            mass_display = str(atomic_mass)
-            round_info = ""
-        
-        st.markdown(f"**⚖️ Относительная атомная масса:** {mass_display}{round_info}")
-        
-        #Тип элемента определяем на основе группы в таблице
-        element_type = "Неизвестно"
-        element_number = element['Порядковый номер']
-        
-        #простое определение типа для отображения (не для цвета)
-        if element_number <= 2:
-            if element_symbol == "H":
-                element_type = "Неметалл"
-            else:
-                element_type = "Благородный газ"
-        elif 3 <= element_number <= 10:
-            if element_symbol in ["B", "C", "N", "O", "F", "Ne"]:
-                element_type = "Неметалл"
-            elif element_symbol in ["Li", "Be"]:
-                element_type = "Металл"
-        elif 11 <= element_number <= 18:
-            if element_symbol in ["Na", "Mg", "Al"]:
-                element_type = "Металл"
-            else:
-                element_type = "Неметалл"
-        else:
-            if element_symbol in ["He", "Ne", "Ar", "Kr", "Xe", "Rn"]:
-                element_type = "Благородный газ"
-            elif element_symbol in ["B", "C", "Si", "N", "P", "As", "O", "S", "Se", "Te", "F", "Cl", "Br", "I", "At"]:
-                element_type = "Неметалл"
-            else:
-                element_type = "Металл"
-        
-        type_icon = "⚪"
-        if "металл" in element_type.lower():
-            if "благород" in element_type.lower():
-                type_icon = "🟣"
-            else:
-                type_icon = "🟠"
-        elif "неметалл" in element_type.lower():
-            type_icon = "🟢"
-        elif "благородный газ" in element_type.lower():
-            type_icon = "🟣"
-        
-        st.markdown(f"**{type_icon} Тип элемента:** {element_type}")
+        _show_fragments(view.summary)
 
     with col2:
         st.subheader("📊 Характеристика элемента")
         st.markdown("---")
-        
-        #Валентность с проверкой
-        valency = element.get('Валентность', [])
-        if valency and valency[0] not in ["-", "", "0", 0]:
-            # Фильтруем некорректные значения
-            valid_valencies = [str(v) for v in valency if v not in ["-", ""] and str(v).strip()]
-            if valid_valencies:
-                valency_str = ', '.join(valid_valencies)
-                st.markdown(f"**🔸 Валентность:** {valency_str}")
-            else:
-                st.markdown("**🔸 Валентность:** не указана")
-        else:
-            if valency and valency[0] in ["0", 0]:
-                st.markdown("**🔸 Валентность:** 0 (инертный)")
-            else:
-                st.markdown("**🔸 Валентность:** не указана")
-        
-        #Степень окисления с цветовой маркировкой
-        oxidation = element.get('Степень окисления', [])
-        if oxidation:
-            #Разделяю на положительные и отрицательные
-            positive = []
-            negative = []
-            neutral = []
-            
-            for ox in oxidation:
-                ox_str = str(ox).strip()
-                if ox_str.startswith('+'):
-                    positive.append(ox_str)
-                elif ox_str.startswith('-'):
-                    negative.append(ox_str)
-                elif ox_str == '0':
-                    neutral.append(ox_str)
-                else:
-                    # Если нет знака, но число
-                    try:
-                        num = float(ox_str)
-                        if num > 0:
-                            positive.append(f"+{int(num) if num.is_integer() else num}")
-                        elif num < 0:
-                            negative.append(str(num))
-                        else:
-                            neutral.append("0")
-                    except:
-                        positive.append(ox_str)
-            
-            oxidation_display = []
-            if negative:
-                oxidation_display.append(f"<span style='color:red'>{', '.join(negative)}</span>")
-            if positive:
-                oxidation_display.append(f"<span style='color:blue'>{', '.join(positive)}</span>")
-            if neutral:
-                oxidation_display.append(f"<span style='color:green'>{', '.join(neutral)}</span>")
-            
-            if oxidation_display:
-                st.markdown(f"**🔸 Степень окисления:** {'; '.join(oxidation_display)}", unsafe_allow_html=True)
-            else:
-                st.markdown(f"**🔸 Степень окисления:** {', '.join(oxidation)}")
-        else:
-            st.markdown("**🔸 Степень окисления:** не указана")
-        
-        #Электронная конфигурация с форматированием
-        electron_config = element.get('Электронная конфигурация', '')
-        if electron_config:
-            st.markdown(f"**🔸 Электронная конфигурация:**")
-            # Форматируем верхние индексы
-            formatted_config = electron_config
-            # Заменяем цифры в верхнем регистре на верхние индексы
-            for i in range(10):
-                formatted_config = formatted_config.replace(f"{i}", f"{i}")
-            
-            st.markdown(f"`{formatted_config}`", unsafe_allow_html=True)
-        else:
-            st.markdown("**🔸 Электронная конфигурация:** не указана")
+        _show_fragments(view.properties)
     
     with col3:
         st.subheader("🧪 Свойства соединений")
         st.markdown("---")
-        
-        # Формула простого вещества
-        simple_formula = element.get('Формула простого вещества', {})
-        if simple_formula and isinstance(simple_formula, dict):
-            formula = simple_formula.get('Формула', '')
-            description = simple_formula.get('Описание', '')
-            if formula and formula != "—":
-                st.markdown(f"**🔹 Формула простого вещества:**")
-                st.markdown(f"**{formula}**")
-                if description:
-                    st.markdown(f"*{description[:100]}...*" if len(description) > 100 else f"*{description}*")
-        
-        #Высший оксид
-        higher_oxide = element.get('Высший оксид', {})
-        if higher_oxide and isinstance(higher_oxide, dict):
-            oxide_formula = higher_oxide.get('Формула', '')
-            oxide_nature = higher_oxide.get('Характер', '')
-            if oxide_formula and oxide_formula != "—":
-                # Добавляем иконку в зависимости от характера оксида
-                oxide_icon = "🧪"  # по умолчанию
-                if oxide_nature:
-                    if "кислот" in oxide_nature.lower():
-                        oxide_icon = "🧪"
-                    elif "основ" in oxide_nature.lower():
-                        oxide_icon = "🛡️"
-                    elif "амфотер" in oxide_nature.lower():
-                        oxide_icon = "⚖️"
-                    elif "не образует" in oxide_nature.lower():
-                        oxide_icon = "🚫"
-                
-                st.markdown(f"**🔹 {oxide_icon} Высший оксид:**")
-                st.markdown(f"**{oxide_formula}**")
-                if oxide_nature:
-                    st.markdown(f"*Характер: {oxide_nature}*")
-        
-        #Летучее водородное соединение
-        volatile_hydrogen = element.get('Летучее водородное соединение', {})
-        if volatile_hydrogen and isinstance(volatile_hydrogen, dict):
-            vh_formula = volatile_hydrogen.get('Формула', '')
-            vh_description = volatile_hydrogen.get('Описание', '')
-            if vh_formula and vh_formula != "—":
-                st.markdown(f"**🔹 Летучее водородное соединение:**")
-                st.markdown(f"**{vh_formula}**")
-                if vh_description:
-                    st.markdown(f"*{vh_description[:100]}...*" if len(vh_description) > 100 else f"*{vh_description}*")
+        _show_fragments(view.compounds)
     
     #Дополнительная информация (если нужно)
     st.markdown("---")
     
-    # Проверка согласованности данных
-    higher_oxide = element.get('Высший оксид', {})
-    if isinstance(higher_oxide, dict) and "предположительно" in higher_oxide.get('Характер', '').lower():
-        st.info("💡 *Характер оксида предположительный, так как элемент синтетический или малоизучен*")
-    
-    #особые случаи
-    special_cases = {
-        "O": "Кислород является компонентом оксидов, сам по себе не имеет характера оксида",
-        "F": "Фтор образует только OF₂, который является нетипичным оксидом",
-        "H": "Вода (H₂O) не является типичным оксидом",
-        "Xe": "Ксенон может образовывать оксиды в исключительных условиях",
-        "Rn": "Радон радиоактивен, его оксиды практически не изучены"
-    }
+    for kind, text in view.notes:
+        if kind == "warning":
+            st.warning(text)
+        else:
+            st.info(text)
+
+
+#Данные для таблицы в браузере: HTML таблицы и всех карточек
+@st.cache_resource
+def get_element_panel_payload(_index, version):
+    return build_payload(build_periodic_table_html(_index, version), get_element_views(_index, version))
+
+#Данные таблицы одним статическим JSON-файлом; возвращается (хеш содержимого,
+#который входит в имя файла, данные — только если файл не удалось записать и их
+#нужно передать компоненту напрямую)
+@st.cache_resource
+def get_element_panel_data(_index, version):
+    return publish_payload(get_element_panel_payload(_index, version))
+
+#Таблица в браузере: наведение и выбор элемента не обращаются к серверу;
+#значение компонента приходит, только когда элемент отправлен в тест
+def show_periodic_table_client(index):
+    matches = _filter_matches(index)
+    panel_version, panel_payload = get_element_panel_data(index, get_dataset_version())
+    #Браузер этой сессии не смог загрузить файл данных — передаём их напрямую
+    if panel_payload is None and st.session_state.get("element_panel_inline") == panel_version:
+        panel_payload = get_element_panel_payload(index, get_dataset_version())
+    event = element_panel(
+        panel_version,
+        selected=st.session_state.get("selected_element"),
+        highlight=sorted(matches) if matches is not None else None,
+        key="element_panel",
+        payload=panel_payload
+    )
+    #Компонент возвращает последнее значение при каждом перезапуске — новое отличается nonce
+    if event and event.get("nonce") != st.session_state.get("element_panel_nonce"):
+        st.session_state.element_panel_nonce = event.get("nonce")
+        symbol = event.get("symbol")
+        if event.get("action") == "payload":
+            st.session_state.element_panel_inline = event.get("version")
+            rerun_fragment()
+        elif symbol in index:
+            st.session_state.selected_element = symbol
+            st.session_state.requested_question = symbol
+    requested = st.session_state.get("requested_question")
+    if requested:
+        st.success(f"🎯 **{requested}** будет в следующем вопросе теста — откройте «🎯 Проверка знаний»")
+
+#Таблица и карточка элемента — один фрагмент: выбор элемента перезапускает только их
+#(карточка выводится после таблицы в том же проходе, поэтому st.rerun не нужен)
+@fragment
+def show_table_with_info(index, table_mode):
+    if table_mode == "🖥️ В браузере":
+        #Карточки показываются в браузере — show_element_info на сервере не нужен
+        show_periodic_table_client(index)
+        return
+    if table_mode == "⚡ Быстрое":
+        show_periodic_table_html(index)
+    else:
+        show_periodic_table(index)
+    
+    if 'selected_element' in st.session_state and st.session_state.selected_element:
+        show_element_info(st.session_state.selected_element, index)
+    else:
+        st.info("👆 **Нажмите на любой элемент в таблице, чтобы увидеть его свойства**")
+
+#Калькулятор молярной массы (массив атомных масс готовится один раз на версию данных)
+@st.cache_resource
+def get_molar_mass_calculator(_index, version):
+    from molar_mass import MolarMassCalculator
+    return MolarMassCalculator(_index)
+
+#Формулы соединений из набора данных — примеры для калькулятора
+@st.cache_resource
+def get_dataset_formulas(_index, version):
+    from molar_mass import formula_from_text
+    formulas = []
+    for symbol in _index.symbols:
+        element = _index.get(symbol)
+        for key in ('Формула простого вещества', 'Высший оксид', 'Летучее водородное соединение'):
+            formula = formula_from_text(element.get(key, {}).get('Формула'))
+            if formula and formula not in formulas:
+                formulas.append(formula)
+    return tuple(formulas)
+
+#Сколько разных пакетов уравнений хранить в кеше
+EQUATION_BATCH_CACHE_SIZE = 64
+
+#Пакет уравнений из калькулятора уравнивается в процессе сервера (workers=1): пул
+#процессов создавался бы заново при каждом перезапуске скрипта. Результат кешируется
+#по тексту поля, поэтому перезапуски с тем же текстом ничего не пересчитывают
+@st.cache_data(max_entries=EQUATION_BATCH_CACHE_SIZE)
+def balance_equation_batch(text):
+    from equation_balancer import balance_many
+    equations = [line.strip() for line in text.splitlines() if line.strip()]
+    return [
+        (line, result.text if result else f"❌ {error}")
+        for line, (result, error) in zip(equations, balance_many(equations, workers=1))
+    ]
+
+def show_calculator(index):
+    st.header("🧮 Калькулятор молярной массы")
+    calculator = get_molar_mass_calculator(index, get_dataset_version())
+    
+    tab_single, tab_batch, tab_equations = st.tabs(["Одна формула", "Список формул", "⚖️ Уравнения"])
+    
+    with tab_single:
+        examples = get_dataset_formulas(index, get_dataset_version())
+        example = st.selectbox(
+            "**Пример из справочника:**",
+            ("",) + examples,
+            format_func=lambda formula: formula or "— выберите соединение —"
+        )
+        formula = st.text_input(
+            "**Формула:**",
+            value=example or "CuSO₄·5H₂O",
+            help="Поддерживаются индексы ₂ или 2, скобки Ca(OH)₂ и кристаллогидраты CuSO₄·5H₂O"
+        )
+        if formula.strip():
+            try:
+                molar_mass = calculator.molar_mass(formula.strip())
+                composition = calculator.composition(formula.strip())
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                st.metric("Молярная масса", f"{molar_mass:.3f} г/моль")
+                st.table([
+                    {
+                        "Элемент": symbol,
+                        "Атомов": atoms,
+                        "Масса, г/моль": f"{mass:.3f}",
+                        "Массовая доля": f"{share:.2f}%"
+                    }
+                    for symbol, atoms, mass, share in composition
+                ])
     
-    if element_symbol in special_cases:
-        st.warning(f"📝 **Примечание:** {special_cases[element_symbol]}")
+    with tab_batch:
+        text = st.text_area("**Формулы (по одной в строке):**", value="H₂O\nH₂SO₄\nCa(OH)₂\nNaCl")
+        formulas = [line.strip() for line in text.splitlines() if line.strip()]
+        if formulas:
+            #Все массы считаются одним векторным вызовом
+            masses = calculator.batch(formulas)
+            st.table([
+                {
+                    "Формула": formula,
+                    "Молярная масса, г/моль": f"{mass:.3f}" if mass == mass else "❌ ошибка в формуле"
+                }
+                for formula, mass in zip(formulas, masses.tolist())
+            ])
+    
+    with tab_equations:
+        from equation_balancer import balance
+        equation = st.text_input(
+            "**Уравнение реакции:**",
+            value="KMnO₄ + HCl = KCl + MnCl₂ + Cl₂ + H₂O",
+            help="Реагенты и продукты разделяются знаком «=» или стрелкой →, вещества — знаком «+»"
+        )
+        if equation.strip():
+            try:
+                st.success(balance(equation).text)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+        
+        text = st.text_area(
+            "**Несколько уравнений (по одному в строке):**",
+            value="H₂ + O₂ = H₂O\nFe + O₂ = Fe₂O₃\nC₆H₁₂O₆ + O₂ = CO₂ + H₂O"
+        )
+        results = balance_equation_batch(text)
+        if results:
+            st.table([{"Уравнение": line, "Результат": result} for line, result in results])
+
+#Адаптивный выбор для пары (вариант выбора, уровень): веса живут в сессии
+def get_adaptive_selector(selected_elements, level_key, size):
+    selectors = st.session_state.test_data.setdefault('adaptive', {})
+    key = f"{selected_elements}|{level_key}"
+    if key not in selectors or len(selectors[key]) != size:
+        selectors[key] = AdaptiveSelector(size)
+    return selectors[key]
+
+#Экзамен: N вопросов выдаются сразу, проверяются вместе, статистика записывается один раз
+EXAM_MIN_QUESTIONS = 10
+EXAM_MAX_QUESTIONS = 50
+
+def _draw_exam(selected_elements, level_key, available_elements, count):
+    #Вопросы берём из той же колоды, что и в тренировке: без повторов, пока она не закончится
+    decks = st.session_state.test_data.setdefault('decks', {})
+    deck_key = f"{selected_elements}|{level_key}"
+    questions = []
+    for _ in range(count):
+        decks[deck_key], variant, number = draw(decks.get(deck_key), len(available_elements))
+        questions.append((selected_elements, level_key, variant, number))
+    #Номер экзамена входит в ключи виджетов, чтобы ответы прошлого экзамена не подставлялись
+    exam_id = st.session_state.test_data.get('exams_started', 0) + 1
+    st.session_state.test_data['exams_started'] = exam_id
+    return {'id': exam_id, 'questions': questions, 'answers': None}
+
+def _grade_exam(index, exam):
+    #Ответы собираются из виджетов формы только здесь — один раз на весь экзамен
+    answers = []
+    results = []
+    for i, ref in enumerate(exam['questions']):
+        question_data = get_question(index, *ref)
+        answer = st.session_state.get(f"exam_{exam['id']}_answer_{i}")
+        answers.append(answer)
+        if question_data:
+            results.append((question_data.element, ref[1], answer == question_data.correct))
+    exam['answers'] = answers
+    exam['correct'] = sum(correct for _, _, correct in results)
+
+    # Сохраняем результат одной дозаписью в журнал для зарегистрированных пользователей
+    if st.session_state.get("username") and st.session_state["username"] != "Гость":
+        log_user_answers(st.session_state["username"], results, tests_completed=1)
+        flush_user_stats()
+
+def show_exam_mode(index, selected_elements, level_key, available_elements):
+    exam = st.session_state.test_data.get('exam')
+
+    if exam is None:
+        if not available_elements:
+            st.error("❌ Нет доступных элементов для выбранного режима!")
+            return
+        count = st.slider(
+            "**Количество вопросов:**",
+            min_value=EXAM_MIN_QUESTIONS,
+            max_value=EXAM_MAX_QUESTIONS,
+            value=20,
+            step=5
+        )
+        st.caption("Ответы проверяются после завершения экзамена, статистика сохраняется один раз.")
+        if st.button("🚀 Начать экзамен", use_container_width=True):
+            st.session_state.test_data['exam'] = _draw_exam(selected_elements, level_key, available_elements, count)
+            st.rerun()
+        return
+
+    questions = [get_question(index, *ref) for ref in exam['questions']]
+
+    if exam['answers'] is None:
+        #Пока форма не отправлена, ответы не вызывают перезапусков скрипта
+        with st.form("exam_form"):
+            for i, question_data in enumerate(questions):
+                if question_data is None:
+                    continue
+                st.markdown(f"**{i + 1}.** {question_data.question}")
+                st.radio(
+                    "Ответ",
+                    question_data.options,
+                    index=None,
+                    key=f"exam_{exam['id']}_answer_{i}",
+                    label_visibility="collapsed"
+                )
+            submitted = st.form_submit_button("✅ Завершить экзамен", use_container_width=True)
+        if submitted:
+            _grade_exam(index, exam)
+            st.rerun()
+        if st.button("✖️ Отменить экзамен"):
+            st.session_state.test_data['exam'] = None
+            st.rerun()
+        return
+
+    # Результаты экзамена
+    total = len(exam['questions'])
+    percentage = exam['correct'] / total * 100 if total else 0
+    st.subheader("📝 Результаты экзамена")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Правильных ответов", exam['correct'])
+    with col2:
+        st.metric("Всего вопросов", total)
+    with col3:
+        st.metric("Результат", f"{percentage:.1f}%")
 
+    mistakes = [
+        (i, question_data, answer)
+        for i, (question_data, answer) in enumerate(zip(questions, exam['answers']))
+        if question_data and answer != question_data.correct
+    ]
+    if mistakes:
+        with st.expander(f"❌ Ошибки ({len(mistakes)})"):
+            for i, question_data, answer in mistakes:
+                st.markdown(f"**{i + 1}.** {question_data.question}")
+                st.markdown(f"Ваш ответ: {answer if answer is not None else '—'} · "
+                            f"Правильный ответ: **{question_data.correct}**")
+    else:
+        st.success("🎉 **Все ответы правильные!**")
+
+    if st.button("🔄 Новый экзамен", use_container_width=True):
+        st.session_state.test_data['exam'] = None
+        st.rerun()
 
 #режим тестирования с сохранением статистики 
-def show_test_mode(elements_data):
+def _selection_label(selection):
+    return "🧪 Фильтр по свойствам" if selection.startswith(FILTER_PREFIX) else selection
+
+def show_test_mode(index):
     st.header("🎯 Проверь свои знания")
     
     #Инициализация сессии для теста
@@ -633,80 +961,38 @@ def show_test_mode(elements_data):
             'total': 0,
             'current_question': None,
             'current_level': None,
-            'selected_elements': "Все элементы"
+            'selected_elements': "Все элементы",
+            'decks': {}
         }
     
     #выбор элементов для тестирования
     st.subheader("📋 Выберите элементы для изучения")
     
-    selection_options = [
-        "Все элементы",
-        "Элементы 1-24",
-        "Элементы 25-50",
-        "Элементы 51-75",
-        "Элементы 76-100",
-        "Элементы 101-118",
-        "Металлы",
-        "Неметаллы"
-    ]
+    #Результат фильтра по свойствам — дополнительный вариант пула вопросов
+    show_element_filter(index)
+    selection_options = list(SELECTION_OPTIONS)
+    if st.session_state.get("element_filter"):
+        selection_options.append(filter_selection(st.session_state.element_filter))
     
     selected_elements = st.selectbox(
         "**Какие элементы вы хотите изучить?**",
         selection_options,
         index=selection_options.index(st.session_state.test_data['selected_elements']) 
-               if st.session_state.test_data['selected_elements'] in selection_options else 0
+               if st.session_state.test_data['selected_elements'] in selection_options else 0,
+        format_func=_selection_label
     )
     
     st.session_state.test_data['selected_elements'] = selected_elements
     
-    #Получаем список элементов в зависимости от выбора
-    available_elements = []
-    
-    if selected_elements == "Все элементы":
-        available_elements = list(elements_data.keys())
-    
-    elif selected_elements == "Элементы 1-24":
-        available_elements = [sym for sym in elements_data.keys() 
-                            if 1 <= elements_data[sym]["Порядковый номер"] <= 24]
-    
-    elif selected_elements == "Элементы 25-50":
-        available_elements = [sym for sym in elements_data.keys() 
-                            if 25 <= elements_data[sym]["Порядковый номер"] <= 50]
-    
-    elif selected_elements == "Элементы 51-75":
-        available_elements = [sym for sym in elements_data.keys() 
-                            if 51 <= elements_data[sym]["Порядковый номер"] <= 75]
-    
-    elif selected_elements == "Элементы 76-100":
-        available_elements = [sym for sym in elements_data.keys() 
-                            if 76 <= elements_data[sym]["Порядковый номер"] <= 100]
-    
-    elif selected_elements == "Элементы 101-118":
-        available_elements = [sym for sym in elements_data.keys() 
-                            if 101 <= elements_data[sym]["Порядковый номер"] <= 118]
-    
-    elif selected_elements == "Неметаллы":
-        # Список известных неметаллов
-        nonmetals = ["H", "He", "B", "C", "N", "O", "F", "Ne", 
-                    "Si", "P", "S", "Cl", "Ar", "Ge", "As", 
-                    "Se", "Br", "Kr", "Sb", "Te", "I", "Xe", 
-                    "At", "Rn"]
-        available_elements = [sym for sym in nonmetals if sym in elements_data]
-    
-    elif selected_elements == "Металлы":
-        #Все элементы, кроме неметаллов и благородных газов
-        nonmetals_and_noble = ["H", "He", "B", "C", "N", "O", "F", "Ne", 
-                              "Si", "P", "S", "Cl", "Ar", "Ge", "As", 
-                              "Se", "Br", "Kr", "Sb", "Te", "I", "Xe", 
-                              "At", "Rn"]
-        available_elements = [sym for sym in elements_data.keys() if sym not in nonmetals_and_noble]
+    #Список элементов берём из готового индекса (без перебора всех элементов)
+    available_elements = index.selection(selected_elements)
     
     # Показываем статистику выбора
     col1, col2 = st.columns(2)
     with col1:
         st.info(f"**Выбрано элементов:** {len(available_elements)}")
     with col2:
-        st.info(f"**Режим:** {selected_elements}")
+        st.info(f"**Режим:** {_selection_label(selected_elements)}")
     
     st.markdown("---")
     
@@ -720,6 +1006,31 @@ def show_test_mode(elements_data):
     level_key = level.split()[1]
     st.session_state.test_data['current_level'] = level_key
     
+    #Тренировка — вопрос за вопросом; экзамен — пакет вопросов с одной записью статистики
+    test_mode = st.radio(
+        "**Режим проверки:**",
+        ["🎯 Тренировка", "📝 Экзамен"],
+        horizontal=True,
+        key="test_mode"
+    )
+    if test_mode == "📝 Экзамен":
+        show_exam_mode(index, selected_elements, level_key, available_elements)
+        return
+    
+    #Адаптивный подбор: чаще спрашиваем то, в чём были ошибки в этой сессии
+    adaptive = st.checkbox(
+        "🧠 Адаптивный подбор вопросов",
+        key="adaptive_questions",
+        help="Вопросы с ошибками выпадают чаще, недавние — реже"
+    )
+    show_quiz_question(index, selected_elements, level_key, available_elements, adaptive)
+
+#Вопрос, проверка ответа и статистика сессии — фрагмент: ответ или новый вопрос
+#перезапускают только его, а не настройки теста, таблицу фильтра и сайдбар
+@fragment
+def show_quiz_question(index, selected_elements, level_key, available_elements, adaptive):
+    deck_key = f"{selected_elements}|{level_key}"
+    
     col1, col2 = st.columns([1, 3])
     with col1:
         if st.button("🎲 Новый вопрос", use_container_width=True):
@@ -727,60 +1038,29 @@ def show_test_mode(elements_data):
                 st.error("❌ Нет доступных элементов для выбранного режима!")
                 return
             
-            element_symbol = random.choice(available_elements)
-            element = elements_data[element_symbol]
-
-            if level_key == "Лёгкий":
-                question = f"Какой символ у элемента **{element['Название']}**?"
-                # Используем только доступные элементы для вариантов ответов
-                other_elements = [k for k in available_elements if k != element_symbol]
-                if len(other_elements) >= 3:
-                    options = [element_symbol] + random.sample(other_elements, 3)
-                else:
-                    # Если доступных элементов мало, дополняем случайными из всех
-                    all_other = [k for k in elements_data.keys() if k != element_symbol]
-                    options = [element_symbol] + random.sample(all_other, 3)
-                correct_answer = element_symbol
-
-            elif level_key == "Средний":
-                question = f"Какая **валентность** у элемента **{element_symbol}**?"
-                all_valencies = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', '0']
-                element_valencies = [str(v) for v in element['Валентность']]
-                other_valencies = [v for v in all_valencies if v not in element_valencies]
-                options = element_valencies + random.sample(other_valencies, 4 - len(element_valencies))
-                correct_answer = element_valencies[0] if element_valencies else '0'
-
+            if adaptive:
+                selector = get_adaptive_selector(selected_elements, level_key, len(available_elements))
+                variant, number = random.randrange(BANK_VARIANTS), selector.draw()
             else:
-                question = f"Какая **электронная конфигурация** у **{element_symbol}**?"
-                # Используем только доступные элементы для вариантов ответов
-                other_elements = [k for k in available_elements if k != element_symbol]
-                if len(other_elements) >= 3:
-                    other_configs = [elements_data[sym]['Электронная конфигурация'] for sym in random.sample(other_elements, 3)]
-                else:
-                    # Если доступных элементов мало, дополняем случайными из всех
-                    all_other = [k for k in elements_data.keys() if k != element_symbol]
-                    other_configs = [elements_data[sym]['Электронная конфигурация'] for sym in random.sample(all_other, 3)]
-                
-                options = [element['Электронная конфигурация']] + other_configs
-                correct_answer = element['Электронная конфигурация']
-
-            random.shuffle(options)
-            st.session_state.test_data['current_question'] = {
-                'question': question,
-                'options': options,
-                'correct': correct_answer,
-                'element': element_symbol
-            }
-            st.rerun()
+                #Следующий вопрос из колоды сессии (в сессии хранятся только номера)
+                decks = st.session_state.test_data.setdefault('decks', {})
+                decks[deck_key], variant, number = draw(decks.get(deck_key), len(available_elements))
+            
+            #Элемент, отправленный в тест из таблицы в браузере, спрашиваем первым
+            requested = st.session_state.pop("requested_question", None)
+            if requested in available_elements:
+                number = available_elements.index(requested)
+            st.session_state.test_data['current_question'] = (selected_elements, level_key, variant, number)
+            rerun_fragment()
     
-    if st.session_state.test_data['current_question']:
-        question_data = st.session_state.test_data['current_question']
-        
-        st.markdown(f"### ❓ {question_data['question']}")
+    current_question = st.session_state.test_data['current_question']
+    question_data = get_question(index, *current_question) if current_question else None
+    if question_data:
+        st.markdown(f"### ❓ {question_data.question}")
         
         selected_option = st.radio(
             "**Выберите ответ:**",
-            question_data['options'],
+            question_data.options,
             key="current_options"
         )
         
@@ -789,28 +1069,34 @@ def show_test_mode(elements_data):
             if st.button("✅ Проверить ответ", use_container_width=True):
                 st.session_state.test_data['total'] += 1
                 
-                if selected_option == question_data['correct']:
+                #Ответ меняет вес вопроса в адаптивном подборе (O(log n))
+                selection, level_name, _, number = current_question
+                selector = st.session_state.test_data.get('adaptive', {}).get(f"{selection}|{level_name}")
+                if selector is not None and number < len(selector):
+                    selector.record(number, selected_option == question_data.correct)
+                
+                if selected_option == question_data.correct:
                     st.success("🎉 **Правильно!** Молодец!")
                     st.session_state.test_data['score'] += 1
                     st.balloons()
                     
                     # Сохраняем статистику для зарегистрированных пользователей
                     if st.session_state.get("username") and st.session_state["username"] != "Гость":
-                        update_user_stats(st.session_state["username"], 1, 1)
+                        log_user_answers(st.session_state["username"], [(question_data.element, current_question[1], True)])
                 else:
-                    st.error(f"❌ **Неправильно!** Правильный ответ: **{question_data['correct']}**")
+                    st.error(f"❌ **Неправильно!** Правильный ответ: **{question_data.correct}**")
                     
                     # Сохраняем статистику для зарегистрированных пользователей
                     if st.session_state.get("username") and st.session_state["username"] != "Гость":
-                        update_user_stats(st.session_state["username"], 0, 1)
+                        log_user_answers(st.session_state["username"], [(question_data.element, current_question[1], False)])
                 
                 st.markdown("---")
-                show_element_info(question_data['element'], elements_data)
+                show_element_info(question_data.element, index)
         
         with col2:
             if st.button("➡️ Следующий вопрос", use_container_width=True):
                 st.session_state.test_data['current_question'] = None
-                st.rerun()
+                rerun_fragment()
     
     # Отображение статистики
     if st.session_state.test_data['total'] > 0:
@@ -827,7 +1113,7 @@ def show_test_mode(elements_data):
             st.metric("Успеваемость", f"{percentage:.1f}%")
         
         # Дополнительная информация о режиме
-        st.info(f"**Режим изучения:** {selected_elements} | **Уровень:** {level_key}")
+        st.info(f"**Режим изучения:** {_selection_label(selected_elements)} | **Уровень:** {level_key}")
         
         # Показать общую статистику пользователя, если он зарегистрирован
         if st.session_state.get("username") and st.session_state["username"] != "Гость":
@@ -851,9 +1137,13 @@ def show_test_mode(elements_data):
                 'total': 0,
                 'current_question': None,
                 'current_level': None,
-                'selected_elements': selected_elements
+                'selected_elements': selected_elements,
+                #Колоды сохраняем, чтобы вопросы не повторялись и после сброса
+                'decks': st.session_state.test_data.get('decks', {}),
+                'exams_started': st.session_state.test_data.get('exams_started', 0),
+                'adaptive': st.session_state.test_data.get('adaptive', {})
             }
-            st.rerun()
+            rerun_fragment()
 
 # Основная функция
 def main():
@@ -863,9 +1153,9 @@ def main():
         return
     
     # Загрузка данных элементов
-    elements_data = load_elements()
+    index = get_element_index(get_dataset_version())
     
-    if not elements_data:
+    if not len(index):
         st.error("❌ Не удалось загрузить данные элементов")
         st.stop()
     
@@ -881,36 +1171,47 @@ def main():
         st.header("🧭 Навигация")
         app_mode = st.radio(
             "**Выберите режим:**",
-            ["📚 Изучение таблицы", "🎯 Проверка знаний"]
+            ["📚 Изучение таблицы", "🎯 Проверка знаний", "🧮 Калькулятор"]
         )
         
+        show_search(index)
+        
         st.markdown("---")
         st.header("ℹ️ О проекте")
         st.markdown("""
         Полная таблица Менделеева:
         - 📚 Изучение свойств
         - 🎯 Проверка знаний  
+        - 🧮 Молярная масса
+        - 🔍 Поиск элементов
         - 🎨 Кликабельные ячейки
         - 👤 Система пользователей
         - 📊 Сохранение статистики
         """)
         
-        total_elements = len(elements_data)
+        total_elements = len(index)
         st.metric("Элементов в базе", total_elements)
         
+        if app_mode == "📚 Изучение таблицы":
+            table_mode = st.radio(
+                "**🎨 Отображение таблицы:**",
+                ["🖥️ В браузере", "⚡ Быстрое", "🖱️ Кнопки в ячейках"],
+                help="В браузере — карточки элементов без обращений к серверу; "
+                     "быстрое отображение рисует всю таблицу одним блоком"
+            )
+        
         if st.session_state.get("username") == "Гость":
             st.warning("⚠️ Вы вошли как гость. Статистика не сохраняется.")
     
     if app_mode == "📚 Изучение таблицы":
-        show_periodic_table(elements_data)
-        
-        if 'selected_element' in st.session_state and st.session_state.selected_element:
-            show_element_info(st.session_state.selected_element, elements_data)
-        else:
-            st.info("👆 **Нажмите на любой элемент в таблице, чтобы увидеть его свойства**")
+        show_element_filter(index)
+        show_table_with_info(index, table_mode)
+    
+    elif app_mode == "🧮 Калькулятор":
+        show_calculator(index)
     
     else:
-        show_test_mode(elements_data)
+        show_test_mode(index)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,122 @@
+import array
+import base64
+import sys
+
+# ==================== МАТРИЦА ОСВОЕНИЯ ЭЛЕМЕНТОВ ====================
+#
+# Для каждого пользователя — число попыток и правильных ответов по каждому
+# элементу и уровню теста. Матрица хранится одним значением фиксированной длины:
+#
+#   версия (1 байт) | 118 элементов × 3 уровня × (попытки, правильные) — uint16 LE
+#
+# Это 1417 байт: BLOB в SQLite или 1892 символа base64 в одной ячейке листа,
+# поэтому загрузка и сохранение — одно маленькое чтение и одна запись.
+
+MASTERY_VERSION = 1
+
+# Слоты матрицы: порядковый номер элемента − 1 (порядок таблицы Менделеева не меняется)
+ELEMENT_SYMBOLS = (
+    "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne",
+    "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar", "K", "Ca",
+    "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn",
+    "Ga", "Ge", "As", "Se", "Br", "Kr", "Rb", "Sr", "Y", "Zr",
+    "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn",
+    "Sb", "Te", "I", "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd",
+    "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb",
+    "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg",
+    "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra", "Ac", "Th",
+    "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm",
+    "Md", "No", "Lr", "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds",
+    "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og"
+)
+
+# Уровни теста (как в question_deck.LEVELS)
+MASTERY_LEVELS = ("Лёгкий", "Средний", "Сложный")
+
+_SLOTS = {symbol: i for i, symbol in enumerate(ELEMENT_SYMBOLS)}
+_LEVELS = {level: i for i, level in enumerate(MASTERY_LEVELS)}
+_SIZE = len(ELEMENT_SYMBOLS) * len(MASTERY_LEVELS) * 2
+_MAX_COUNT = 0xFFFF
+
+
+def _offset(symbol, level):
+    return (_SLOTS[symbol] * len(MASTERY_LEVELS) + _LEVELS[level]) * 2
+
+
+class Mastery:
+    """Попытки и правильные ответы пользователя по элементам и уровням"""
+
+    __slots__ = ("counts",)
+
+    def __init__(self, counts=None):
+        self.counts = counts if counts is not None else array.array("H", bytes(_SIZE * 2))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Матрица из BLOB; пустое или повреждённое значение даёт пустую матрицу"""
+        if not data or len(data) != _SIZE * 2 + 1 or data[0] != MASTERY_VERSION:
+            return cls()
+        counts = array.array("H")
+        counts.frombytes(bytes(data[1:]))
+        if sys.byteorder != "little":
+            counts.byteswap()
+        return cls(counts)
+
+    @classmethod
+    def decode(cls, text):
+        """Матрица из строки base64 (значение ячейки листа)"""
+        try:
+            return cls.from_bytes(base64.b64decode(text or ""))
+        except ValueError:
+            return cls()
+
+    def to_bytes(self):
+        counts = self.counts
+        if sys.byteorder != "little":
+            counts = array.array("H", counts)
+            counts.byteswap()
+        return bytes([MASTERY_VERSION]) + counts.tobytes()
+
+    def encode(self):
+        """Строка base64 для записи в ячейку листа"""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    def record(self, symbol, level, correct, attempts=1):
+        """Учитывает attempts попыток, из них correct правильных (неизвестные элементы пропускаются)"""
+        if symbol not in _SLOTS or level not in _LEVELS:
+            return
+        offset = _offset(symbol, level)
+        self.counts[offset] = min(self.counts[offset] + attempts, _MAX_COUNT)
+        self.counts[offset + 1] = min(self.counts[offset + 1] + int(correct), _MAX_COUNT)
+
+    def apply_rows(self, rows):
+        """Учитывает строки журнала ответов (username, timestamp, element, level, correct, ...)"""
+        for row in rows:
+            if len(row) > 4:
+                self.record(row[2], row[3], int(row[4] or 0))
+        return self
+
+    def get(self, symbol, level=None):
+        """(попытки, правильные) по элементу — на одном уровне или на всех"""
+        if symbol not in _SLOTS:
+            return 0, 0
+        levels = [level] if level is not None else MASTERY_LEVELS
+        attempts = correct = 0
+        for name in levels:
+            offset = _offset(symbol, name)
+            attempts += self.counts[offset]
+            correct += self.counts[offset + 1]
+        return attempts, correct
+
+    def weakest(self, limit=5, min_attempts=1):
+        """Элементы с наименьшей долей правильных ответов: [(символ, попытки, правильные)]"""
+        stats = []
+        for symbol in ELEMENT_SYMBOLS:
+            attempts, correct = self.get(symbol)
+            if attempts >= min_attempts:
+                stats.append((symbol, attempts, correct))
+        stats.sort(key=lambda item: (item[2] / item[1], -item[1]))
+        return stats[:limit]
+
+    def __bool__(self):
+        return any(self.counts)
@@ -0,0 +1,161 @@
+import re
+from functools import lru_cache
+import numpy as np
+
+# ==================== КАЛЬКУЛЯТОР МОЛЯРНОЙ МАССЫ ====================
+#
+# Разбор формул: подстрочные цифры (H₂SO₄), скобки (Ca(OH)₂, [Fe(CN)₆]),
+# кристаллогидраты через точку (CuSO₄·5H₂O). Разобранные формулы кешируются
+# (LRU), а массы пакета формул считаются одной векторной операцией по
+# заранее подготовленному массиву атомных масс.
+
+# Размер LRU-кеша разобранных формул и молярных масс
+FORMULA_CACHE_SIZE = 4096
+
+_SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+# Пробелы допустимы только вокруг разделителя гидрата (CuSO₄ · 5H₂O): "H2O 2" — ошибка, а не H₂O₂
+_TOKEN = re.compile(r"(?:([A-Z][a-z]?)|(\d+)|([(\[{])|([)\]}])|\s*([·•*.])\s*)")
+_CLOSING = {"(": ")", "[": "]", "{": "}"}
+
+
+class FormulaError(ValueError):
+    """Формулу не удалось разобрать"""
+
+
+def _tokens(formula):
+    text = formula.translate(_SUBSCRIPTS).strip()
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            if text[position].isspace():
+                raise FormulaError(f"Пробел внутри формулы {formula!r}")
+            raise FormulaError(f"Неожиданный символ «{text[position]}» в формуле {formula!r}")
+        position = match.end()
+        # Нулевой индекс или коэффициент гидрата дал бы формулу без атомов (H0, 0H2O)
+        if match.lastindex == 2 and int(match.group(2)) == 0:
+            raise FormulaError(f"Нулевое число атомов в формуле {formula!r}")
+        yield match.lastindex, match.group(match.lastindex)
+
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def parse_formula(formula):
+    """Состав формулы: кортеж пар (символ, количество атомов) в порядке первого появления"""
+    # Стек групп: каждая скобка открывает новый словарь, закрывающая умножает его на индекс
+    stack = [{}]
+    brackets = []
+    part_multiplier = 1
+    part_start = True
+    part_empty = True
+    tokens = list(_tokens(formula))
+    if not tokens:
+        raise FormulaError("Пустая формула")
+
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else (None, None)
+        count = int(following[1]) if following[0] == 2 else 1
+
+        if kind == 1:  # символ элемента
+            stack[-1][value] = stack[-1].get(value, 0) + count * part_multiplier
+            part_empty = False
+            i += 2 if following[0] == 2 else 1
+        elif kind == 2:  # число в начале части гидрата: 5H₂O
+            if not part_start:
+                raise FormulaError(f"Лишнее число {value} в формуле {formula!r}")
+            part_multiplier = int(value)
+            i += 1
+        elif kind == 3:  # открывающая скобка
+            stack.append({})
+            brackets.append(value)
+            i += 1
+        elif kind == 4:  # закрывающая скобка
+            if not brackets or _CLOSING[brackets.pop()] != value:
+                raise FormulaError(f"Несогласованные скобки в формуле {formula!r}")
+            group = stack.pop()
+            for symbol, atoms in group.items():
+                stack[-1][symbol] = stack[-1].get(symbol, 0) + atoms * count
+            i += 2 if following[0] == 2 else 1
+        else:  # разделитель гидрата
+            if brackets:
+                raise FormulaError(f"Точка внутри скобок в формуле {formula!r}")
+            if part_empty:
+                raise FormulaError(f"Пустая часть перед «{value}» в формуле {formula!r}")
+            part_multiplier = 1
+            part_start = True
+            part_empty = True
+            i += 1
+            continue
+        part_start = False
+
+    if brackets:
+        raise FormulaError(f"Не закрыта скобка в формуле {formula!r}")
+    if part_empty:
+        raise FormulaError(f"В формуле {formula!r} нет элементов после «{tokens[-1][1]}»"
+                           if len(tokens) > 1 else f"В формуле {formula!r} нет элементов")
+    return tuple(stack[0].items())
+
+
+def formula_from_text(text):
+    """Формула из строки набора данных: "H₂O (вода)" → "H₂O", "—" → None"""
+    formula = re.split(r"\s\(|,", text or "", maxsplit=1)[0].strip()
+    if not formula or formula == "—":
+        return None
+    try:
+        parse_formula(formula)
+    except FormulaError:
+        return None
+    return formula
+
+
+class MolarMassCalculator:
+    """Молярные массы формул по атомным массам из индекса элементов"""
+
+    def __init__(self, index, cache_size=FORMULA_CACHE_SIZE):
+        self.symbols = index.symbols
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.masses = np.array([float(index.get(symbol)['Атомная масса']) for symbol in self.symbols])
+        self.molar_mass = lru_cache(maxsize=cache_size)(self._molar_mass)
+
+    def _columns(self, formula):
+        composition = parse_formula(formula)
+        unknown = [symbol for symbol, _ in composition if symbol not in self.positions]
+        if unknown:
+            raise FormulaError(f"Неизвестный элемент {', '.join(unknown)} в формуле {formula!r}")
+        return composition
+
+    def _molar_mass(self, formula):
+        return float(sum(self.masses[self.positions[symbol]] * atoms for symbol, atoms in self._columns(formula)))
+
+    def composition(self, formula):
+        """Состав по массе: [(символ, атомов, масса вклада, доля в %)]"""
+        composition = self._columns(formula)
+        total = self.molar_mass(formula)
+        rows = []
+        for symbol, atoms in composition:
+            contribution = float(self.masses[self.positions[symbol]] * atoms)
+            rows.append((symbol, atoms, contribution, contribution / total * 100))
+        return rows
+
+    def batch(self, formulas):
+        """Молярные массы пакета формул одним вызовом (NumPy-массив; NaN для ошибочных формул)"""
+        rows = []
+        columns = []
+        counts = []
+        for row, formula in enumerate(formulas):
+            try:
+                composition = self._columns(formula)
+            except FormulaError:
+                # Ошибочная формула: NaN в её строке
+                rows.append(row)
+                columns.append(0)
+                counts.append(np.nan)
+                continue
+            for symbol, atoms in composition:
+                rows.append(row)
+                columns.append(self.positions[symbol])
+                counts.append(atoms)
+        # Сумма масс по строкам: Σ количество × масса[элемент] для каждой формулы
+        weights = np.asarray(counts, dtype=float) * self.masses[np.asarray(columns, dtype=np.intp)]
+        return np.bincount(np.asarray(rows, dtype=np.intp), weights=weights, minlength=len(formulas))
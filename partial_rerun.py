@@ -0,0 +1,25 @@
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+# ==================== ЧАСТИЧНЫЕ ПЕРЕЗАПУСКИ ====================
+#
+# Фрагмент — функция интерфейса, которую Streamlit перезапускает отдельно:
+# взаимодействие с виджетом внутри фрагмента выполняет только эту функцию,
+# а не весь скрипт (таблицу, сайдбар с профилем и т.д.). st.fragment появился
+# в Streamlit 1.37, до этого был st.experimental_fragment (1.33–1.36); в более
+# старых версиях декоратор ничего не меняет и всё работает полными перезапусками.
+
+fragment = (
+    getattr(st, "fragment", None)
+    or getattr(st, "experimental_fragment", None)
+    or (lambda function: function)
+)
+
+
+def rerun_fragment():
+    """Перезапуск только текущего фрагмента (или всего скрипта, если так нельзя)"""
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, StreamlitAPIException):
+        # Старая версия без scope или фрагмент выполняется в составе полного перезапуска
+        st.rerun()
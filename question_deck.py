@@ -0,0 +1,97 @@
+import random
+from collections import namedtuple
+
+# ==================== КОЛОДЫ ВОПРОСОВ ====================
+#
+# Для пары (вариант выбора, уровень) все вопросы строятся заранее одним проходом —
+# по одному на элемент — и хранятся в общем для процесса банке (st.cache_resource).
+# Сессия хранит только колоду: перемешанные номера вопросов банка и позицию в ней.
+# "Новый вопрос" — это O(1) шаг по колоде; вопросы не повторяются, пока колода
+# не закончится, после чего она перемешивается заново (с другим вариантом банка,
+# чтобы неправильные варианты ответов отличались от прошлого круга).
+
+# Готовый вопрос; options — кортеж уже перемешанных вариантов ответа
+Question = namedtuple("Question", ["question", "options", "correct", "element"])
+
+LEVELS = ["Лёгкий", "Средний", "Сложный"]
+
+# Сколько вариантов банка (с разными неправильными ответами) строится для каждой пары
+BANK_VARIANTS = 4
+
+ALL_VALENCIES = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', '0']
+
+
+def _distractors(pool, symbol, rng, count=3):
+    """count случайных символов из pool, кроме symbol (без копирования pool)"""
+    picked = rng.sample(pool, min(count + 1, len(pool)))
+    return [other for other in picked if other != symbol][:count]
+
+
+def build_question(index, symbol, level, pool, rng, neighbours=None):
+    """Вопрос уровня level об элементе symbol; неправильные ответы берутся из pool.
+
+    neighbours — {символ: элементы с похожей конфигурацией} (electron_configs.ConfigurationTable):
+    на сложном уровне неправильные ответы берутся из них, а не случайно.
+    """
+    element = index.get(symbol)
+    # Если доступных элементов мало, неправильные ответы берём из всех элементов
+    if len(pool) < 4:
+        pool = index.symbols
+
+    if level == "Лёгкий":
+        question = f"Какой символ у элемента **{element['Название']}**?"
+        options = [symbol] + _distractors(pool, symbol, rng)
+        correct_answer = symbol
+
+    elif level == "Средний":
+        question = f"Какая **валентность** у элемента **{symbol}**?"
+        element_valencies = [str(v) for v in element['Валентность']]
+        other_valencies = [v for v in ALL_VALENCIES if v not in element_valencies]
+        options = element_valencies + rng.sample(other_valencies, max(4 - len(element_valencies), 0))
+        correct_answer = element_valencies[0] if element_valencies else '0'
+
+    else:
+        question = f"Какая **электронная конфигурация** у **{symbol}**?"
+        similar = neighbours.get(symbol, ()) if neighbours else ()
+        others = rng.sample(similar, 3) if len(similar) >= 3 else _distractors(pool, symbol, rng)
+        other_configs = [index.get(other)['Электронная конфигурация'] for other in others]
+        options = [element['Электронная конфигурация']] + other_configs
+        correct_answer = element['Электронная конфигурация']
+
+    rng.shuffle(options)
+    return Question(question, tuple(options), correct_answer, symbol)
+
+
+def build_question_bank(index, selection, level, variant=0, neighbours=None):
+    """Все вопросы для варианта выбора и уровня (по одному на элемент)"""
+    rng = random.Random(f"{selection}|{level}|{variant}")
+    pool = index.selection(selection)
+    return tuple(build_question(index, symbol, level, pool, rng, neighbours) for symbol in pool)
+
+
+# ---- Колода сессии: только номера вопросов ----
+
+def new_deck(size, variant=None, last=None):
+    """Перемешанная колода из size номеров; last не будет первым (без повтора на стыке)"""
+    order = list(range(size))
+    random.shuffle(order)
+    if last is not None and size > 1 and order[0] == last:
+        order[0], order[-1] = order[-1], order[0]
+    if variant is None:
+        variant = random.randrange(BANK_VARIANTS)
+    return {"variant": variant, "order": order, "position": 0}
+
+
+def draw(deck, size):
+    """Следующий номер вопроса и вариант банка; колода пересобирается, когда закончится.
+
+    Возвращает (deck, variant, номер) — deck может быть новой колодой.
+    """
+    if deck is None or len(deck["order"]) != size:
+        deck = new_deck(size)
+    elif deck["position"] >= size:
+        last = deck["order"][-1]
+        deck = new_deck(size, (deck["variant"] + 1) % BANK_VARIANTS, last)
+    number = deck["order"][deck["position"]]
+    deck["position"] += 1
+    return deck, deck["variant"], number
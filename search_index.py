@@ -0,0 +1,189 @@
+import bisect
+import re
+from collections import Counter
+from types import MappingProxyType
+
+# ==================== ПОИСКОВЫЙ ИНДЕКС ====================
+#
+# Индекс строится один раз по набору документов (элементы, в будущем — соединения).
+# Тексты нормализуются (регистр, ё → е, подстрочные цифры), разбиваются на слова,
+# и для каждого слова хранятся документы, в которых оно встречается, с весом поля.
+# Запрос ищет слова словаря тремя способами: точное совпадение, префикс (поиск по
+# мере ввода — бинарный поиск по отсортированному словарю) и похожие слова по
+# общим триграммам (опечатки). Документы при поиске не перебираются: работа
+# зависит от размера словаря запроса, а не от числа документов.
+
+# Минимальное сходство по триграммам, при котором слово считается опечаткой запроса
+MIN_SIMILARITY = 0.3
+
+# Результаты с оценкой ниже этой доли от лучшей не показываются
+MIN_RELATIVE_SCORE = 0.3
+
+# Сколько слов словаря рассматривать для одного короткого префикса
+PREFIX_LIMIT = 500
+
+# Вклад совпадений разного вида в оценку (умножается на вес поля)
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.6
+FUZZY_SCORE = 0.5
+
+_NORMALIZE = str.maketrans("ё₀₁₂₃₄₅₆₇₈₉", "е0123456789")
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Текст для поиска: без регистра, ё → е, подстрочные цифры → обычные"""
+    return str(text).casefold().translate(_NORMALIZE)
+
+
+def words(text):
+    """Нормализованные слова текста"""
+    return _WORD.findall(normalize(text))
+
+
+def trigrams(word):
+    """Триграммы слова с границами: "газ" → {"  г", " га", "газ", "аз "}"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Поиск по документам с учётом префиксов и опечаток.
+
+    documents — последовательность пар (ключ, поля), где поля — список пар
+    (текст, вес). Ключ возвращается в результатах поиска; вес поля задаёт,
+    насколько совпадение в нём важнее (символ элемента важнее описания).
+    Числовые поля (int, например порядковый номер) совпадают только с запросом
+    из одних чисел: «2» в «Ca(OH)2» — индекс, а не номер гелия.
+    """
+
+    __slots__ = ("keys", "terms", "postings", "number_postings", "term_trigrams", "trigram_terms")
+
+    def __init__(self, documents):
+        keys = []
+        postings = {}
+        numbers = {}
+        for doc_id, (key, fields) in enumerate(documents):
+            keys.append(key)
+            for text, weight in fields:
+                target = numbers if isinstance(text, int) else postings
+                for word in words(text):
+                    # Для каждого слова храним лучший вес поля в документе
+                    best = target.setdefault(word, {})
+                    if weight > best.get(doc_id, 0):
+                        best[doc_id] = weight
+        self.keys = tuple(keys)
+        # Общий словарь: префиксы и опечатки ищутся одинаково для слов и чисел
+        self.terms = tuple(sorted(postings.keys() | numbers.keys()))
+        self.postings = MappingProxyType({term: tuple(postings.get(term, {}).items()) for term in self.terms})
+        self.number_postings = MappingProxyType({term: tuple(ids.items()) for term, ids in numbers.items()})
+
+        # Триграммы слов словаря (а не документов): опечатки ищутся среди слов
+        self.term_trigrams = tuple(frozenset(trigrams(term)) for term in self.terms)
+        trigram_terms = {}
+        for term_id, grams in enumerate(self.term_trigrams):
+            for gram in grams:
+                trigram_terms.setdefault(gram, []).append(term_id)
+        self.trigram_terms = MappingProxyType({gram: tuple(ids) for gram, ids in trigram_terms.items()})
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _prefixed(self, prefix):
+        # Слова словаря, начинающиеся с prefix: непрерывный отрезок отсортированного кортежа
+        start = bisect.bisect_left(self.terms, prefix)
+        end = min(start + PREFIX_LIMIT, len(self.terms))
+        for term_id in range(start, end):
+            if not self.terms[term_id].startswith(prefix):
+                break
+            yield term_id
+
+    def _similar(self, word):
+        # Слова словаря с достаточным сходством триграмм (коэффициент Жаккара)
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_terms.get(gram, ()))
+        for term_id, common in shared.items():
+            similarity = common / (len(grams) + len(self.term_trigrams[term_id]) - common)
+            if similarity >= MIN_SIMILARITY:
+                yield term_id, similarity
+
+    def term_matches(self, word):
+        """{слово словаря: качество совпадения} для одного слова запроса"""
+        matches = {}
+        for term_id in self._prefixed(word):
+            term = self.terms[term_id]
+            # Чем больше слова уже введено, тем ближе префикс к точному совпадению
+            matches[term] = EXACT_SCORE if term == word else PREFIX_SCORE * (1 + len(word) / len(term)) / 2
+        # Опечатки ищем только для слов, в которых есть хотя бы одна настоящая триграмма
+        if len(word) >= 3:
+            for term_id, similarity in self._similar(word):
+                term = self.terms[term_id]
+                matches[term] = max(matches.get(term, 0), FUZZY_SCORE * similarity)
+        return matches
+
+    def search(self, query, limit=10):
+        """Ключи документов по убыванию релевантности: список пар (ключ, оценка)"""
+        query_words = words(query)
+        if not query_words:
+            return []
+
+        # Числовые поля — только для запроса без букв («26», но не «Ca(OH)2»)
+        numeric = all(word.isdigit() for word in query_words)
+        scores = Counter()
+        covered = Counter()
+        for word in dict.fromkeys(query_words):
+            best = {}
+            for term, quality in self.term_matches(word).items():
+                postings = self.postings[term]
+                if numeric:
+                    postings += self.number_postings.get(term, ())
+                for doc_id, weight in postings:
+                    score = quality * weight
+                    if score > best.get(doc_id, 0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] += score
+                covered[doc_id] += 1
+
+        # Случайные слабые совпадения (слово из описания, дальняя опечатка) отбрасываются
+        cutoff = MIN_RELATIVE_SCORE * max(scores.values(), default=0)
+        # Сначала документы, где нашлись все слова запроса, затем по оценке и порядку
+        ranked = sorted(
+            (doc_id for doc_id, score in scores.items() if score >= cutoff),
+            key=lambda doc_id: (-covered[doc_id], -scores[doc_id], doc_id)
+        )
+        return [(self.keys[doc_id], scores[doc_id]) for doc_id in ranked[:limit]]
+
+
+# ==================== ДОКУМЕНТЫ ЭЛЕМЕНТОВ ====================
+
+# Разделы данных элемента с формулой и текстом
+ELEMENT_SECTIONS = ('Формула простого вещества', 'Высший оксид', 'Летучее водородное соединение')
+
+# Веса полей элемента
+SYMBOL_WEIGHT = 10
+NUMBER_WEIGHT = 8
+NAME_WEIGHT = 6
+FORMULA_WEIGHT = 3
+TEXT_WEIGHT = 1
+
+
+def element_documents(index):
+    """Документы для TrigramIndex: (символ, поля) для каждого элемента индекса"""
+    for symbol in index.symbols:
+        element = index.get(symbol)
+        fields = [
+            (symbol, SYMBOL_WEIGHT),
+            (element['Порядковый номер'], NUMBER_WEIGHT),
+            (element['Название'], NAME_WEIGHT)
+        ]
+        for section in ELEMENT_SECTIONS:
+            data = element.get(section) or {}
+            if data.get('Формула'):
+                fields.append((data['Формула'], FORMULA_WEIGHT))
+            for key in ('Описание', 'Характер'):
+                if data.get(key):
+                    fields.append((data[key], TEXT_WEIGHT))
+        yield symbol, fields
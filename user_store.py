@@ -0,0 +1,366 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from mastery import Mastery
+
+# ==================== ХРАНИЛИЩЕ ПОЛЬЗОВАТЕЛЕЙ ====================
+
+# Поля статистики пользователя в порядке хранения
+STATS_FIELDS = ["tests_completed", "correct_answers", "total_questions"]
+
+# Поля журнала ответов в порядке хранения
+ANSWER_FIELDS = ["username", "timestamp", "element", "level", "correct", "tests_completed"]
+
+# Путь к базе SQLite по умолчанию
+DEFAULT_SQLITE_PATH = "users.db"
+
+# Через сколько новых записей журнала SQLite сворачивает его в счётчики
+SQLITE_COMPACT_EVERY = 1000
+
+# Сколько свободных соединений SQLite держать открытыми; лишние закрываются
+SQLITE_POOL_SIZE = 4
+
+
+def answer_rows(username, answers, tests_completed=0):
+    """Строки журнала для пакета ответов [(element, level, correct), ...].
+
+    tests_completed записывается в последнюю строку пакета, чтобы завершённый
+    тест учитывался один раз.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [[username, timestamp, element, level, int(bool(correct)), 0] for element, level, correct in answers]
+    if rows:
+        rows[-1][5] = int(tests_completed)
+    return rows
+
+
+def fold_answers(rows):
+    """Сворачивает строки журнала в приращения счётчиков: {username: {поле: значение}}"""
+    deltas = {}
+    for row in rows:
+        if not row or not row[0]:
+            continue
+        user_deltas = deltas.setdefault(row[0], dict.fromkeys(STATS_FIELDS, 0))
+        user_deltas["tests_completed"] += int(row[5] or 0) if len(row) > 5 else 0
+        user_deltas["correct_answers"] += int(row[4] or 0) if len(row) > 4 else 0
+        user_deltas["total_questions"] += 1
+    return deltas
+
+
+class UserStore:
+    """Интерфейс хранилища пользователей.
+
+    Запись пользователя — словарь с ключами password_hash, email, created_at,
+    last_login, role и stats (tests_completed, correct_answers, total_questions).
+
+    Статистика не перезаписывается целиком: ответы дописываются в журнал
+    (log_answers), а compact() сворачивает журнал в счётчики stats.
+    """
+
+    # Идентификатор конкретного хранилища (для отметок вроде "демо-пользователь создан")
+    store_id = "memory"
+
+    def init(self):
+        """Подготовка хранилища (создание листа/таблицы). Возвращает True при успехе"""
+        return True
+
+    def load_users(self, force=False):
+        """Все пользователи: {username: запись}"""
+        raise NotImplementedError
+
+    def get_user(self, username, force=False):
+        """Запись одного пользователя или None"""
+        raise NotImplementedError
+
+    def save_user(self, username, user_data):
+        """Создание или обновление пользователя. Возвращает True при успехе"""
+        raise NotImplementedError
+
+    def log_answers(self, username, answers, tests_completed=0):
+        """Дописывает пакет ответов [(element, level, correct), ...] в журнал"""
+        raise NotImplementedError
+
+    def compact(self):
+        """Сворачивает журнал ответов в счётчики. Возвращает число свёрнутых записей"""
+        return 0
+
+    def get_stats(self, username, user_data=None):
+        """Актуальная статистика пользователя (счётчики плюс несвёрнутый журнал) или None.
+
+        user_data — уже загруженная запись пользователя, чтобы не читать её повторно.
+        """
+        if user_data is None:
+            user_data = self.get_user(username)
+        if user_data is None:
+            return None
+        return dict(user_data["stats"])
+
+    def get_mastery(self, username, user_data=None):
+        """Матрица освоения элементов (Mastery) пользователя или None"""
+        if user_data is None:
+            user_data = self.get_user(username)
+        if user_data is None:
+            return None
+        return Mastery.decode(user_data.get("mastery", ""))
+
+    def flush(self):
+        """Запись отложенных изменений (если хранилище их копит)"""
+        return True
+
+
+class SQLiteUserStore(UserStore):
+    """Локальное хранилище пользователей в SQLite.
+
+    username — первичный ключ (B-дерево), поэтому поиск пользователя стоит O(log n).
+    Ответы дописываются в таблицу answers; compact() в одной транзакции
+    переносит новые записи в счётчики и матрицу освоения (BLOB mastery) users
+    и сдвигает отметку answers_compacted в таблице meta.
+    """
+
+    COLUMNS = ["username", "password_hash", "email", "created_at", "last_login", "role"] + STATS_FIELDS
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self.store_id = f"sqlite:{os.path.abspath(path)}"
+        self._pool_lock = threading.Lock()
+        self._idle = []
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._appended_lock = threading.Lock()
+        self._appended = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Соединение из пула на время одной операции.
+
+        Streamlit выполняет перезапуски скрипта в новых потоках, поэтому
+        соединения не привязаны к потоку: в каждый момент соединением владеет
+        одна операция, а после неё оно возвращается в пул (не больше
+        SQLITE_POOL_SIZE свободных) или закрывается.
+        """
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            if not self._schema_ready:
+                self._create_schema(conn)
+            yield conn
+        finally:
+            with self._pool_lock:
+                # Соединение с незавершённой транзакцией в пул не возвращается
+                keep = not conn.in_transaction and len(self._idle) < SQLITE_POOL_SIZE
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+
+    def close(self):
+        """Закрывает свободные соединения пула"""
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _create_schema(self, conn):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password_hash TEXT NOT NULL DEFAULT '',
+                    email TEXT NOT NULL DEFAULT '',
+                    created_at TEXT NOT NULL DEFAULT '',
+                    last_login TEXT NOT NULL DEFAULT '',
+                    role TEXT NOT NULL DEFAULT 'student',
+                    tests_completed INTEGER NOT NULL DEFAULT 0,
+                    correct_answers INTEGER NOT NULL DEFAULT 0,
+                    total_questions INTEGER NOT NULL DEFAULT 0,
+                    mastery BLOB NOT NULL DEFAULT x''
+                )
+            """)
+            # Базы, созданные до появления матрицы освоения
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(users)")}
+            if "mastery" not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN mastery BLOB NOT NULL DEFAULT x''")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    element TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    correct INTEGER NOT NULL,
+                    tests_completed INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_by_user ON answers (username, id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._schema_ready = True
+
+    @staticmethod
+    def _row_to_user(row):
+        return {
+            "password_hash": row["password_hash"],
+            "email": row["email"],
+            "created_at": row["created_at"],
+            "last_login": row["last_login"],
+            "role": row["role"],
+            "stats": {field: row[field] for field in STATS_FIELDS},
+            "mastery": Mastery.from_bytes(row["mastery"]).encode()
+        }
+
+    def init(self):
+        with self._connection():
+            pass
+        return True
+
+    def load_users(self, force=False):
+        with self._connection() as conn:
+            rows = conn.execute("SELECT * FROM users ORDER BY username").fetchall()
+        return {row["username"]: self._row_to_user(row) for row in rows}
+
+    def get_user(self, username, force=False):
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._row_to_user(row) if row is not None else None
+
+    def save_user(self, username, user_data):
+        stats = user_data.get("stats", {})
+        values = [
+            username,
+            user_data.get("password_hash", ""),
+            user_data.get("email", ""),
+            user_data.get("created_at", ""),
+            user_data.get("last_login", ""),
+            user_data.get("role", "student")
+        ] + [int(stats.get(field, 0)) for field in STATS_FIELDS]
+        # Счётчики существующего пользователя не перезаписываются: ими управляет compact()
+        updates = ", ".join(f"{column} = excluded.{column}" for column in self.COLUMNS[1:-len(STATS_FIELDS)])
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO users ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMNS))}) "
+                f"ON CONFLICT(username) DO UPDATE SET {updates}",
+                values
+            )
+        return True
+
+    def log_answers(self, username, answers, tests_completed=0):
+        rows = answer_rows(username, answers, tests_completed)
+        if not rows:
+            return
+        with self._connection() as conn:
+            # Весь пакет — одна транзакция (одна запись на диск)
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    f"INSERT INTO answers ({', '.join(ANSWER_FIELDS)}) VALUES ({', '.join('?' * len(ANSWER_FIELDS))})",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        with self._appended_lock:
+            self._appended += len(rows)
+            due = self._appended >= SQLITE_COMPACT_EVERY
+            if due:
+                self._appended = 0
+        if due:
+            self.compact()
+
+    def compact(self):
+        with self._connection() as conn:
+            # BEGIN IMMEDIATE: второй процесс дождётся окончания свёртки и не учтёт записи дважды
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'answers_compacted'").fetchone()
+                watermark = row["value"] if row is not None else 0
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM answers").fetchone()[0]
+                totals = conn.execute(
+                    "SELECT username, SUM(tests_completed) AS tests_completed, SUM(correct) AS correct_answers, "
+                    "COUNT(*) AS total_questions FROM answers WHERE id > ? AND id <= ? GROUP BY username",
+                    (watermark, last_id)
+                ).fetchall()
+                assignments = ", ".join(f"{field} = {field} + ?" for field in STATS_FIELDS)
+                conn.executemany(
+                    f"UPDATE users SET {assignments} WHERE username = ?",
+                    [[total[field] for field in STATS_FIELDS] + [total["username"]] for total in totals]
+                )
+
+                # Матрица освоения: одно чтение и одна запись BLOB на пользователя
+                matrices = {}
+                for row in conn.execute(
+                    "SELECT username, element, level, COUNT(*) AS attempts, SUM(correct) AS correct "
+                    "FROM answers WHERE id > ? AND id <= ? GROUP BY username, element, level",
+                    (watermark, last_id)
+                ).fetchall():
+                    if row["username"] not in matrices:
+                        blob = conn.execute(
+                            "SELECT mastery FROM users WHERE username = ?", (row["username"],)
+                        ).fetchone()
+                        if blob is None:
+                            continue
+                        matrices[row["username"]] = Mastery.from_bytes(blob["mastery"])
+                    matrices[row["username"]].record(row["element"], row["level"], row["correct"], row["attempts"])
+                conn.executemany(
+                    "UPDATE users SET mastery = ? WHERE username = ?",
+                    [(mastery.to_bytes(), username) for username, mastery in matrices.items()]
+                )
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('answers_compacted', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (last_id,)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return sum(total["total_questions"] for total in totals)
+
+    def get_stats(self, username, user_data=None):
+        # Один запрос — согласованный снимок счётчиков и несвёрнутого хвоста журнала
+        with self._connection() as conn:
+            row = conn.execute("""
+                SELECT u.tests_completed + COALESCE(SUM(a.tests_completed), 0) AS tests_completed,
+                       u.correct_answers + COALESCE(SUM(a.correct), 0) AS correct_answers,
+                       u.total_questions + COUNT(a.id) AS total_questions
+                FROM users u
+                LEFT JOIN answers a ON a.username = u.username
+                    AND a.id > COALESCE((SELECT value FROM meta WHERE key = 'answers_compacted'), 0)
+                WHERE u.username = ?
+                GROUP BY u.username
+            """, (username,)).fetchone()
+        return {field: row[field] for field in STATS_FIELDS} if row is not None else None
+
+    def get_mastery(self, username, user_data=None):
+        with self._connection() as conn:
+            # Чтение в одной транзакции — согласованный снимок матрицы и хвоста журнала
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute("SELECT mastery FROM users WHERE username = ?", (username,)).fetchone()
+                tail = conn.execute(
+                    "SELECT element, level, correct FROM answers WHERE username = ? "
+                    "AND id > COALESCE((SELECT value FROM meta WHERE key = 'answers_compacted'), 0)",
+                    (username,)
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        if row is None:
+            return None
+        mastery = Mastery.from_bytes(row["mastery"])
+        for answer in tail:
+            mastery.record(answer["element"], answer["level"], answer["correct"])
+        return mastery